@@ -14,8 +14,12 @@ from dotenv import load_dotenv
 from smolagents import CodeAgent
 
 # Import required services
-from backend.services.ai.nlp_service import flag_urgent_complaints
-from backend.services.ai.rework_predictor_service import predict_rework_risk_for_work_orders
+from backend.services.ai.nlp_service import (
+    flag_urgent_complaints,
+    top_urgent_complaints,
+    with_urgent_keyword_lists
+)
+from backend.services.ai.rework_risk_index import get_rework_risk_index
 from backend.services.data_ingestion_service import fetch_and_process_311_data
 
 # Set up logging
@@ -29,7 +33,8 @@ def get_today_urgent_complaints() -> List[Dict[str, Any]]:
     """
     Fetches and analyzes recent 311 HPD complaints to identify urgent issues.
     Returns a list of dictionaries, each representing an urgent complaint with
-    'unique_key', 'descriptor', and 'urgent_keywords_found', or an empty list if none.
+    'unique_key', 'descriptor', 'urgent_keywords_found' and 'urgency_score',
+    or an empty list if none.
     """
     try:
         # Get data for the last 24 hours
@@ -43,16 +48,17 @@ def get_today_urgent_complaints() -> List[Dict[str, Any]]:
         # Flag urgent complaints
         urgent_df = flag_urgent_complaints(df)
         
-        # Sort by urgency score and get top 5
-        top_urgent = urgent_df.nlargest(5, 'urgency_score')
+        # Select the 5 most urgent complaints
+        top_urgent = with_urgent_keyword_lists(top_urgent_complaints(urgent_df, 5))
         
         # Format results
         urgent_complaints = []
         for _, row in top_urgent.iterrows():
             urgent_complaints.append({
-                'unique_key': row['complaint_id'],
-                'descriptor': row['complaint_descriptor'],
-                'urgent_keywords_found': row.get('keywords', [])
+                'unique_key': row['unique_key'],
+                'descriptor': row['descriptor'],
+                'urgent_keywords_found': row['urgent_keywords_found'],
+                'urgency_score': float(row['urgency_score'])
             })
         
         return urgent_complaints
@@ -69,15 +75,15 @@ def get_recent_high_rework_risk_jobs() -> List[Dict[str, Any]]:
     or an empty list if none.
     """
     try:
-        # Get work orders with risk predictions
-        df = predict_rework_risk_for_work_orders()
+        # Get the materialized work order risk assessments
+        index = get_rework_risk_index()
         
-        if df.empty:
+        if index is None or len(index) == 0:
             logger.warning("No work orders data available")
             return []
         
-        # Filter for high risk (score > 0.6) and sort by score
-        high_risk_df = df[df['predicted_rework_risk_score'] > 0.6].nlargest(5, 'predicted_rework_risk_score')
+        # Top 5 by score among high risk (score > 0.6)
+        high_risk_df = index.decode(index.top_n(5, min_score=0.6))
         
         # Format results
         high_risk_jobs = []
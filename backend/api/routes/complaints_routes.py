@@ -7,9 +7,22 @@ import os
 import logging
 from typing import Dict, Any, List
 import pandas as pd
-from flask import Blueprint, jsonify, current_app
+from flask import Blueprint, jsonify, current_app, request
 
-from backend.services.ai.nlp_service import flag_urgent_complaints
+from backend.services.ai.nlp_service import (
+    flag_urgent_complaints,
+    top_urgent_complaints,
+    with_urgent_keyword_lists
+)
+from backend.services.ai.urgency_result_store import get_urgency_result_store
+from backend.services.data_ingestion_service import read_311_csv
+from backend.services.complaint_store import open_complaint_store
+
+# Columns read from the complaint store for urgency analysis
+URGENCY_COLUMNS = [
+    'unique_key', 'created_date', 'complaint_type',
+    'descriptor', 'resolution_description'
+]
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -22,6 +35,13 @@ def analyze_urgency() -> tuple[Dict[str, Any], int]:
     """
     Analyze stored 311 complaints for urgency using NLP.
     
+    Optional JSON body fields 'days' (look-back window), 'start_date',
+    'end_date' (exclusive) and 'agency' restrict the analysis; only the
+    matching partitions and columns of the complaint store are read.
+    Urgent complaints are returned most urgent first; 'limit' keeps only
+    the top N. 'mode' selects keyword 'rules' (default), the learned
+    'model', or 'both'.
+    
     Returns:
         tuple[Dict[str, Any], int]: JSON response and HTTP status code
             Success response:
@@ -48,36 +68,50 @@ def analyze_urgency() -> tuple[Dict[str, Any], int]:
                 'message': 'Data directory not found'
             }), 404
         
-        # Find the most recent 311 data file
-        data_files = [f for f in os.listdir(data_dir) if f.startswith('311_') and f.endswith('.csv')]
-        if not data_files:
-            logger.error(f"No 311 data files found in {data_dir}")
-            return jsonify({
-                'status': 'error',
-                'message': 'No 311 data files found in data directory'
-            }), 404
-        
-        # Sort by modification time and get the most recent
-        latest_file = max(data_files, key=lambda x: os.path.getmtime(os.path.join(data_dir, x)))
-        file_path = os.path.join(data_dir, latest_file)
-        
-        logger.info(f"Reading 311 data from {latest_file}")
-        
-        # Read the CSV file
-        df = pd.read_csv(file_path)
+        request_data = request.get_json(silent=True) or {}
+        start_date = request_data.get('start_date')
+        end_date = request_data.get('end_date')
+        if request_data.get('days') is not None:
+            start_date = pd.Timestamp.now().normalize() - pd.Timedelta(days=int(request_data['days']))
+        
+        store = open_complaint_store(data_dir, request_data.get('agency', 'HPD'))
+        if len(store):
+            logger.info(f"Reading 311 data from complaint store {store.root}")
+            df = store.read(columns=URGENCY_COLUMNS, start=start_date, end=end_date)
+        else:
+            # Fall back to the most recent CSV written before the store existed
+            data_files = [f for f in os.listdir(data_dir) if f.startswith('311_') and f.endswith('.csv')]
+            if not data_files:
+                logger.error(f"No 311 data found in {data_dir}")
+                return jsonify({
+                    'status': 'error',
+                    'message': 'No 311 data files found in data directory'
+                }), 404
+            
+            # Sort by modification time and get the most recent
+            latest_file = max(data_files, key=lambda x: os.path.getmtime(os.path.join(data_dir, x)))
+            logger.info(f"Reading 311 data from {latest_file}")
+            df = read_311_csv(os.path.join(data_dir, latest_file))
+            if start_date is not None:
+                df = df[df['created_date'] >= pd.Timestamp(start_date)]
+            if end_date is not None:
+                df = df[df['created_date'] < pd.Timestamp(end_date)]
         
         if df.empty:
-            logger.error("Empty CSV file encountered")
+            logger.error("No complaints found for the requested window")
             return jsonify({
                 'status': 'error',
                 'message': 'No complaints found in the data file'
             }), 404
         
         # Process the data for urgency
-        df_flagged = flag_urgent_complaints(df)
+        # Complaints analyzed by earlier requests are reused from the result store
+        result_store = get_urgency_result_store(os.path.join(data_dir, '311_urgency_results'))
+        df_flagged = flag_urgent_complaints(df, mode=request_data.get('mode', 'rules'), result_store=result_store)
         
-        # Filter for urgent complaints
-        urgent_df = df_flagged[df_flagged['is_urgent']]
+        # Select urgent complaints, most urgent first
+        limit = request_data.get('limit')
+        urgent_df = top_urgent_complaints(df_flagged, int(limit) if limit is not None else None)
         
         if urgent_df.empty:
             logger.info("No urgent complaints found in the data")
@@ -88,10 +122,13 @@ def analyze_urgency() -> tuple[Dict[str, Any], int]:
                 'message': 'No urgent complaints found'
             }), 200
         
+        # Keywords are kept as bitmasks until the selected complaints are serialized
+        urgent_df = with_urgent_keyword_lists(urgent_df)
+        
         # Select relevant columns and convert to list of dicts
         columns_to_include = [
             'unique_key', 'created_date', 'complaint_type',
-            'descriptor', 'urgent_keywords_found'
+            'descriptor', 'urgent_keywords_found', 'urgency_score'
         ]
         
         # Ensure all required columns exist
@@ -103,7 +140,10 @@ def analyze_urgency() -> tuple[Dict[str, Any], int]:
                 'message': 'Required columns not found in data'
             }), 500
         
-        urgent_complaints = urgent_df[available_columns].to_dict(orient='records')
+        response_df = urgent_df[available_columns]
+        if 'created_date' in response_df.columns:
+            response_df = response_df.assign(created_date=response_df['created_date'].astype(str))
+        urgent_complaints = response_df.to_dict(orient='records')
         logger.info(f"Found {len(urgent_complaints)} urgent complaints")
         
         return jsonify({
@@ -119,6 +159,13 @@ def analyze_urgency() -> tuple[Dict[str, Any], int]:
             'message': 'The data file is empty'
         }), 400
         
+    except ValueError as e:
+        logger.error(f"Invalid urgency analysis request: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f'Invalid request: {str(e)}'
+        }), 400
+        
     except FileNotFoundError as e:
         logger.error(f"File not found: {str(e)}")
         return jsonify({
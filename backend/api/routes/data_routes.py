@@ -6,9 +6,12 @@ Defines API endpoints for data ingestion and processing.
 import os
 import logging
 from typing import Dict, Any, Tuple
-from datetime import datetime
 from flask import Blueprint, jsonify, request
-from backend.services.data_ingestion_service import fetch_and_process_311_data
+from backend.services.data_ingestion_service import (
+    ingest_311_full,
+    ingest_311_incremental
+)
+from backend.services.complaint_store import open_complaint_store
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -23,70 +26,155 @@ def ensure_data_directory() -> str:
     Returns:
         str: Path to the data directory
     """
-    data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data')
+    data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'data')
     os.makedirs(data_dir, exist_ok=True)
     return data_dir
 
-def save_dataframe_to_csv(df: Any, data_dir: str) -> str:
+def _parse_ingest_options(request_data: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Save DataFrame to CSV file with timestamp.
+    Validate the optional ingestion options of an /ingest-311 request body.
     
     Args:
-        df: Pandas DataFrame to save
-        data_dir: Directory to save the file in
+        request_data (Dict[str, Any]): Parsed JSON request body
     
     Returns:
-        str: Path to the saved file
+        Dict[str, Any]: mode, concurrency, pagination and wire_format
+    
+    Raises:
+        ValueError: If an option has an invalid value
     """
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f'311_hpd_processed_data_{timestamp}.csv'
-    filepath = os.path.join(data_dir, filename)
-    df.to_csv(filepath, index=False)
-    return filepath
+    mode = request_data.get('mode', 'full')
+    if mode not in ('full', 'incremental'):
+        raise ValueError("mode must be 'full' or 'incremental'.")
+    
+    concurrency = request_data.get('concurrency', 1)
+    if isinstance(concurrency, bool):
+        raise ValueError("concurrency must be a positive integer.")
+    try:
+        concurrency = int(concurrency)
+    except (TypeError, ValueError):
+        raise ValueError("concurrency must be a positive integer.")
+    if concurrency < 1:
+        raise ValueError("concurrency must be a positive integer.")
+    
+    pagination = request_data.get('pagination', 'offset')
+    if pagination not in ('offset', 'keyset'):
+        raise ValueError("pagination must be 'offset' or 'keyset'.")
+    
+    wire_format = request_data.get('wire_format', 'json')
+    if wire_format not in ('json', 'csv'):
+        raise ValueError("wire_format must be 'json' or 'csv'.")
+    
+    return {
+        'mode': mode,
+        'concurrency': concurrency,
+        'pagination': pagination,
+        'wire_format': wire_format
+    }
 
 @data_bp.route('/ingest-311', methods=['POST'])
 def ingest_311_data() -> Tuple[Dict[str, Any], int]:
     """
     Endpoint to ingest 311 service request data.
     
+    Optional JSON body fields: 'start_date', 'agency', 'concurrency',
+    'pagination', 'wire_format' and 'mode'. Records are merged into the
+    agency's partitioned complaint store, deduplicated on unique_key.
+    'full' (default) crawls everything from start_date; 'incremental'
+    fetches only records past the store's watermark. A full crawl that
+    completes moves the watermark to the newest record merged. With
+    pagination='keyset' a full crawl that fails part-way resumes from its
+    checkpoint on the next call. Invalid options are rejected with 400.
+    
     Returns:
         Tuple[Dict[str, Any], int]: JSON response and HTTP status code
     """
+    request_data = request.get_json(silent=True) or {}
+    try:
+        options = _parse_ingest_options(request_data)
+    except ValueError as e:
+        return {
+            "status": "error",
+            "message": str(e)
+        }, 400
+    
     try:
         # Get optional parameters from request
-        request_data = request.get_json() or {}
         start_date = request_data.get('start_date')
         agency = request_data.get('agency', 'HPD')
+        mode = options['mode']
+        concurrency = options['concurrency']
+        pagination = options['pagination']
+        wire_format = options['wire_format']
+        
+        logger.info(f"Starting 311 data ingestion for agency: {agency} (mode: {mode})")
+        
+        # Ensure data directory exists
+        data_dir = ensure_data_directory()
+        store = open_complaint_store(data_dir, agency)
         
-        logger.info(f"Starting 311 data ingestion for agency: {agency}")
+        if mode == 'incremental':
+            # Fetch only records past the watermark and merge into the store
+            summary = ingest_311_incremental(
+                data_dir,
+                start_date=start_date,
+                agency_filter=agency,
+                store=store,
+                concurrency=concurrency,
+                wire_format=wire_format
+            )
+            if summary['file_path'] is None:
+                logger.warning("No data received from 311 service")
+                return {
+                    "status": "error",
+                    "message": "No data found for the specified parameters."
+                }, 404
+            
+            return {
+                "status": "success",
+                "message": "Incremental 311 data ingestion complete.",
+                "records_processed": summary['new_records'],
+                "total_records": summary['total_records'],
+                "watermark": summary['watermark'],
+                "file_path": summary['file_path']
+            }, 200
+        
+        # Keyset crawls checkpoint their progress so a failed run resumes;
+        # chunks already in the store are simply overwritten on replay
+        checkpoint_path = None
+        if pagination == 'keyset':
+            checkpoint_path = os.path.join(data_dir, f'311_{agency.lower()}_crawl_checkpoint.json')
         
-        # Fetch and process data
-        df = fetch_and_process_311_data(
+        # Stream pages straight into the store so memory stays bounded by page size
+        summary = ingest_311_full(
+            store,
             start_date=start_date,
-            agency_filter=agency
+            agency_filter=agency,
+            pagination=pagination,
+            concurrency=concurrency,
+            checkpoint_path=checkpoint_path,
+            wire_format=wire_format
         )
+        records_processed = summary['new_records']
         
         # Check if we got any data
-        if df.empty:
+        if records_processed == 0:
             logger.warning("No data received from 311 service")
             return {
                 "status": "error",
                 "message": "No data found for the specified parameters."
             }, 404
         
-        # Ensure data directory exists
-        data_dir = ensure_data_directory()
-        
-        # Save data to CSV
-        filepath = save_dataframe_to_csv(df, data_dir)
-        logger.info(f"311 data saved to: {filepath}")
+        logger.info(f"311 data saved to: {store.root}")
         
         # Return success response
         return {
             "status": "success",
             "message": "311 data ingestion complete.",
-            "records_processed": len(df),
-            "file_path": filepath
+            "records_processed": records_processed,
+            "total_records": summary['total_records'],
+            "watermark": summary['watermark'],
+            "file_path": store.root
         }, 200
         
     except Exception as e:
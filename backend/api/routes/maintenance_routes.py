@@ -4,11 +4,21 @@ Maintenance Routes Module for NYCHA QualityGuard Pro
 This module defines a Flask Blueprint for maintenance-related API endpoints.
 """
 
+import base64
+import binascii
+import hashlib
 import logging
 from typing import Dict, Any, List
-from flask import Blueprint, jsonify
+import pandas as pd
+from flask import Blueprint, jsonify, request
 
-from backend.services.ai.rework_predictor_service import predict_rework_risk_for_work_orders
+from backend.services.ai.rework_predictor_service import (
+    DEFAULT_REPEAT_WINDOW_DAYS,
+    find_repeat_failures,
+    predict_rework_risk_for_work_orders
+)
+from backend.services.ai.rework_risk_index import INDEX_SORT_COLUMNS, ReworkRiskIndex, get_rework_risk_index
+from backend.services.ai.rework_stats import REWORK_STAT_DIMENSIONS, get_rework_stats
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -16,42 +26,324 @@ logger = logging.getLogger(__name__)
 # Create Blueprint
 maintenance_bp = Blueprint('maintenance_api', __name__, url_prefix='/api/maintenance')
 
+# Columns /rework-assessments returns unless ?fields= selects some of ASSESSMENT_FIELDS
+DEFAULT_ASSESSMENT_FIELDS = [
+    'wo_id', 'asset_id', 'asset_type', 'assigned_contractor_id',
+    'closed_date', 'resolution_text_simulated',
+    'predicted_rework_risk_score', 'predicted_risk_factors'
+]
+ASSESSMENT_FIELDS = DEFAULT_ASSESSMENT_FIELDS + ['building_id', 'asset_age_at_wo', 'contractor_rework_propensity']
+
+# Assessments per page of /rework-assessments by default, and at most
+DEFAULT_ASSESSMENT_PAGE_SIZE = 100
+MAX_ASSESSMENT_PAGE_SIZE = 1000
+
+def _parse_assessment_query(args: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Read the /rework-assessments query parameters.
+
+    Raises:
+        ValueError: With a message for the client if a parameter is invalid.
+    """
+    query: Dict[str, Any] = {}
+    try:
+        limit = int(args.get('limit', DEFAULT_ASSESSMENT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("limit must be an integer.")
+    if not 1 <= limit <= MAX_ASSESSMENT_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_ASSESSMENT_PAGE_SIZE}.")
+
+    if 'min_score' in args:
+        try:
+            query['min_score'] = float(args['min_score'])
+        except ValueError:
+            query['min_score'] = float('nan')
+        # Also rejects nan and infinities
+        if not 0.0 <= query['min_score'] <= 1.0:
+            raise ValueError("min_score must be a number between 0 and 1.")
+    query['asset_type'] = args.get('asset_type')
+    query['contractor'] = args.get('contractor')
+    for param, key in (('from', 'closed_from'), ('to', 'closed_to')):
+        if param in args:
+            try:
+                query[key] = pd.Timestamp(args[param])
+            except ValueError:
+                query[key] = pd.NaT
+            if pd.isna(query[key]):
+                raise ValueError(f"{param} must be a date (YYYY-MM-DD).")
+    query['sort'] = args.get('sort', '-predicted_rework_risk_score')
+    if query['sort'].lstrip('-') not in INDEX_SORT_COLUMNS:
+        raise ValueError(f"sort must be one of {', '.join(INDEX_SORT_COLUMNS)}, optionally prefixed with '-'.")
+
+    fields = [field for field in args.get('fields', '').split(',') if field] or DEFAULT_ASSESSMENT_FIELDS
+    unknown = [field for field in fields if field not in ASSESSMENT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Use any of: {', '.join(ASSESSMENT_FIELDS)}.")
+    return {'limit': limit, 'fields': fields, 'filters': query}
+
+def _cursor_token(index_signature: Any, filters: Dict[str, Any]) -> str:
+    """Identifies a query over one version of the data; cursors carry it."""
+    return hashlib.sha1(repr((index_signature, sorted(filters.items()))).encode('utf-8')).hexdigest()[:12]
+
+def _encode_cursor(offset: int, token: str) -> str:
+    return base64.urlsafe_b64encode(f"{offset}:{token}".encode('utf-8')).decode('ascii')
+
+def _decode_cursor(cursor: str, token: str) -> int:
+    """
+    Offset a cursor points at.
+
+    Raises:
+        ValueError: If the cursor is malformed, or belongs to another query or data version.
+    """
+    try:
+        offset, cursor_token = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split(':')
+        offset = int(offset)
+    except (ValueError, UnicodeError, binascii.Error):
+        raise ValueError("Invalid cursor.")
+    if cursor_token != token or offset < 0:
+        raise ValueError("The cursor belongs to another query or the assessments have changed; start again without it.")
+    return offset
+
 @maintenance_bp.route('/rework-assessments', methods=['GET'])
 def get_rework_assessments() -> Dict[str, Any]:
     """
     GET endpoint to retrieve rework risk assessments for synthetic work orders.
-    Calls predict_rework_risk_for_work_orders, selects relevant columns, and returns a JSON response.
+
+    Served from the materialized rework risk index, highest risk first, one
+    page at a time. Query parameters:
+    - limit: Assessments per page (default 100, at most 1000)
+    - cursor: next_cursor of the previous page
+    - min_score: Minimum predicted_rework_risk_score (inclusive)
+    - asset_type, contractor: Exact asset type / assigned contractor ID
+    - from, to: Close date range (inclusive, YYYY-MM-DD)
+    - sort: One of predicted_rework_risk_score, closed_date, asset_age_at_wo,
+      wo_id; prefix with '-' for descending
+    - fields: Comma-separated columns to return (see ASSESSMENT_FIELDS)
+    - live_propensity=true: Score with the live contractor propensities
+    Filters, sorting and paging happen before any row is serialized, and
+    risk factors are only decoded for the page, when requested.
     """
     try:
-        # Call the rework predictor service
-        df = predict_rework_risk_for_work_orders()
-        if df.empty:
+        query = _parse_assessment_query(request.args)
+    except ValueError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+    try:
+        if request.args.get('live_propensity', '').lower() in ('1', 'true', 'yes'):
+            live_stats = get_rework_stats()
+            df = predict_rework_risk_for_work_orders(live_stats=live_stats)
+            index = ReworkRiskIndex(df, ('live', live_stats.work_orders if live_stats else 0)) if not df.empty else None
+        else:
+            index = get_rework_risk_index()
+        if index is None or len(index) == 0:
             return jsonify({
                 "status": "error",
                 "message": "No rework assessments available."
             }), 404
 
-        # Select relevant columns for the response
+        token = _cursor_token(index.signature, query['filters'])
+        try:
+            offset = _decode_cursor(request.args['cursor'], token) if 'cursor' in request.args else 0
+        except ValueError as e:
+            return jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 400
+
+        matches = index.query(**query['filters'])
+        page = matches.iloc[offset:offset + query['limit']]
+        # Risk factors are kept as bitmasks until the page is serialized
+        if 'predicted_risk_factors' in query['fields']:
+            page = index.decode(page)
+        assessments = page[[field for field in query['fields'] if field in page.columns]].to_dict(orient='records')
+
+        next_offset = offset + len(page)
+        return jsonify({
+            "status": "success",
+            "rework_assessments": assessments,
+            "count": len(assessments),
+            "total": len(matches),
+            "next_cursor": _encode_cursor(next_offset, token) if next_offset < len(matches) else None
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error retrieving rework assessments: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": "Failed to retrieve rework assessments. Please try again later."
+        }), 500
+
+@maintenance_bp.route('/rework-assessments/<wo_id>', methods=['GET'])
+def get_rework_assessment(wo_id: str) -> Dict[str, Any]:
+    """
+    GET endpoint to retrieve the rework risk assessment of one work order.
+    Served from the materialized rework risk index.
+    """
+    try:
+        index = get_rework_risk_index()
+        if index is None:
+            return jsonify({
+                "status": "error",
+                "message": "No rework assessments available."
+            }), 404
+
+        assessment = index.get(wo_id)
+        if assessment is None:
+            return jsonify({
+                "status": "error",
+                "message": f"Work order {wo_id} not found."
+            }), 404
+
         relevant_columns = [
-            'wo_id', 'asset_id', 'asset_type', 'assigned_contractor_id',
+            'wo_id', 'asset_id', 'asset_type', 'building_id', 'assigned_contractor_id',
             'closed_date', 'resolution_text_simulated',
             'predicted_rework_risk_score', 'predicted_risk_factors'
         ]
-        selected_df = df[relevant_columns]
+        return jsonify({
+            "status": "success",
+            "rework_assessment": {col: assessment.get(col) for col in relevant_columns}
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error retrieving rework assessment for {wo_id}: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": "Failed to retrieve rework assessment. Please try again later."
+        }), 500
+
+@maintenance_bp.route('/rework-stats/<dimension>', methods=['GET'])
+def get_rework_stats_by(dimension: str) -> Dict[str, Any]:
+    """
+    GET endpoint to retrieve observed rework rates per assigned_contractor_id,
+    asset_id, asset_type or building_id. ?key= returns a single one.
+    """
+    if dimension not in REWORK_STAT_DIMENSIONS:
+        return jsonify({
+            "status": "error",
+            "message": f"Unknown dimension {dimension}. Use one of: {', '.join(REWORK_STAT_DIMENSIONS)}."
+        }), 400
 
-        # Convert DataFrame to a list of dictionaries
-        assessments = selected_df.to_dict(orient='records')
+    try:
+        stats = get_rework_stats()
+        if stats is None:
+            return jsonify({
+                "status": "error",
+                "message": "No rework stats available."
+            }), 404
 
-        # Return success response
+        key = request.args.get('key')
+        if key is not None:
+            row = stats.get(dimension, key)
+            if row is None:
+                return jsonify({
+                    "status": "error",
+                    "message": f"No work orders for {dimension} {key}."
+                }), 404
+            return jsonify({"status": "success", "rework_stats": row}), 200
+
+        rows = stats.snapshot(dimension).to_dict(orient='records')
         return jsonify({
             "status": "success",
-            "rework_assessments": assessments,
-            "count": len(assessments)
+            "rework_stats": rows,
+            "count": len(rows)
         }), 200
 
     except Exception as e:
-        logger.error(f"Error retrieving rework assessments: {str(e)}")
+        logger.error(f"Error retrieving rework stats by {dimension}: {str(e)}")
         return jsonify({
             "status": "error",
-            "message": "Failed to retrieve rework assessments. Please try again later."
-        }), 500 
\ No newline at end of file
+            "message": "Failed to retrieve rework stats. Please try again later."
+        }), 500
+
+@maintenance_bp.route('/rework-outcomes', methods=['POST'])
+def record_rework_outcome() -> Dict[str, Any]:
+    """
+    POST endpoint to record the outcome of a closed work order.
+    The body is the work order as JSON, with 'actual_rework_needed';
+    the live rework stats are updated in place. Resending a work order
+    with the same wo_id does not count it again ('counted' is false).
+    """
+    work_order = request.get_json(silent=True)
+    if not isinstance(work_order, dict) or work_order.get('actual_rework_needed') is None:
+        return jsonify({
+            "status": "error",
+            "message": "Request body must be a work order with 'actual_rework_needed'."
+        }), 400
+    for field in ('wo_id',) + REWORK_STAT_DIMENSIONS:
+        value = work_order.get(field)
+        if value is not None and not isinstance(value, (str, int, float)):
+            return jsonify({
+                "status": "error",
+                "message": f"'{field}' must be a string or number."
+            }), 400
+
+    try:
+        stats = get_rework_stats()
+        if stats is None:
+            return jsonify({
+                "status": "error",
+                "message": "No rework stats available."
+            }), 404
+
+        counted = stats.update(work_order)
+        contractor_id = work_order.get('assigned_contractor_id')
+        return jsonify({
+            "status": "success",
+            "counted": counted,
+            "work_orders": stats.work_orders,
+            "contractor_stats": stats.get('assigned_contractor_id', contractor_id) if contractor_id else None
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error recording rework outcome: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": "Failed to record rework outcome. Please try again later."
+        }), 500
+
+@maintenance_bp.route('/repeat-failures', methods=['GET'])
+def get_repeat_failures() -> Dict[str, Any]:
+    """
+    GET endpoint to retrieve repeat failures: work orders created within
+    ?window_days= (default 30) of a previous close on the same asset,
+    most recent first. ?asset_id= restricts them to one asset.
+    """
+    try:
+        window_days = float(request.args.get('window_days', DEFAULT_REPEAT_WINDOW_DAYS))
+        if not window_days >= 0:
+            raise ValueError(window_days)
+    except ValueError:
+        return jsonify({
+            "status": "error",
+            "message": "window_days must be a non-negative number."
+        }), 400
+
+    try:
+        df = find_repeat_failures(window_days=window_days)
+        asset_id = request.args.get('asset_id')
+        if asset_id is not None and not df.empty:
+            df = df[df['asset_id'] == asset_id]
+
+        relevant_columns = [
+            'wo_id', 'asset_id', 'asset_type', 'building_id', 'assigned_contractor_id',
+            'created_date', 'previous_wo_id', 'previous_closed_date', 'days_since_previous_close'
+        ]
+        repeats = df[[col for col in relevant_columns if col in df.columns]]
+        # Missing values (e.g. no assigned contractor) must serialize as null, not NaN
+        repeats = repeats.astype(object).where(repeats.notna(), None).to_dict(orient='records')
+        return jsonify({
+            "status": "success",
+            "window_days": window_days,
+            "repeat_failures": repeats,
+            "count": len(repeats)
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error retrieving repeat failures: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": "Failed to retrieve repeat failures. Please try again later."
+        }), 500
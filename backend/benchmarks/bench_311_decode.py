@@ -0,0 +1,105 @@
+"""
+Benchmark JSON vs CSV wire-format decoding of 311 pages.
+
+Records the raw page bodies of a crawl in both formats to a fixture directory
+(from the local Socrata stand-in by default, or a live endpoint with --url),
+then times decoding plus cleaning of the recorded pages with each decoder and
+checks that both produce identical frames. Each format is recorded at the
+page size stream_311_data requests it in: PAGE_LIMIT records per JSON page,
+CSV_PAGE_LIMIT per CSV page.
+
+Usage:
+    python -m backend.benchmarks.bench_311_decode --records 50000
+    python -m backend.benchmarks.bench_311_decode --fixture-dir /tmp/311_fixture --url https://data.cityofnewyork.us/resource/erm2-nwe9.json
+"""
+
+import argparse
+import glob
+import os
+import tempfile
+import time
+from typing import Callable, List
+
+import pandas as pd
+import requests
+
+from backend.benchmarks.socrata_stub import SocrataStubServer, generate_311_records
+from backend.services.data_ingestion_service import (
+    COLUMNS_311,
+    CSV_PAGE_LIMIT,
+    PAGE_LIMIT,
+    _decode_csv_page,
+    _decode_json_page,
+    _pages_to_frame,
+    _resource_url,
+)
+
+def record_fixture(url: str, fixture_dir: str, records: int) -> None:
+    """Save raw page bodies of the first `records` records in both wire formats."""
+    session = requests.Session()
+    params = {
+        '$select': ','.join(COLUMNS_311),
+        '$where': "agency='HPD'",
+        '$order': 'created_date DESC, unique_key DESC'
+    }
+    for wire_format, limit in (('json', PAGE_LIMIT), ('csv', CSV_PAGE_LIMIT)):
+        params['$limit'] = limit
+        for page in range(-(-records // limit)):
+            params['$offset'] = page * limit
+            response = session.get(_resource_url(url, wire_format), params=params, timeout=60)
+            response.raise_for_status()
+            with open(os.path.join(fixture_dir, f'page_{page:04d}.{wire_format}'), 'wb') as f:
+                f.write(response.content)
+
+def decode_all(paths: List[str], decoder: Callable[[bytes], pd.DataFrame]) -> pd.DataFrame:
+    bodies = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            bodies.append(f.read())
+    start = time.perf_counter()
+    frame = _pages_to_frame([decoder(body) for body in bodies])
+    return frame, time.perf_counter() - start
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=50000)
+    parser.add_argument('--fixture-dir', default=None,
+                        help='Reuse or create a recorded fixture here instead of a temp dir')
+    parser.add_argument('--url', default=None, help='Record from this endpoint instead of the stub')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    fixture_dir = args.fixture_dir or tempfile.mkdtemp(prefix='311_fixture_')
+    os.makedirs(fixture_dir, exist_ok=True)
+
+    if not glob.glob(os.path.join(fixture_dir, 'page_*.json')):
+        if args.url:
+            record_fixture(args.url, fixture_dir, args.records)
+        else:
+            with SocrataStubServer(generate_311_records(args.records)) as stub:
+                record_fixture(stub.url, fixture_dir, args.records)
+
+    json_paths = sorted(glob.glob(os.path.join(fixture_dir, 'page_*.json')))
+    csv_paths = sorted(glob.glob(os.path.join(fixture_dir, 'page_*.csv')))
+
+    results = {}
+    for name, paths, decoder in (('json', json_paths, _decode_json_page),
+                                 ('csv', csv_paths, _decode_csv_page)):
+        timings = []
+        for _ in range(args.repeat):
+            frame, elapsed = decode_all(paths, decoder)
+            timings.append(elapsed)
+        results[name] = (frame, min(timings))
+
+    # The last CSV page can run past the requested records, as the stream trims it
+    rows = len(results['json'][0])
+    results['csv'] = (results['csv'][0].iloc[:rows], results['csv'][1])
+    pd.testing.assert_frame_equal(results['json'][0], results['csv'][0])
+
+    print(f"fixture: {fixture_dir} ({len(json_paths)} json pages, {len(csv_paths)} csv pages, {rows} rows)")
+    for name, (_, elapsed) in results.items():
+        print(f"{name:>5}: {elapsed * 1000:8.1f} ms  {rows / elapsed:>10.0f} rows/s")
+    print(f"speedup: {results['json'][1] / results['csv'][1]:.2f}x (outputs identical)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark paged 311 fetching against a local Socrata stand-in.
+
+Measures records/second of fetch_and_process_311_data at several concurrency
+levels. The stub adds a fixed per-request latency to approximate the round
+trip to data.cityofnewyork.us. Pacing is disabled unless --paced is given,
+in which case the token-holder rate budget applies and the stub answers
+every --throttle-every'th request with a 429.
+
+Usage:
+    python -m backend.benchmarks.bench_311_fetch --records 20000 --latency 0.15
+"""
+
+import argparse
+import logging
+import time
+
+from backend.benchmarks.socrata_stub import SocrataStubServer, generate_311_records
+from backend.services.data_ingestion_service import fetch_and_process_311_data
+from backend.services.rate_controller import AdaptiveRateController
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=20000)
+    parser.add_argument('--latency', type=float, default=0.15,
+                        help='Simulated server latency per request, in seconds')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--paced', action='store_true',
+                        help='Use the adaptive rate controller with the token budget')
+    parser.add_argument('--throttle-every', type=int, default=0,
+                        help='Answer every Nth request with 429 Too Many Requests')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    records = generate_311_records(args.records)
+    max_pages = args.records // 1000 + 2
+
+    with SocrataStubServer(records, latency=args.latency,
+                           throttle_every=args.throttle_every) as stub:
+        print(f"{'concurrency':>11}  {'records':>8}  {'requests':>8}  {'seconds':>8}  {'rec/s':>10}")
+        for concurrency in args.concurrency:
+            stub.request_count = 0
+            if args.paced:
+                controller = AdaptiveRateController.for_token(True)
+            else:
+                controller = AdaptiveRateController(min_interval=0.0, initial_interval=0.0)
+            start = time.perf_counter()
+            df = fetch_and_process_311_data(
+                start_date='2024-01-01',
+                max_pages=max_pages,
+                concurrency=concurrency,
+                base_url=stub.url,
+                rate_controller=controller
+            )
+            elapsed = time.perf_counter() - start
+            assert len(df) == len(records), f"expected {len(records)} rows, got {len(df)}"
+            print(f"{concurrency:>11}  {len(df):>8}  {stub.request_count:>8}  "
+                  f"{elapsed:>8.2f}  {len(df) / elapsed:>10.0f}")
+
+if __name__ == '__main__':
+    main()
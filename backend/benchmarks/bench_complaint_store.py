@@ -0,0 +1,73 @@
+"""
+Benchmark the partitioned complaint store against re-reading a full CSV.
+
+Writes the same generated complaints to a processed CSV and to a
+ComplaintStore, then times a full read and a "last 7 days, descriptor only"
+read from each and checks that they return the same rows.
+
+Usage:
+    python -m backend.benchmarks.bench_complaint_store --records 500000
+    python -m backend.benchmarks.bench_complaint_store --engine npy --by-borough
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from typing import Callable
+
+import pandas as pd
+
+from backend.benchmarks.socrata_stub import generate_311_records
+from backend.services.complaint_store import ComplaintStore
+from backend.services.data_ingestion_service import (
+    _clean_311_frame,
+    apply_311_schema,
+    read_311_csv,
+)
+
+def best_of(repeat: int, fn: Callable[[], pd.DataFrame]):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return result, min(timings)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=200000)
+    parser.add_argument('--engine', choices=['parquet', 'feather', 'npy'], default=None)
+    parser.add_argument('--by-borough', action='store_true')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = apply_311_schema(_clean_311_frame(pd.DataFrame(generate_311_records(args.records))))
+    workdir = tempfile.mkdtemp(prefix='complaint_store_')
+    csv_path = os.path.join(workdir, '311_hpd_processed_data.csv')
+    df.to_csv(csv_path, index=False)
+    store = ComplaintStore(os.path.join(workdir, 'store'), engine=args.engine,
+                           partition_by_borough=args.by_borough)
+    store.write_chunks(df[i:i + 1000] for i in range(0, len(df), 1000))
+
+    since = df['created_date'].max().normalize() - pd.Timedelta(days=7)
+
+    def csv_window() -> pd.DataFrame:
+        full = read_311_csv(csv_path)
+        return full.loc[full['created_date'] >= since, ['descriptor']]
+
+    cases = [
+        ('full read', lambda: read_311_csv(csv_path), lambda: store.read()),
+        ('7 days, descriptor', csv_window, lambda: store.read(columns=['descriptor'], start=since)),
+    ]
+
+    print(f"{len(df)} rows, engine={store.engine}, {len(store.parts)} parts in {workdir}")
+    for name, from_csv, from_store in cases:
+        csv_result, csv_time = best_of(args.repeat, from_csv)
+        store_result, store_time = best_of(args.repeat, from_store)
+        assert sorted(csv_result['descriptor'].astype(str)) == sorted(store_result['descriptor'].astype(str))
+        print(f"{name:>20}: csv {csv_time * 1000:8.1f} ms  store {store_time * 1000:8.1f} ms  "
+              f"({csv_time / store_time:.1f}x, {len(store_result)} rows)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark flag_urgent_complaints against the previous row-by-row implementation.
+
+Generates a complaint frame (stub descriptors, complaint types and
+resolutions, plus free-text resolutions mixing urgent keywords and near
+misses), checks that is_urgent and the matched keyword sets agree with the
+iterrows version on every row, then times both. The vectorized version is
+timed cold (empty text memo) and warm (memo filled by earlier calls).
+
+Usage:
+    python -m backend.benchmarks.bench_flag_urgent --rows 100000
+"""
+
+import argparse
+import logging
+import time
+from typing import Callable
+
+import pandas as pd
+
+from backend.services.ai.nlp_service import (
+    URGENCY_TEXT_COLUMNS,
+    flag_urgent_complaints,
+    get_keyword_matcher,
+    with_urgent_keyword_lists,
+)
+from backend.tests.reference import assert_same_flags, build_complaints, legacy_flag_urgent_complaints
+
+def timed(fn: Callable[[pd.DataFrame], pd.DataFrame], df: pd.DataFrame, repeat: int):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(df)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip-legacy', action='store_true', help='Skip the slow iterrows baseline')
+    args = parser.parse_args()
+    logging.getLogger('backend.services.ai.nlp_service').setLevel(logging.WARNING)
+
+    df = build_complaints(args.rows)
+    get_keyword_matcher().clear_memo()
+    _, cold_elapsed = timed(flag_urgent_complaints, df, 1)
+    flagged, elapsed = timed(flag_urgent_complaints, df, args.repeat)
+    distinct = sum(df[col].nunique() for col in URGENCY_TEXT_COLUMNS)
+    print(f"{len(df)} rows, {distinct} distinct texts, {int(flagged['is_urgent'].sum())} urgent")
+    if not args.skip_legacy:
+        expected, legacy_elapsed = timed(legacy_flag_urgent_complaints, df, 1)
+        assert_same_flags(expected, with_urgent_keyword_lists(flagged))
+        print(f"  iterrows:   {legacy_elapsed * 1000:9.1f} ms (outputs identical)")
+    print(f"  cold memo:  {cold_elapsed * 1000:9.1f} ms")
+    print(f"  warm memo:  {elapsed * 1000:9.1f} ms")
+    if not args.skip_legacy:
+        print(f"  speedup:    {legacy_elapsed / elapsed:9.1f}x")
+
+if __name__ == '__main__':
+    main()
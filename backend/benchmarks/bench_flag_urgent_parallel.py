@@ -0,0 +1,79 @@
+"""
+Measure how sharded urgency flagging scales from 1 to N worker processes.
+
+Builds a backfill-like complaint frame whose resolutions are mostly
+distinct free text (the case where per-value de-duplication no longer
+helps), then times flag_urgent_complaints with a cold text memo for each
+worker count and checks every run against the single-process result.
+
+Usage:
+    python -m backend.benchmarks.bench_flag_urgent_parallel --rows 400000 --workers 1,2,4,8
+"""
+
+import argparse
+import logging
+import os
+import random
+import time
+
+import pandas as pd
+
+from backend.benchmarks.socrata_stub import generate_311_records
+from backend.services.ai.nlp_service import (
+    _acquire_process_pool,
+    _release_process_pool,
+    _scan_shard,
+    flag_urgent_complaints,
+    get_keyword_matcher,
+)
+from backend.services.data_ingestion_service import _clean_311_frame, apply_311_schema
+from backend.tests.reference import build_urgency_corpus
+
+def build_backfill(rows: int, seed: int = 5) -> pd.DataFrame:
+    """Complaints with a distinct free-text resolution on every row."""
+    df = pd.DataFrame(generate_311_records(rows, seed=seed))
+    rng = random.Random(seed)
+    corpus = build_urgency_corpus(5000, seed=seed)
+    df['resolution_description'] = [
+        f"{rng.choice(corpus)} ref {i}" for i in range(rows)
+    ]
+    return apply_311_schema(_clean_311_frame(df))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=400000)
+    parser.add_argument('--workers', default=None,
+                        help='Comma-separated worker counts (default: powers of two up to the core count)')
+    args = parser.parse_args()
+    logging.getLogger('backend.services.ai.nlp_service').setLevel(logging.WARNING)
+
+    cores = os.cpu_count() or 1
+    if args.workers:
+        counts = [int(w) for w in args.workers.split(',')]
+    else:
+        counts = sorted({1, cores} | {2 ** i for i in range(cores.bit_length()) if 2 ** i <= cores})
+
+    df = build_backfill(args.rows)
+    matcher = get_keyword_matcher()
+    print(f"{len(df)} rows, {df['resolution_description'].nunique()} distinct resolutions, {cores} cores")
+
+    baseline = None
+    for workers in counts:
+        # Start the pool and its workers outside the timed run
+        if workers > 1:
+            pool = _acquire_process_pool(workers, matcher.keywords)
+            list(pool.map(_scan_shard, [['warm up']] * workers))
+            _release_process_pool(pool)
+        matcher.clear_memo()
+        start = time.perf_counter()
+        flagged = flag_urgent_complaints(df, workers)
+        elapsed = time.perf_counter() - start
+        if baseline is None:
+            baseline = (flagged, elapsed)
+        else:
+            pd.testing.assert_frame_equal(baseline[0], flagged)
+        print(f"  workers={workers:<3} {elapsed * 1000:9.1f} ms  {len(df) / elapsed:>10.0f} rows/s  "
+              f"{baseline[1] / elapsed:5.2f}x")
+
+if __name__ == '__main__':
+    main()
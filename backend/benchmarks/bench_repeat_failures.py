@@ -0,0 +1,50 @@
+"""
+Benchmark repeat-failure detection on a large work order history.
+
+Generates work orders on a fixed pool of assets, with overlapping work
+orders, missing close dates and missing assets, checks on a sample that
+detect_repeat_failures agrees with a pairwise comparison of every two work
+orders on the same asset, then times it on the full history.
+
+Usage:
+    python -m backend.benchmarks.bench_repeat_failures --rows 5000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from backend.services.ai.rework_predictor_service import DEFAULT_REPEAT_WINDOW_DAYS, detect_repeat_failures
+from backend.tests.reference import pairwise_repeat_failures, random_asset_work_orders
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5000000)
+    parser.add_argument('--assets', type=int, default=200000)
+    parser.add_argument('--window-days', type=float, default=DEFAULT_REPEAT_WINDOW_DAYS)
+    parser.add_argument('--check-rows', type=int, default=1500,
+                        help='Rows checked against the pairwise reference')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    sample = random_asset_work_orders(args.check_rows, max(args.check_rows // 20, 1))
+    expected = pairwise_repeat_failures(sample, args.window_days)
+    actual = detect_repeat_failures(sample, args.window_days)
+    assert actual['previous_wo_id'].tolist() == expected['previous_wo_id'].tolist()
+    np.testing.assert_array_equal(actual['days_since_previous_close'], expected['days_since_previous_close'])
+    assert actual['is_repeat_failure'].tolist() == expected['is_repeat_failure'].tolist()
+    print(f"matches the pairwise comparison on {args.check_rows} rows "
+          f"({int(expected['is_repeat_failure'].sum())} repeat failures)")
+
+    df = random_asset_work_orders(args.rows, args.assets)
+    best = float('inf')
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        result = detect_repeat_failures(df, args.window_days)
+        best = min(best, time.perf_counter() - start)
+    print(f"{len(df)} work orders on {args.assets} assets: {int(result['is_repeat_failure'].sum())} repeat failures "
+          f"in {best:.2f}s ({len(df) / best:.0f} rows/s)")
+
+if __name__ == '__main__':
+    main()
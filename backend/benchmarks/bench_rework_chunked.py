@@ -0,0 +1,83 @@
+"""
+Measure out-of-core rework scoring throughput and peak memory.
+
+Generates a work order history CSV of the requested size (resampled from
+the synthetic assets, contractors and resolutions in data/, with some
+unknown assets and contractors), checks on a sample that chunked scoring
+matches in-memory scoring, then streams the whole file through
+score_work_orders_chunked into a NumPy (default) or CSV sink.
+
+Usage:
+    python -m backend.benchmarks.bench_rework_chunked --rows 10000000 --chunk-rows 250000 --sink npy
+"""
+
+import argparse
+import logging
+import os
+import resource
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from backend.services.ai.rework_predictor_service import (
+    CsvScoreSink,
+    NpyScoreSink,
+    SYNTHETIC_DATA_FILES,
+    enrich_work_orders,
+    score_rework_risk,
+    score_work_orders_chunked,
+    with_risk_factor_lists,
+)
+from backend.tests.reference import DATA_DIR, generate_work_orders_csv
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000000)
+    parser.add_argument('--chunk-rows', type=int, default=250000)
+    parser.add_argument('--check-rows', type=int, default=100000,
+                        help='Rows checked against in-memory scoring')
+    parser.add_argument('--sink', choices=['npy', 'csv'], default='npy')
+    args = parser.parse_args()
+    logging.getLogger('backend.services.ai.rework_predictor_service').setLevel(logging.WARNING)
+
+    assets_path, contractors_path, _ = (os.path.join(DATA_DIR, name) for name in SYNTHETIC_DATA_FILES)
+    with tempfile.TemporaryDirectory(prefix='rework_chunked_') as tmp:
+        # Chunked scoring of a sample, with chunks not dividing it evenly, must match one in-memory pass
+        sample_path = os.path.join(tmp, 'sample.csv')
+        generate_work_orders_csv(sample_path, args.check_rows)
+        expected = with_risk_factor_lists(score_rework_risk(enrich_work_orders(
+            pd.read_csv(sample_path), pd.read_csv(assets_path), pd.read_csv(contractors_path)
+        )))
+        csv_out, npy_out = os.path.join(tmp, 'sample_scores.csv'), os.path.join(tmp, 'sample_scores')
+        for sink in (CsvScoreSink(csv_out), NpyScoreSink(npy_out)):
+            with sink:
+                score_work_orders_chunked(sample_path, assets_path, contractors_path, sink,
+                                          chunk_rows=args.check_rows // 3 + 1)
+        for actual in (pd.read_csv(csv_out, float_precision='round_trip'), NpyScoreSink.read(npy_out)):
+            np.testing.assert_array_equal(actual['predicted_rework_risk_score'], expected['predicted_rework_risk_score'])
+            assert actual['wo_id'].tolist() == expected['wo_id'].tolist()
+            assert actual['predicted_risk_factors'].tolist() == expected['predicted_risk_factors'].map('; '.join).tolist()
+        print(f"chunked scores (CSV and NumPy sinks) match in-memory scoring on {args.check_rows} rows")
+
+        start = time.perf_counter()
+        work_orders_path = os.path.join(tmp, 'work_orders.csv')
+        generate_work_orders_csv(work_orders_path, args.rows)
+        size_mb = os.path.getsize(work_orders_path) / 1e6
+        print(f"generated {args.rows} work orders ({size_mb:.0f} MB) in {time.perf_counter() - start:.1f}s")
+
+        rss_before = peak_rss_mb()
+        output = os.path.join(tmp, 'scores')
+        with (NpyScoreSink(output) if args.sink == 'npy' else CsvScoreSink(f"{output}.csv")) as sink:
+            stats = score_work_orders_chunked(work_orders_path, assets_path, contractors_path, sink,
+                                              chunk_rows=args.chunk_rows)
+        print(f"  {args.sink} sink: scored {stats['rows']} rows in {stats['chunks']} batches: {stats['elapsed_seconds']:.1f}s, "
+              f"{stats['rows_per_second']:.0f} rows/s, {stats['high_risk']} high risk")
+        print(f"  peak RSS {peak_rss_mb():.0f} MB (before scoring {rss_before:.0f} MB)")
+
+if __name__ == '__main__':
+    main()
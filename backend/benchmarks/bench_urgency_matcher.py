@@ -0,0 +1,48 @@
+"""
+Micro-benchmark the compiled URGENT_KEYWORDS matcher against per-keyword regex search.
+
+Builds a corpus of complaint-like texts (the stub's descriptors, complaint
+types and resolutions, plus generated sentences that mix overlapping
+keywords such as 'leak' / 'gas leak' and 'child' / 'children' with near
+misses like 'leaking'), checks that both implementations return identical
+matches for every text, then times them per call.
+
+Usage:
+    python -m backend.benchmarks.bench_urgency_matcher --texts 20000
+"""
+
+import argparse
+import time
+from typing import Callable, List, Tuple
+
+from backend.services.ai.nlp_service import URGENT_KEYWORDS, check_text_for_urgency
+from backend.tests.reference import build_urgency_corpus, legacy_check_text_for_urgency
+
+def time_per_call(fn: Callable[[str], Tuple[bool, List[str]]], texts: List[str], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best / len(texts)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--texts', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    texts = build_urgency_corpus(args.texts)
+    mismatches = [t for t in texts if legacy_check_text_for_urgency(t) != check_text_for_urgency(t)]
+    assert not mismatches, f"{len(mismatches)} mismatches, e.g. {mismatches[0]!r}"
+
+    legacy = time_per_call(legacy_check_text_for_urgency, texts, args.repeat)
+    compiled = time_per_call(check_text_for_urgency, texts, args.repeat)
+    print(f"{len(texts)} texts, {len(URGENT_KEYWORDS)} keywords (outputs identical)")
+    print(f"  per-keyword re.search: {legacy * 1e6:7.2f} us/text")
+    print(f"    compiled matcher:    {compiled * 1e6:7.2f} us/text")
+    print(f"             speedup:    {legacy / compiled:7.1f}x")
+
+if __name__ == '__main__':
+    main()
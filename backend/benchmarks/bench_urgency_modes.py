@@ -0,0 +1,53 @@
+"""
+Compare urgency detection throughput across rules, model and both modes.
+
+Trains the hashing-vectorizer urgency model on keyword-labelled stub
+complaints, saves and memory-maps it back, then times flag_urgent_complaints
+in each mode on a larger frame with a cold keyword memo and reports how
+often the model agrees with the rules.
+
+Usage:
+    python -m backend.benchmarks.bench_urgency_modes --train-rows 50000 --rows 500000
+"""
+
+import argparse
+import logging
+import tempfile
+import time
+
+from backend.services.ai.nlp_service import URGENCY_MODES, flag_urgent_complaints, get_keyword_matcher
+from backend.services.ai.urgency_model import UrgencyModel, train_urgency_model
+from backend.tests.reference import build_complaints
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--train-rows', type=int, default=50000)
+    parser.add_argument('--rows', type=int, default=500000)
+    args = parser.parse_args()
+    logging.getLogger('backend.services.ai.nlp_service').setLevel(logging.WARNING)
+
+    start = time.perf_counter()
+    trained = train_urgency_model(build_complaints(args.train_rows, seed=3))
+    train_elapsed = time.perf_counter() - start
+    model_dir = trained.save(tempfile.mkdtemp(prefix='urgency_model_') + '/model')
+
+    start = time.perf_counter()
+    model = UrgencyModel.load(model_dir)
+    load_elapsed = time.perf_counter() - start
+    print(f"trained on {args.train_rows} rows in {train_elapsed:.2f}s, loaded in {load_elapsed * 1000:.2f} ms")
+
+    df = build_complaints(args.rows)
+    results = {}
+    for mode in URGENCY_MODES:
+        get_keyword_matcher().clear_memo()
+        start = time.perf_counter()
+        results[mode] = flag_urgent_complaints(df, mode=mode, model=model)
+        elapsed = time.perf_counter() - start
+        print(f"  {mode:>5}: {elapsed * 1000:9.1f} ms  {len(df) / elapsed:>10.0f} rows/s  "
+              f"{int(results[mode]['is_urgent'].sum())} urgent")
+
+    agreement = (results['rules']['is_urgent'] == results['model']['is_urgent']).mean()
+    print(f"model agrees with rules on {agreement:.2%} of rows")
+
+if __name__ == '__main__':
+    main()
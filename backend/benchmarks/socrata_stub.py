@@ -0,0 +1,197 @@
+"""
+Local stand-in for the NYC OpenData (Socrata) 311 endpoint.
+
+Serves a deterministic synthetic complaint dataset over HTTP so ingestion
+throughput can be measured without touching the real API. Supports the
+subset of SoQL parameters used by data_ingestion_service.
+"""
+
+import csv
+import io
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional
+from urllib.parse import urlparse, parse_qs
+
+COMPLAINT_TYPES = [
+    'HEAT/HOT WATER', 'PLUMBING', 'PAINT/PLASTER', 'UNSANITARY CONDITION',
+    'DOOR/WINDOW', 'WATER LEAK', 'ELECTRIC', 'GENERAL', 'FLOORING/STAIRS',
+    'APPLIANCE', 'ELEVATOR', 'SAFETY'
+]
+DESCRIPTORS = [
+    'ENTIRE BUILDING', 'APARTMENT ONLY', 'MOLD', 'HEAVY FLOW', 'SLOW LEAK',
+    'PESTS', 'DOOR', 'WINDOW GLASS', 'LIGHTING', 'OUTLET OR SWITCH',
+    'BATHTUB/SHOWER', 'TOILET', 'CEILING', 'WALL', 'SMOKE DETECTOR',
+    'CARBON MONOXIDE DETECTOR', 'GAS LEAK', 'NO HEAT', 'WATER DAMAGE', 'FIRE'
+]
+RESOLUTIONS = [
+    'The Department of Housing Preservation and Development inspected the following conditions. No violations were issued.',
+    'The Department of Housing Preservation and Development was not able to gain access to inspect the conditions.',
+    'The Department of Housing Preservation and Development responded to a complaint of no heat and the heat was restored.',
+    'The complaint you filed is a duplicate of a condition already reported.',
+    ''
+]
+BOROUGHS = ['BRONX', 'BROOKLYN', 'MANHATTAN', 'QUEENS', 'STATEN ISLAND']
+CSV_FIELDS = [
+    'unique_key', 'created_date', 'agency', 'complaint_type',
+    'descriptor', 'resolution_description', 'incident_address',
+    'borough', 'bbl', 'latitude', 'longitude'
+]
+
+def generate_311_records(num_records: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """
+    Generate synthetic 311 records shaped like the Socrata JSON payload.
+
+    Records are sorted by created_date and unique_key descending, matching the
+    order requested by the ingestion service. All values are strings, as
+    Socrata returns them.
+    """
+    rng = random.Random(seed)
+    end = datetime(2025, 6, 1)
+    records = []
+    for i in range(num_records):
+        created = end - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+        record = {
+            'unique_key': str(60000000 + i),
+            'created_date': created.strftime('%Y-%m-%dT%H:%M:%S.000'),
+            'agency': 'HPD',
+            'complaint_type': rng.choice(COMPLAINT_TYPES),
+            'descriptor': rng.choice(DESCRIPTORS),
+            'resolution_description': rng.choice(RESOLUTIONS),
+            'incident_address': f"{rng.randint(1, 2000)} {rng.choice(['BROADWAY', 'GRAND CONCOURSE', 'FULTON STREET', 'MAIN STREET'])}",
+            'borough': rng.choice(BOROUGHS),
+            'bbl': str(rng.randint(1000000000, 5999999999)),
+            'latitude': f"{40.5 + rng.random() * 0.4:.8f}",
+            'longitude': f"{-74.25 + rng.random() * 0.5:.8f}"
+        }
+        if not record['resolution_description']:
+            del record['resolution_description']
+        records.append(record)
+    records.sort(key=lambda r: (r['created_date'], r['unique_key']), reverse=True)
+    return records
+
+def records_to_csv(records: List[Dict[str, Any]]) -> str:
+    """Serialize records the way Socrata's .csv endpoint does (nulls as empty fields)."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(records)
+    return buffer.getvalue()
+
+class SocrataStubServer:
+    """
+    Threaded HTTP server answering paged 311 queries from an in-memory dataset.
+
+    Args:
+        records: Records to serve, already in the requested order.
+        latency: Seconds of artificial server latency per request.
+        port: Port to bind on localhost; 0 picks a free port.
+        throttle_every: Answer every Nth request with 429 Too Many Requests
+            (and Retry-After: 0) to exercise client backoff. 0 disables it.
+    """
+
+    def __init__(
+        self,
+        records: List[Dict[str, Any]],
+        latency: float = 0.0,
+        port: int = 0,
+        throttle_every: int = 0
+    ):
+        self.records = records
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/resource/erm2-nwe9.json"
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.request_count += 1
+                    throttled = stub.throttle_every and stub.request_count % stub.throttle_every == 0
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if throttled:
+                    self.send_response(429)
+                    self.send_header('Retry-After', '0')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                query = parse_qs(urlparse(self.path).query)
+                limit = int(query.get('$limit', ['1000'])[0])
+                offset = int(query.get('$offset', ['0'])[0])
+                rows = stub.select(
+                    query.get('$where', [''])[0],
+                    query.get('$order', ['created_date DESC'])[0]
+                )
+                page = rows[offset:offset + limit]
+
+                if urlparse(self.path).path.endswith('.csv'):
+                    body = records_to_csv(page).encode('utf-8')
+                    content_type = 'text/csv'
+                else:
+                    body = json.dumps(page).encode('utf-8')
+                    content_type = 'application/json'
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def select(self, where: str, order: str) -> List[Dict[str, Any]]:
+        """Apply the created_date lower bound, keyset cursor and sort order of a query."""
+        rows = self.records
+        lower = re.search(r"created_date >= '([^']+)'", where)
+        if lower:
+            rows = [r for r in rows if r['created_date'] >= lower.group(1)]
+        if 'ASC' in order:
+            rows = rows[::-1]
+
+        # Keyset seek: created_date < 'c' OR (created_date = 'c' AND unique_key < 'k')
+        seek = re.search(r"created_date ([<>]) '([^']+)' OR \(created_date = '[^']+' AND unique_key [<>] '([^']+)'\)", where)
+        if seek:
+            op, created, key = seek.groups()
+            cursor = (created, key)
+            if op == '<':
+                rows = [r for r in rows if (r['created_date'], r['unique_key']) < cursor]
+            else:
+                rows = [r for r in rows if (r['created_date'], r['unique_key']) > cursor]
+        return rows
+
+    def start(self) -> 'SocrataStubServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'SocrataStubServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -3,42 +3,25 @@ NLP Service for NYCHA QualityGuard Pro
 Handles natural language processing tasks for complaint analysis.
 """
 
+import gc
+import os
 import re
+import time
 import logging
-from typing import List, Tuple, Dict, Any
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import List, Tuple, Dict, Any, Iterable, Iterator, Optional
+import numpy as np
 import pandas as pd
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
+
+from backend.services.ai.urgency_model import UrgencyModel, get_urgency_model
+from backend.services.ai.urgency_result_store import UrgencyResultStore, text_hashes, urgency_version
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-def ensure_nltk_resources():
-    """
-    Ensure all required NLTK resources are downloaded.
-    This function should be called once when the module is imported.
-    """
-    required_resources = {
-        'tokenizers/punkt': 'punkt',
-        'corpora/stopwords': 'stopwords'
-    }
-    
-    for resource_path, resource_name in required_resources.items():
-        try:
-            nltk.data.find(resource_path)
-            logger.debug(f"NLTK resource '{resource_name}' is already downloaded")
-        except LookupError:
-            logger.info(f"Downloading NLTK resource '{resource_name}'...")
-            nltk.download(resource_name, quiet=True)
-            logger.info(f"Successfully downloaded NLTK resource '{resource_name}'")
-
-# Download required NLTK resources
-ensure_nltk_resources()
-
-# Get English stopwords
-STOPWORDS = set(stopwords.words('english'))
-
 # Define urgent keywords and phrases
 URGENT_KEYWORDS = [
     # Safety and Health
@@ -66,6 +49,280 @@ URGENT_KEYWORDS = [
     'illegal entry', 'forced entry'
 ]
 
+# Severity weight of each urgent keyword; a complaint's urgency_score is the
+# sum of the weights of the distinct keywords it mentions
+URGENT_KEYWORD_WEIGHTS = {
+    # Immediate danger to life
+    'fire': 1.0, 'smoke': 0.8, 'gas leak': 1.0, 'carbon monoxide': 1.0,
+    'collapse': 0.9, 'ceiling collapse': 1.0, 'wall collapse': 1.0,
+    'unsafe': 0.6, 'dangerous': 0.7, 'hazard': 0.6,
+
+    # Loss of essential services
+    'no heat': 0.8, 'no hot water': 0.6, 'no water': 0.7,
+    'no electricity': 0.7, 'power outage': 0.7,
+    'elevator stuck': 0.8, 'elevator broken': 0.5,
+
+    # Health conditions
+    'mold': 0.4, 'asbestos': 0.6, 'lead': 0.6, 'infestation': 0.4,
+    'flood': 0.7, 'water damage': 0.4, 'leak': 0.3,
+
+    # Vulnerable residents raise the stakes of any condition
+    'child': 0.3, 'children': 0.3, 'baby': 0.4, 'infant': 0.4,
+    'elderly': 0.3, 'senior': 0.3, 'disabled': 0.3,
+    'medical': 0.4, 'health': 0.2, 'emergency': 0.6,
+
+    # Building security
+    'broken window': 0.4, 'broken door': 0.4,
+    'break in': 0.6, 'intruder': 0.7, 'squatter': 0.4,
+    'illegal entry': 0.5, 'forced entry': 0.6
+}
+
+# Weight of keywords added to URGENT_KEYWORDS without an explicit weight
+DEFAULT_KEYWORD_WEIGHT = 0.5
+
+# Urgency detection modes: keyword rules, the learned model, or either
+URGENCY_MODES = ('rules', 'model', 'both')
+
+# Complaint columns scanned for urgent keywords
+URGENCY_TEXT_COLUMNS = ['descriptor', 'complaint_type', 'resolution_description']
+
+# Matched keywords are stored as a uint64 bitmask per complaint
+MAX_MASK_KEYWORDS = 64
+
+# Distinct texts whose keyword matches are remembered per matcher
+URGENCY_MEMO_SIZE = 50000
+
+# Fewer unmatched distinct texts than this are scanned in-process even when
+# workers are requested; below it, pool dispatch costs more than it saves
+PARALLEL_MIN_TEXTS = 20000
+
+# Shards dispatched per worker, to even out uneven text lengths
+SHARDS_PER_WORKER = 4
+
+class KeywordMatcher:
+    """
+    Whole-word keyword and phrase matcher backed by one compiled pattern.
+
+    Matches exactly what a separate ``re.search(r'\\b' + re.escape(kw) + r'\\b')``
+    per keyword would, in a single pass over the text. The pattern is a
+    zero-width lookahead over an alternation ordered longest first, so at
+    each word boundary it reports the longest keyword ending on a word
+    boundary. Shorter keywords that also match there are necessarily
+    prefixes of it, and are precomputed.
+
+    Series are matched per distinct value, with a bounded LRU memo of
+    text -> matches kept across calls, so repeated descriptors and
+    templated resolutions are only ever scanned once per worker.
+
+    Args:
+        keywords: Lowercase keywords and phrases to look for.
+        memo_size: Maximum number of distinct texts remembered.
+    """
+
+    def __init__(self, keywords: Iterable[str], memo_size: int = URGENCY_MEMO_SIZE):
+        self.keywords = tuple(keywords)
+        # Distinct keywords in list order; the columns of match_matrix
+        self.vocabulary = tuple(dict.fromkeys(kw for kw in self.keywords if kw))
+        candidates = sorted(self.vocabulary, key=len, reverse=True)
+        self._pattern = re.compile(
+            r'\b(?=(' + '|'.join(re.escape(kw) for kw in candidates) + r')\b)'
+        ) if candidates else None
+        # Keywords that match wherever a longer keyword starting with them does
+        self._implied = {
+            kw: [
+                prefix for prefix in candidates
+                if len(prefix) < len(kw) and re.match(re.escape(prefix) + r'\b', kw)
+            ]
+            for kw in candidates
+        }
+        self._column = {kw: i for i, kw in enumerate(self.vocabulary)}
+        self._implied_columns = [
+            (self._column[kw], self._column[prefix])
+            for kw, prefixes in self._implied.items() for prefix in prefixes
+        ]
+        self.memo_size = memo_size
+        self._memo: 'OrderedDict[str, np.ndarray]' = OrderedDict()
+        self._memo_lock = threading.Lock()
+        self.memo_hits = 0
+        self.memo_misses = 0
+
+    def match(self, text: str) -> List[str]:
+        """
+        Find the keywords occurring in a text as whole words.
+
+        Args:
+            text (str): The text to search; matched case-insensitively.
+
+        Returns:
+            List[str]: Matched keywords in keyword-list order.
+        """
+        if self._pattern is None or not isinstance(text, str) or not text.strip():
+            return []
+        found = set()
+        for match in self._pattern.finditer(text.lower()):
+            keyword = match.group(1)
+            found.add(keyword)
+            found.update(self._implied[keyword])
+        if not found:
+            return []
+        return [kw for kw in self.keywords if kw in found]
+
+    def match_matrix(self, texts: pd.Series, workers: int = 1) -> np.ndarray:
+        """
+        Match a whole Series of texts.
+
+        The Series is factorized and each distinct value is matched once
+        (or taken from the memo); rows are filled in through the codes, so
+        the cost grows with the number of distinct texts, not rows.
+
+        Args:
+            texts (pd.Series): Texts to search; missing values never match.
+            workers (int, optional): Processes to spread the scan of
+                unmatched distinct texts over. Defaults to 1 (in-process).
+
+        Returns:
+            np.ndarray: Boolean array of shape (len(texts), len(vocabulary))
+                that is True where the keyword occurs in the text.
+        """
+        codes, uniques = pd.factorize(texts)
+        # Extra all-False row for missing values (code -1)
+        unique_hits = np.zeros((len(uniques) + 1, len(self.vocabulary)), dtype=bool)
+        unique_hits[:-1] = self._match_distinct([str(value) for value in uniques], workers)
+        return unique_hits[codes]
+
+    def memo_info(self) -> Dict[str, int]:
+        """Memo statistics, in the spirit of functools' cache_info()."""
+        with self._memo_lock:
+            return {
+                'hits': self.memo_hits,
+                'misses': self.memo_misses,
+                'size': len(self._memo),
+                'max_size': self.memo_size
+            }
+
+    def clear_memo(self) -> None:
+        """Forget every remembered text and reset the statistics."""
+        with self._memo_lock:
+            self._memo.clear()
+            self.memo_hits = self.memo_misses = 0
+
+    def _match_distinct(self, texts: List[str], workers: int = 1) -> np.ndarray:
+        """Match distinct texts, scanning only those not already in the memo."""
+        hits = np.zeros((len(texts), len(self.vocabulary)), dtype=bool)
+        missing = []
+        with self._memo_lock:
+            for i, text in enumerate(texts):
+                row = self._memo.get(text)
+                if row is None:
+                    missing.append(i)
+                else:
+                    self._memo.move_to_end(text)
+                    hits[i] = row
+            self.memo_hits += len(texts) - len(missing)
+            self.memo_misses += len(missing)
+        if not missing:
+            return hits
+
+        if workers > 1 and len(missing) >= PARALLEL_MIN_TEXTS:
+            scanned = self._scan_parallel([texts[i] for i in missing], workers)
+        else:
+            scanned = self._scan([texts[i] for i in missing])
+        hits[missing] = scanned
+        with self._memo_lock:
+            for i, row in zip(missing, scanned):
+                self._memo[texts[i]] = row
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return hits
+
+    def _scan_parallel(self, texts: List[str], workers: int) -> np.ndarray:
+        """Scan texts in contiguous shards on the process pool, keeping their order."""
+        shard_size = -(-len(texts) // (workers * SHARDS_PER_WORKER))
+        shards = [texts[i:i + shard_size] for i in range(0, len(texts), shard_size)]
+        pool = _acquire_process_pool(workers, self.keywords)
+        try:
+            return np.concatenate(list(pool.map(_scan_shard, shards)))
+        finally:
+            _release_process_pool(pool)
+
+    def _scan(self, texts: List[str]) -> np.ndarray:
+        """Run the compiled pattern over every text."""
+        hits = np.zeros((len(texts), len(self.vocabulary)), dtype=bool)
+        if self._pattern is None or not texts:
+            return hits
+
+        # findall reports the longest keyword at each word boundary
+        found = pd.Series(texts, dtype=object).str.lower().str.findall(self._pattern).explode().dropna()
+        if not found.empty:
+            hits[found.index.to_numpy(), found.map(self._column).to_numpy(dtype=np.intp)] = True
+            # Add the shorter keywords each longest match implies
+            for column, prefix_column in self._implied_columns:
+                hits[:, prefix_column] |= hits[:, column]
+        return hits
+
+@lru_cache(maxsize=8)
+def _build_keyword_matcher(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher(keywords)
+
+def get_keyword_matcher(keywords: Optional[Iterable[str]] = None) -> KeywordMatcher:
+    """
+    Return the compiled matcher for a keyword set, URGENT_KEYWORDS by default.
+    A matcher is built once per distinct keyword set, so edits to
+    URGENT_KEYWORDS take effect on the next call.
+    """
+    return _build_keyword_matcher(tuple(URGENT_KEYWORDS if keywords is None else keywords))
+
+# Matcher compiled once per pool worker by _init_scan_worker
+_worker_matcher: Optional[KeywordMatcher] = None
+
+def _init_scan_worker(keywords: Tuple[str, ...]) -> None:
+    global _worker_matcher
+    _worker_matcher = KeywordMatcher(keywords, memo_size=0)
+
+def _scan_shard(texts: List[str]) -> np.ndarray:
+    return _worker_matcher._scan(texts)
+
+# Process pool shared by every parallel scan in this process
+_scan_pool: Optional[ProcessPoolExecutor] = None
+_scan_pool_key: Optional[Tuple[int, Tuple[str, ...]]] = None
+# Callers currently mapping on each live pool, including replaced ones
+_scan_pool_users: Dict[ProcessPoolExecutor, int] = {}
+_scan_pool_lock = threading.Lock()
+
+def _acquire_process_pool(workers: int, keywords: Tuple[str, ...]) -> ProcessPoolExecutor:
+    """
+    Return the scan pool, with the keyword matcher preloaded in every worker,
+    and count the caller as one of its users. Every call must be paired with
+    _release_process_pool.
+
+    The pool is kept between calls and only replaced when the worker count
+    or keyword set changes. A replaced pool is shut down once its last user
+    releases it, so scans already mapping on it finish normally.
+    """
+    global _scan_pool, _scan_pool_key
+    with _scan_pool_lock:
+        if _scan_pool_key != (workers, keywords):
+            previous = _scan_pool
+            _scan_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_scan_worker,
+                initargs=(keywords,)
+            )
+            _scan_pool_key = (workers, keywords)
+            if previous is not None and not _scan_pool_users.get(previous):
+                _scan_pool_users.pop(previous, None)
+                previous.shutdown(wait=False)
+        _scan_pool_users[_scan_pool] = _scan_pool_users.get(_scan_pool, 0) + 1
+        return _scan_pool
+
+def _release_process_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop one user of a pool, shutting it down if it was replaced and is now idle."""
+    with _scan_pool_lock:
+        _scan_pool_users[pool] -= 1
+        if _scan_pool_users[pool] == 0 and pool is not _scan_pool:
+            del _scan_pool_users[pool]
+            pool.shutdown(wait=False)
+
 def check_text_for_urgency(text: str) -> Tuple[bool, List[str]]:
     """
     Check if a text contains any urgent keywords or phrases.
@@ -78,86 +335,273 @@ def check_text_for_urgency(text: str) -> Tuple[bool, List[str]]:
             - Boolean indicating if any urgent keywords were found
             - List of matched urgent keywords/phrases
     """
-    if not isinstance(text, str) or not text.strip():
-        return False, []
-    
-    # Tokenize and convert to lowercase
-    tokens = word_tokenize(text.lower())
-    text_lower = text.lower()
-    
-    # Remove stopwords from tokens for potential future use
-    tokens_no_stopwords = [token for token in tokens if token not in STOPWORDS]
-    
-    # Find matches
-    matches = []
-    for keyword in URGENT_KEYWORDS:
-        # Use regex for phrase matching
-        if re.search(r'\b' + re.escape(keyword) + r'\b', text_lower):
-            matches.append(keyword)
-    
+    matches = get_keyword_matcher().match(text)
     return bool(matches), matches
 
-def flag_urgent_complaints(df: pd.DataFrame) -> pd.DataFrame:
+def keyword_weight_vector(vocabulary: Iterable[str]) -> np.ndarray:
+    """Severity weights aligned with a matcher's vocabulary."""
+    return np.array(
+        [URGENT_KEYWORD_WEIGHTS.get(kw, DEFAULT_KEYWORD_WEIGHT) for kw in vocabulary],
+        dtype=np.float64
+    )
+
+def keyword_masks(hits: np.ndarray) -> np.ndarray:
+    """
+    Pack a keyword hit matrix into one uint64 per row; bit j stands for
+    vocabulary[j].
+
+    Raises:
+        ValueError: If the vocabulary has more than MAX_MASK_KEYWORDS keywords.
+    """
+    if hits.shape[1] > MAX_MASK_KEYWORDS:
+        raise ValueError(f"Keyword masks hold at most {MAX_MASK_KEYWORDS} keywords, got {hits.shape[1]}")
+    packed = np.packbits(hits, axis=1, bitorder='little')
+    packed = np.pad(packed, ((0, 0), (0, 8 - packed.shape[1])))
+    return packed.view('<u8').ravel().astype(np.uint64)
+
+def keyword_lists(masks: np.ndarray, vocabulary: Tuple[str, ...]) -> List[List[str]]:
+    """
+    Turn keyword masks into one keyword list per row, in vocabulary order.
+
+    Each distinct mask is decoded once and copied to its rows, so the cost
+    is per distinct combination rather than per keyword hit.
+    """
+    pattern_ids, uniques = pd.factorize(np.asarray(masks, dtype=np.uint64))
+    bits = [np.uint64(1) << np.uint64(j) for j in range(len(vocabulary))]
+    decoded = [[kw for kw, bit in zip(vocabulary, bits) if mask & bit] for mask in uniques]
+
+    # Allocating millions of small lists otherwise triggers repeated full
+    # garbage collections; these lists cannot form reference cycles.
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return [list(decoded[pattern_id]) for pattern_id in pattern_ids.tolist()]
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+def _mask_vocabulary(df: pd.DataFrame) -> Tuple[str, ...]:
+    """Vocabulary the 'urgent_keyword_mask' bits of df refer to."""
+    return tuple(df.attrs.get('urgent_keyword_vocabulary', get_keyword_matcher().vocabulary))
+
+def has_urgent_keyword(df: pd.DataFrame, keyword: str) -> np.ndarray:
+    """
+    Rows of flagged complaints that mention keyword, as a boolean array;
+    a bitwise test on 'urgent_keyword_mask'.
+
+    Raises:
+        KeyError: If keyword is not an urgent keyword.
+    """
+    vocabulary = _mask_vocabulary(df)
+    if keyword not in vocabulary:
+        raise KeyError(f"Not an urgent keyword: {keyword!r}")
+    bit = np.uint64(1) << np.uint64(vocabulary.index(keyword))
+    return (df['urgent_keyword_mask'].to_numpy(dtype=np.uint64) & bit) != 0
+
+def with_urgent_keyword_lists(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add readable 'urgent_keywords_found' lists to flagged complaints.
+
+    Decode only the rows being returned (e.g. after top_urgent_complaints),
+    just before serializing.
+    """
+    df = df.copy(deep=False)
+    df['urgent_keywords_found'] = keyword_lists(df['urgent_keyword_mask'].to_numpy(), _mask_vocabulary(df))
+    return df
+
+def _detect_urgency(
+    df: pd.DataFrame,
+    matcher: KeywordMatcher,
+    workers: int,
+    mode: str,
+    model: Optional[UrgencyModel]
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Compute keyword hits and, in model modes, the model probability for every row."""
+    hits = np.zeros((len(df), len(matcher.vocabulary)), dtype=bool)
+    if mode != 'model':
+        # Combine keyword hits across the text columns
+        for col in URGENCY_TEXT_COLUMNS:
+            if col in df.columns:
+                hits |= matcher.match_matrix(df[col], workers)
+    probability = model.predict_proba(df) if mode != 'rules' else None
+    return hits, probability
+
+def flag_urgent_complaints(
+    df: pd.DataFrame,
+    workers: Optional[int] = 1,
+    mode: str = 'rules',
+    model: Optional[UrgencyModel] = None,
+    result_store: Optional[UrgencyResultStore] = None
+) -> pd.DataFrame:
     """
     Flag urgent complaints in the DataFrame based on text analysis.
     
+    Each text column is matched as a whole Series and the per-column
+    keyword hits are combined as arrays; no per-row analysis is done.
+    In 'model' and 'both' modes the learned urgency model also scores every
+    complaint; if no model has been trained the keyword rules are used.
+    
+    With a result_store, complaints already analyzed under the same keyword
+    set, mode and model, and whose text has not changed since, are taken
+    from the store; only the rest are analyzed and then stored.
+    
     Args:
         df (pd.DataFrame): Input DataFrame containing complaint data.
             Expected columns: 'descriptor', 'complaint_type', 'resolution_description'
+        workers (int, optional): Processes used to scan distinct texts, for
+            large backfills. None uses every core. Small inputs are always
+            handled in-process. Defaults to 1.
+        mode (str, optional): 'rules' (keyword rules), 'model' (learned
+            model) or 'both' (urgent if either says so). Defaults to 'rules'.
+        model (UrgencyModel, optional): Model to use instead of the saved one.
+        result_store (UrgencyResultStore, optional): Persistent results
+            keyed by 'unique_key'.
     
     Returns:
         pd.DataFrame: DataFrame with added columns:
             - 'is_urgent': Boolean indicating if complaint is urgent
-            - 'urgent_keywords_found': List of matched urgent keywords
+            - 'urgent_keyword_mask': Matched urgent keywords as a uint64
+              bitmask over the matcher's vocabulary (kept in
+              df.attrs['urgent_keyword_vocabulary']; 0 in 'model' mode).
+              with_urgent_keyword_lists decodes it, has_urgent_keyword
+              filters on it
+            - 'urgency_score': Sum of URGENT_KEYWORD_WEIGHTS over the
+              matched keywords (0.0 when none matched); in 'model' mode the
+              model's probability, in 'both' mode the two added
+            - 'urgency_probability': The model's probability ('model' and
+              'both' modes only)
     """
-    logger.info("Starting urgent complaint analysis...")
+    if mode not in URGENCY_MODES:
+        raise ValueError(f"Unknown urgency mode: {mode}")
+    logger.info(f"Starting urgent complaint analysis ({mode})...")
+    start = time.perf_counter()
     
     # Create a copy to avoid modifying the original
     df = df.copy()
     
-    # Initialize new columns
-    df['is_urgent'] = False
-    df['urgent_keywords_found'] = [[] for _ in range(len(df))]
+    if mode != 'rules':
+        model = model or get_urgency_model()
+        if model is None:
+            logger.warning("No urgency model has been trained; using keyword rules only")
+            mode = 'rules'
     
-    # Columns to check for urgency
-    text_columns = ['descriptor', 'complaint_type', 'resolution_description']
+    matcher = get_keyword_matcher()
+    workers = workers or os.cpu_count() or 1
     
-    # Process each row
-    for idx, row in df.iterrows():
-        all_matches = []
+    keys = None
+    if result_store is not None:
+        try:
+            keys = df['unique_key'].to_numpy(dtype=np.int64)
+        except (KeyError, TypeError, ValueError):
+            logger.warning("Complaints lack integer unique_key values; not using stored urgency results")
+    
+    if keys is None:
+        hits, probability = _detect_urgency(df, matcher, workers, mode, model)
+    else:
+        version = urgency_version(matcher.vocabulary, mode, model.identity if mode != 'rules' else None)
+        hashes = text_hashes(df, URGENCY_TEXT_COLUMNS)
+        found, stored_hits, stored_probability = result_store.lookup(version, keys, hashes)
+        todo = ~found
         
-        # Check each text column
-        for col in text_columns:
-            if col in row and pd.notna(row[col]):
-                is_urgent, matches = check_text_for_urgency(str(row[col]))
-                if is_urgent:
-                    all_matches.extend(matches)
+        new_hits, new_probability = _detect_urgency(df[todo], matcher, workers, mode, model)
+        hits = np.zeros((len(df), len(matcher.vocabulary)), dtype=bool)
+        hits[todo] = new_hits
+        hits[found] = np.unpackbits(stored_hits, axis=1, count=len(matcher.vocabulary)).astype(bool)
+        probability = None
+        if new_probability is not None:
+            probability = np.empty(len(df), dtype=np.float64)
+            probability[todo] = new_probability
+            probability[found] = stored_probability
         
-        # Update row with results
-        if all_matches:
-            df.at[idx, 'is_urgent'] = True
-            df.at[idx, 'urgent_keywords_found'] = list(set(all_matches))  # Remove duplicates
+        result_store.save(
+            version, keys[todo], hashes[todo], np.packbits(new_hits, axis=1),
+            new_probability if new_probability is not None else np.full(int(todo.sum()), np.nan)
+        )
+        logger.info(f"Reused stored urgency results for {int(found.sum())} complaints; analyzed {int(todo.sum())}")
+    
+    df['is_urgent'] = hits.any(axis=1)
+    df['urgent_keyword_mask'] = keyword_masks(hits)
+    df.attrs['urgent_keyword_vocabulary'] = matcher.vocabulary
+    df['urgency_score'] = hits @ keyword_weight_vector(matcher.vocabulary)
+    if probability is not None:
+        df['is_urgent'] |= probability >= model.threshold
+        df['urgency_score'] += probability
+        df['urgency_probability'] = probability
     
     # Log results
     urgent_count = df['is_urgent'].sum()
-    logger.info(f"Found {urgent_count} urgent complaints out of {len(df)} total complaints")
+    elapsed = time.perf_counter() - start
+    logger.info(f"Found {urgent_count} urgent complaints out of {len(df)} total complaints "
+                f"({mode}: {elapsed:.2f}s, {len(df) / max(elapsed, 1e-9):.0f} rows/s)")
     
     # Log distribution of urgent keywords
-    keyword_counts = {}
-    for keywords in df[df['is_urgent']]['urgent_keywords_found']:
-        for keyword in keywords:
-            keyword_counts[keyword] = keyword_counts.get(keyword, 0) + 1
+    keyword_counts = dict(zip(matcher.vocabulary, hits.sum(axis=0).tolist()))
     
     logger.info("Top urgent keywords found:")
     for keyword, count in sorted(keyword_counts.items(), key=lambda x: x[1], reverse=True)[:10]:
-        logger.info(f"  - {keyword}: {count} occurrences")
+        if count:
+            logger.info(f"  - {keyword}: {count} occurrences")
     
     return df
 
+def top_urgent_complaints(df: pd.DataFrame, n: Optional[int] = 5) -> pd.DataFrame:
+    """
+    Select the most urgent complaints.
+
+    Uses partial selection (np.partition) to find the n-th highest score and
+    only sorts the rows above it, so picking a handful of complaints out of
+    a large frame does not sort the whole frame. Ties are broken by row
+    order, exactly as a stable descending sort would.
+
+    Args:
+        df (pd.DataFrame): Complaints. Flagged with flag_urgent_complaints
+            first if 'urgency_score' is missing.
+        n (int, optional): Number of complaints to return. None returns all
+            urgent complaints. Defaults to 5.
+
+    Returns:
+        pd.DataFrame: Up to n urgent complaints, highest urgency_score first.
+    """
+    if 'urgency_score' not in df.columns:
+        df = flag_urgent_complaints(df)
+
+    candidates = np.flatnonzero(df['is_urgent'].to_numpy(dtype=bool))
+    scores = df['urgency_score'].to_numpy(dtype=np.float64)[candidates]
+    if n is not None and n < len(candidates):
+        if n <= 0:
+            return df.iloc[[]]
+        kth = np.partition(scores, len(scores) - n)[len(scores) - n]
+        above = scores > kth
+        tied = np.flatnonzero(scores == kth)[:n - int(above.sum())]
+        keep = np.concatenate([np.flatnonzero(above), tied])
+        candidates, scores = candidates[keep], scores[keep]
+
+    # Highest score first, earlier rows first among equal scores
+    order = np.lexsort((candidates, -scores))
+    return df.iloc[candidates[order]]
+
+def flag_urgent_complaint_chunks(
+    chunks: Iterable[pd.DataFrame],
+    workers: Optional[int] = 1,
+    mode: str = 'rules'
+) -> Iterator[pd.DataFrame]:
+    """
+    Flag urgent complaints chunk by chunk as they arrive from a stream.
+    
+    Args:
+        chunks: Iterable of complaint DataFrames, e.g. from
+            data_ingestion_service.stream_311_data.
+        workers, mode: Passed through to flag_urgent_complaints.
+    
+    Yields:
+        pd.DataFrame: Each chunk with 'is_urgent' and 'urgent_keyword_mask' added.
+    """
+    for chunk in chunks:
+        yield flag_urgent_complaints(chunk, workers, mode)
+
 if __name__ == '__main__':
     # Example usage
     import sys
-    import os
     sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
     
     from services.data_ingestion_service import fetch_and_process_311_data
@@ -175,7 +619,7 @@ if __name__ == '__main__':
         
         # Show some examples
         print("\nExample urgent complaints:")
-        urgent_examples = df_flagged[df_flagged['is_urgent']].head()
+        urgent_examples = with_urgent_keyword_lists(df_flagged[df_flagged['is_urgent']].head())
         for _, row in urgent_examples.iterrows():
             print(f"\nComplaint Type: {row['complaint_type']}")
             print(f"Descriptor: {row['descriptor']}")
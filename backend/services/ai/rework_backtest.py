@@ -0,0 +1,359 @@
+"""
+Rework Backtest for NYCHA QualityGuard Pro
+Measures how well rework rule sets predict actual_rework_needed and grid-searches their parameters.
+
+Candidates are variations of a base rule set (see rework_rules), produced
+from a grid of parameter paths:
+    {"asset_age.0.value": [12, 15, 18], "contractor_propensity.0.score": [0.2, 0.25, 0.3]}
+where a path is "<rule name>.<tier index>.<field>" or a top-level field
+such as "base_score".
+
+Every rule column is factorized once. Each candidate then only needs its
+per-distinct-value score table, and a whole block of candidates is scored
+as one (candidates x work orders) gather and sum. Precision, recall and
+ROC AUC (tie-averaged ranks) are computed for the block with array math,
+and large grids are split across worker processes.
+
+Run a grid search over the synthetic work orders:
+    python -m backend.services.ai.rework_backtest --grid grid.json --workers 4 --write-best rules.json
+"""
+
+import os
+import copy
+import json
+import itertools
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.services.ai.rework_predictor_service import load_synthetic_data
+from backend.services.ai.rework_rules import CompiledRule, ReworkRuleSet, get_rework_rules
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Ground truth column of the synthetic work orders
+LABEL_COLUMN = 'actual_rework_needed'
+
+# Score at or above which a work order counts as predicted rework
+DEFAULT_DECISION_THRESHOLD = 0.6
+
+# Candidate x work order cells scored at once
+BLOCK_CELLS = 4_000_000
+
+# Smallest grid worth spreading across processes
+PARALLEL_MIN_CANDIDATES = 2000
+
+# Grid searched when none is given
+DEFAULT_GRID = {
+    'asset_age.0.value': [10, 12, 15, 18, 20],
+    'asset_age.1.value': [5, 8, 10],
+    'resolution_text.0.score': [0.1, 0.2, 0.3, 0.4],
+    'contractor_propensity.0.value': [0.15, 0.2, 0.25],
+    'contractor_propensity.0.score': [0.15, 0.25, 0.35]
+}
+
+def candidate_params(grid: Dict[str, List[Any]]) -> pd.DataFrame:
+    """Parameter values of every candidate of a grid, one row per candidate, in grid order."""
+    paths = list(grid)
+    return pd.DataFrame(list(itertools.product(*(grid[path] for path in paths))), columns=paths)
+
+def candidate_spec(base_spec: Dict[str, Any], grid: Dict[str, List[Any]], candidate: int) -> Dict[str, Any]:
+    """The rule set spec of one candidate (its position in candidate_params)."""
+    paths = list(grid)
+    positions = np.unravel_index(candidate, tuple(len(grid[path]) for path in paths)) if paths else ()
+    spec = copy.deepcopy(base_spec)
+    for path, position in zip(paths, positions):
+        _set_param(spec, path, grid[path][int(position)])
+    return spec
+
+def _set_param(spec: Dict[str, Any], path: str, value: Any) -> None:
+    """Set a grid parameter in a spec; raises ValueError if the path names no field."""
+    rule, tier, field = _parse_path(spec, path)
+    if rule is None:
+        spec[field] = value
+    else:
+        spec['rules'][rule]['tiers'][tier][field] = value
+
+def _parse_path(spec: Dict[str, Any], path: str) -> Tuple[Optional[int], Optional[int], str]:
+    parts = path.split('.')
+    if len(parts) == 1:
+        if parts[0] not in ('base_score', 'score_range'):
+            raise ValueError(f"Grid path {path!r}: only base_score and score_range can be varied at the top level")
+        return None, None, parts[0]
+    rule_positions = {rule.get('name', rule.get('column')): i for i, rule in enumerate(spec['rules'])}
+    if len(parts) != 3 or parts[0] not in rule_positions or not parts[1].isdigit():
+        raise ValueError(f"Grid path {path!r} must be '<rule name>.<tier index>.<field>' or a top-level field")
+    tiers = spec['rules'][rule_positions[parts[0]]]['tiers']
+    if int(parts[1]) >= len(tiers):
+        raise ValueError(f"Grid path {path!r}: rule {parts[0]!r} has only {len(tiers)} tiers")
+    return rule_positions[parts[0]], int(parts[1]), parts[2]
+
+def score_tables(
+    base_spec: Dict[str, Any],
+    grid: Dict[str, List[Any]],
+    uniques: List[np.ndarray]
+) -> Tuple[List[np.ndarray], np.ndarray, np.ndarray]:
+    """
+    Per-distinct-value score contributions of every candidate.
+
+    A rule only varies with the grid paths that point into it, so each of
+    its variants is compiled and evaluated once and candidates pick their
+    variant's row by index.
+
+    Args:
+        base_spec (Dict[str, Any]): Rule set the candidates vary.
+        grid (Dict[str, List[Any]]): Parameter grid.
+        uniques (List[np.ndarray]): Distinct values of each rule's column.
+
+    Returns:
+        Tuple: One (candidates x distinct values + 1) table per rule (the
+            last column is for missing values), the base scores and the
+            (low, high) score ranges.
+    """
+    paths = list(grid)
+    shape = tuple(len(grid[path]) for path in paths)
+    candidates = int(np.prod(shape))
+    positions = np.unravel_index(np.arange(candidates), shape) if paths else ()
+    targets = [_parse_path(base_spec, path)[0] for path in paths]
+
+    def variants(rule: Optional[int]) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+        """Variant of each candidate, and the specs of the variants, for a rule (None: top level)."""
+        selected = [i for i, target in enumerate(targets) if target == rule]
+        if not selected:
+            return np.zeros(candidates, dtype=np.intp), [base_spec]
+        ids = np.ravel_multi_index([positions[i] for i in selected], tuple(shape[i] for i in selected))
+        specs = []
+        for values in itertools.product(*(grid[paths[i]] for i in selected)):
+            spec = copy.deepcopy(base_spec)
+            for i, value in zip(selected, values):
+                _set_param(spec, paths[i], value)
+            specs.append(spec)
+        return ids, specs
+
+    tables = []
+    for r, rule_uniques in enumerate(uniques):
+        ids, specs = variants(r)
+        variant_scores = np.empty((len(specs), len(rule_uniques) + 1))
+        for v, spec in enumerate(specs):
+            rule = CompiledRule(spec['rules'][r])
+            variant_scores[v] = rule.tier_scores[rule.unique_tiers(rule_uniques)]
+        tables.append(variant_scores[ids])
+
+    ids, specs = variants(None)
+    base = np.array([float(spec.get('base_score', 0.0)) for spec in specs])[ids]
+    ranges = np.array([[float(bound) for bound in spec.get('score_range', [0.0, 1.0])] for spec in specs])[ids]
+    return tables, base, ranges
+
+def score_candidates(
+    tables: List[np.ndarray],
+    codes: List[np.ndarray],
+    base: np.ndarray,
+    ranges: np.ndarray
+) -> np.ndarray:
+    """
+    Score every work order under every candidate as one broadcast gather.
+    Contributions are summed in rule order, as ReworkRuleSet.score does, so
+    each row equals that candidate's regular scores.
+
+    Returns:
+        np.ndarray: (candidates x work orders) clipped scores.
+    """
+    scores = np.repeat(base[:, None], len(codes[0]) if codes else 0, axis=1)
+    for table, rule_codes in zip(tables, codes):
+        scores += table[:, rule_codes]
+    return np.clip(scores, ranges[:, :1], ranges[:, 1:])
+
+def roc_auc(scores: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    """
+    ROC AUC of each row of scores, via the rank-sum statistic with tied
+    scores given their average rank. NaN when labels are all one class.
+
+    Args:
+        scores (np.ndarray): (candidates x work orders) scores.
+        labels (np.ndarray): Boolean ground truth per work order.
+
+    Returns:
+        np.ndarray: AUC per candidate.
+    """
+    candidates, rows = scores.shape
+    positives = int(labels.sum())
+    negatives = rows - positives
+    if positives == 0 or negatives == 0:
+        return np.full(candidates, np.nan)
+
+    order = np.argsort(scores, axis=1, kind='stable')
+    sorted_scores = np.take_along_axis(scores, order, axis=1)
+    positions = np.broadcast_to(np.arange(rows), (candidates, rows))
+    # A tie group runs from its first to its last position; its rank is the mean
+    starts = np.ones((candidates, rows), dtype=bool)
+    starts[:, 1:] = sorted_scores[:, 1:] != sorted_scores[:, :-1]
+    ends = np.ones((candidates, rows), dtype=bool)
+    ends[:, :-1] = starts[:, 1:]
+    first = np.maximum.accumulate(np.where(starts, positions, 0), axis=1)
+    last = np.minimum.accumulate(np.where(ends, positions, rows - 1)[:, ::-1], axis=1)[:, ::-1]
+    ranks = (first + last) / 2.0 + 1.0
+
+    rank_sum = np.where(labels[order], ranks, 0.0).sum(axis=1)
+    return (rank_sum - positives * (positives + 1) / 2.0) / (positives * negatives)
+
+def classification_metrics(scores: np.ndarray, labels: np.ndarray, threshold: float) -> Dict[str, np.ndarray]:
+    """
+    Precision, recall, F1, AUC and flagged count of each candidate, flagging
+    work orders scoring at or above threshold. Undefined ratios are NaN.
+    """
+    flagged = scores >= threshold
+    true_positives = (flagged & labels).sum(axis=1)
+    flagged_count = flagged.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        precision = true_positives / flagged_count
+        recall = true_positives / labels.sum()
+        f1 = 2 * precision * recall / (precision + recall)
+    return {
+        'precision': precision,
+        'recall': recall,
+        'f1': f1,
+        'auc': roc_auc(scores, labels),
+        'flagged': flagged_count
+    }
+
+def _evaluate_block(
+    tables: List[np.ndarray],
+    codes: List[np.ndarray],
+    base: np.ndarray,
+    ranges: np.ndarray,
+    labels: np.ndarray,
+    threshold: float
+) -> Dict[str, np.ndarray]:
+    """Score and evaluate a block of candidates, in slices of at most BLOCK_CELLS cells."""
+    rows = max(len(labels), 1)
+    step = max(1, BLOCK_CELLS // rows)
+    parts = []
+    for start in range(0, len(base), step):
+        block = slice(start, start + step)
+        scores = score_candidates([table[block] for table in tables], codes, base[block], ranges[block])
+        parts.append(classification_metrics(scores, labels, threshold))
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+# Work order codes and labels, sent once to each pool worker by _init_backtest_worker
+_worker_codes: Optional[List[np.ndarray]] = None
+_worker_labels: Optional[np.ndarray] = None
+
+def _init_backtest_worker(codes: List[np.ndarray], labels: np.ndarray) -> None:
+    global _worker_codes, _worker_labels
+    _worker_codes, _worker_labels = codes, labels
+
+def _evaluate_shard(args: Tuple[List[np.ndarray], np.ndarray, np.ndarray, float]) -> Dict[str, np.ndarray]:
+    tables, base, ranges, threshold = args
+    return _evaluate_block(tables, _worker_codes, base, ranges, _worker_labels, threshold)
+
+def backtest_rules(
+    df: pd.DataFrame,
+    grid: Optional[Dict[str, List[Any]]] = None,
+    base_spec: Optional[Dict[str, Any]] = None,
+    threshold: float = DEFAULT_DECISION_THRESHOLD,
+    workers: Optional[int] = 1,
+    sort_by: str = 'auc'
+) -> pd.DataFrame:
+    """
+    Evaluate candidate rule sets against actual_rework_needed.
+
+    Args:
+        df (pd.DataFrame): Enriched work orders with the label column.
+        grid (Dict[str, List[Any]], optional): Parameter grid; without one
+            only the base rule set is evaluated.
+        base_spec (Dict[str, Any], optional): Rule set the candidates vary.
+            Defaults to the configured rework rules.
+        threshold (float, optional): Score at or above which a work order
+            is predicted to need rework.
+        workers (int, optional): Processes for large grids; None uses every core.
+        sort_by (str, optional): Metric to rank candidates by, best first.
+
+    Returns:
+        pd.DataFrame: One row per candidate with its parameter values,
+            precision, recall, f1, auc, flagged and 'candidate' (its
+            position in the grid).
+
+    Raises:
+        ValueError: If the label column is missing or the grid is invalid.
+    """
+    if LABEL_COLUMN not in df.columns:
+        raise ValueError(f"Work orders have no '{LABEL_COLUMN}' column to backtest against")
+    base_spec = base_spec or get_rework_rules().spec
+    grid = grid or {}
+    rules = ReworkRuleSet(base_spec).rules
+    params = candidate_params(grid)
+    labels = df[LABEL_COLUMN].fillna(False).to_numpy(dtype=bool)
+
+    start = time.perf_counter()
+    codes, uniques = [], []
+    for rule in rules:
+        if rule.column in df.columns:
+            rule_codes, rule_uniques = pd.factorize(df[rule.column])
+        else:
+            rule_codes, rule_uniques = np.full(len(df), -1, dtype=np.intp), np.array([])
+        codes.append(rule_codes)
+        uniques.append(rule_uniques)
+    tables, base, ranges = score_tables(base_spec, grid, uniques)
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(params) >= PARALLEL_MIN_CANDIDATES:
+        bounds = np.linspace(0, len(params), workers * 4 + 1).astype(int)
+        shards = [
+            ([table[lo:hi] for table in tables], base[lo:hi], ranges[lo:hi], threshold)
+            for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo
+        ]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_backtest_worker,
+                                 initargs=(codes, labels)) as pool:
+            parts = list(pool.map(_evaluate_shard, shards))
+        metrics = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+    else:
+        metrics = _evaluate_block(tables, codes, base, ranges, labels, threshold)
+    elapsed = time.perf_counter() - start
+    logger.info(f"Backtested {len(params)} rule sets on {len(df)} work orders in {elapsed:.2f}s "
+                f"({len(params) * len(df) / max(elapsed, 1e-9):.0f} scores/s)")
+
+    results = params.assign(candidate=np.arange(len(params)), **metrics)
+    return results.sort_values(sort_by, ascending=False, kind='stable', na_position='last').reset_index(drop=True)
+
+def best_rule_spec(results: pd.DataFrame, grid: Dict[str, List[Any]], base_spec: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Rebuild the rule set spec of the best (first) candidate of backtest_rules."""
+    return candidate_spec(base_spec or get_rework_rules().spec, grid, int(results['candidate'].iloc[0]))
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Backtest and grid-search rework rules against actual_rework_needed')
+    parser.add_argument('--data-dir', default='data/')
+    parser.add_argument('--grid', help='JSON file mapping parameter paths to candidate values (default: a built-in grid)')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_DECISION_THRESHOLD)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--sort-by', default='auc', choices=['auc', 'f1', 'precision', 'recall'])
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--write-best', help='Write the best candidate rule set to this JSON file')
+    args = parser.parse_args()
+
+    work_orders = load_synthetic_data(args.data_dir)
+    if work_orders is None:
+        raise SystemExit(f"Could not load work orders from {args.data_dir}")
+    if args.grid:
+        with open(args.grid) as f:
+            search_grid = json.load(f)
+    else:
+        search_grid = DEFAULT_GRID
+
+    baseline = backtest_rules(work_orders, threshold=args.threshold)
+    results = backtest_rules(work_orders, search_grid, threshold=args.threshold,
+                             workers=args.workers, sort_by=args.sort_by)
+    print("Current rules:")
+    print(baseline.drop(columns=['candidate']).to_string(index=False))
+    print(f"\nTop {args.top} of {len(results)} candidates by {args.sort_by}:")
+    print(results.head(args.top).drop(columns=['candidate']).to_string(index=False))
+    if args.write_best:
+        with open(args.write_best, 'w') as f:
+            json.dump(best_rule_spec(results, search_grid), f, indent=2)
+        print(f"\nWrote the best rule set to {args.write_best}")
@@ -7,47 +7,136 @@ and applies a set of rules to estimate rework risk and contributing factors.
 """
 
 import os
+import json
+import shutil
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
 import pandas as pd
 from pandas.errors import EmptyDataError
 
+from backend.services.ai.rework_rules import ReworkRuleSet, get_rework_rules
+
 # Set up basic logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def load_synthetic_data(data_dir: str = 'data/') -> Optional[pd.DataFrame]:
+# Input files of load_synthetic_data, relative to the data directory
+SYNTHETIC_DATA_FILES = ('synthetic_assets.csv', 'synthetic_contractors.csv', 'synthetic_work_orders.csv')
+
+def enrich_work_orders(work_orders_df: pd.DataFrame, assets_df: pd.DataFrame, contractors_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Join work orders with their asset and contractor details.
+    Adds asset type, building, installation year and asset age at the time
+    of the work order, and the contractor's rework propensity.
+    """
+    # Calculate asset age at time of work order
+    work_orders_df = work_orders_df.merge(
+        assets_df[['asset_id', 'installation_year', 'asset_type', 'building_id']],
+        on='asset_id', how='left'
+    )
+    work_orders_df['created_year'] = pd.to_datetime(work_orders_df['created_date']).dt.year
+    work_orders_df['asset_age_at_wo'] = work_orders_df['created_year'] - work_orders_df['installation_year']
+
+    # Add contractor rework propensity
+    work_orders_df = work_orders_df.merge(
+        contractors_df[['contractor_id', 'base_rework_propensity']],
+        left_on='assigned_contractor_id', right_on='contractor_id', how='left'
+    )
+    work_orders_df.rename(columns={'base_rework_propensity': 'contractor_rework_propensity'}, inplace=True)
+    work_orders_df.drop(columns=['contractor_id'], inplace=True)
+
+    return work_orders_df
+
+def _read_synthetic_data(assets_path: str, contractors_path: str, work_orders_path: str) -> pd.DataFrame:
+    """Read the three synthetic CSVs and build the enriched work order frame."""
+    assets_df = pd.read_csv(assets_path)
+    contractors_df = pd.read_csv(contractors_path)
+    work_orders_df = pd.read_csv(work_orders_path)
+    return enrich_work_orders(work_orders_df, assets_df, contractors_df)
+
+class SyntheticDataCache:
+    """
+    Process-level cache of enriched work order frames, one per data directory.
+
+    An entry is keyed on the input files' paths, sizes and modification
+    times, so a request only stats the three files when nothing changed and
+    reloads as soon as any of them is rewritten. Callers get a copy of the
+    cached frame and may modify it freely.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[Tuple, pd.DataFrame]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, data_dir: str) -> pd.DataFrame:
+        """
+        Return the enriched work orders of data_dir, loading them on a miss.
+
+        Concurrent misses for the same directory load the files once; the
+        other callers wait and then hit.
+
+        Raises:
+            FileNotFoundError: If an input file is missing.
+            EmptyDataError: If an input file is empty.
+        """
+        paths = [os.path.join(data_dir, name) for name in SYNTHETIC_DATA_FILES]
+        key = os.path.abspath(data_dir)
+        with self._lock:
+            signature = _file_signature(paths)
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == signature:
+                self.hits += 1
+                return cached[1].copy()
+
+            self.misses += 1
+            df = _read_synthetic_data(*paths)
+            # Only cache when no file changed while it was being read
+            if _file_signature(paths) == signature:
+                self._entries[key] = (signature, df)
+            else:
+                self._entries.pop(key, None)
+            return df.copy()
+
+    def invalidate(self, data_dir: Optional[str] = None) -> None:
+        """Drop the cached frame of data_dir, or of every directory."""
+        with self._lock:
+            if data_dir is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(data_dir), None)
+
+    def cache_info(self) -> Dict[str, int]:
+        """Cache statistics, in the spirit of functools' cache_info()."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+def _file_signature(paths: List[str]) -> Tuple:
+    """(path, size, mtime) of each file; raises FileNotFoundError if one is missing."""
+    signature = []
+    for path in paths:
+        stat = os.stat(path)
+        signature.append((os.path.abspath(path), stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+synthetic_data_cache = SyntheticDataCache()
+
+def load_synthetic_data(data_dir: str = 'data/', use_cache: bool = True) -> Optional[pd.DataFrame]:
     """
     Load and merge synthetic assets, contractors, and work orders data.
     Adds asset age and contractor rework propensity to each work order.
+    Unless use_cache is False, the merged frame comes from synthetic_data_cache
+    and the files are only read again when one of them has changed.
     Returns merged DataFrame or None if loading fails.
     """
     try:
-        assets_path = os.path.join(data_dir, 'synthetic_assets.csv')
-        contractors_path = os.path.join(data_dir, 'synthetic_contractors.csv')
-        work_orders_path = os.path.join(data_dir, 'synthetic_work_orders.csv')
-
-        assets_df = pd.read_csv(assets_path)
-        contractors_df = pd.read_csv(contractors_path)
-        work_orders_df = pd.read_csv(work_orders_path)
-
-        # Calculate asset age at time of work order
-        work_orders_df = work_orders_df.merge(
-            assets_df[['asset_id', 'installation_year', 'asset_type']],
-            on='asset_id', how='left'
-        )
-        work_orders_df['created_year'] = pd.to_datetime(work_orders_df['created_date']).dt.year
-        work_orders_df['asset_age_at_wo'] = work_orders_df['created_year'] - work_orders_df['installation_year']
-
-        # Add contractor rework propensity
-        work_orders_df = work_orders_df.merge(
-            contractors_df[['contractor_id', 'base_rework_propensity']],
-            left_on='assigned_contractor_id', right_on='contractor_id', how='left'
-        )
-        work_orders_df.rename(columns={'base_rework_propensity': 'contractor_rework_propensity'}, inplace=True)
-        work_orders_df.drop(columns=['contractor_id'], inplace=True)
-
-        return work_orders_df
+        if use_cache:
+            return synthetic_data_cache.get(data_dir)
+        return _read_synthetic_data(*[os.path.join(data_dir, name) for name in SYNTHETIC_DATA_FILES])
     except FileNotFoundError as e:
         logger.error(f"File not found: {e}")
     except EmptyDataError as e:
@@ -56,61 +145,392 @@ def load_synthetic_data(data_dir: str = 'data/') -> Optional[pd.DataFrame]:
         logger.error(f"Error loading synthetic data: {e}")
     return None
 
-def predict_rework_risk_for_work_orders(data_dir: str = 'data/') -> pd.DataFrame:
+def score_rework_risk(df: pd.DataFrame, rules: Optional[ReworkRuleSet] = None) -> pd.DataFrame:
+    """
+    Apply the rework risk rules to enriched work orders.
+
+    The rules come from the declarative rule set (backend/config/rework_rules.json
+    by default), compiled to whole-column operations and reloaded when the
+    file changes. The shipped rules are:
+    - asset age > 15 years: +0.4; > 8 years: +0.2
+    - resolution mentions a quick fix: +0.3; else a thorough fix: -0.25
+    - contractor propensity > 0.2: +0.25; > 0.12: +0.1
+    The score starts at 0.05 and is clipped to [0, 1].
+
+    Args:
+        df (pd.DataFrame): Work orders from load_synthetic_data.
+        rules (ReworkRuleSet, optional): Rule set to use instead of the configured one.
+
+    Returns:
+        pd.DataFrame: A copy of df with 'predicted_rework_risk_score' (0-1)
+            and 'predicted_risk_factor_mask' (uint64, one bit per rule tier
+            that applied; see ReworkRuleSet.factor_table). Readable factors
+            are added by with_risk_factor_lists when a result is serialized.
+    """
+    rules = rules or get_rework_rules()
+    score, masks = rules.score(df)
+    # Shallow copy: only new columns are added, and a deep copy would
+    # consolidate every block of the frame
+    df = df.copy(deep=False)
+    df['predicted_rework_risk_score'] = score
+    df['predicted_risk_factor_mask'] = masks
+    df.attrs['rework_rules_fingerprint'] = rules.fingerprint
+    return df
+
+def with_risk_factor_lists(
+    df: pd.DataFrame,
+    rules: Optional[ReworkRuleSet] = None,
+    separator: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Add readable 'predicted_risk_factors' to scored work orders.
+
+    Decode only the rows being returned: filter, sort and cut first, then
+    call this just before serializing.
+
+    Args:
+        df (pd.DataFrame): Rows of score_rework_risk output.
+        rules (ReworkRuleSet, optional): Rule set the rows were scored with
+            (default the configured one).
+        separator (str, optional): Join each row's factors into one string
+            instead of a list.
+
+    Returns:
+        pd.DataFrame: A shallow copy of df with 'predicted_risk_factors'.
+
+    Raises:
+        ValueError: If df was scored with a different rule set, whose mask
+            bits would mean something else.
+    """
+    rules = rules or get_rework_rules()
+    fingerprint = df.attrs.get('rework_rules_fingerprint')
+    if fingerprint is not None and fingerprint != rules.fingerprint:
+        raise ValueError(f"Work orders were scored with rework rules {fingerprint}, not {rules.fingerprint}")
+    factors = rules.decode_factors(df, df['predicted_risk_factor_mask'].to_numpy(), separator)
+    df = df.copy(deep=False)
+    df['predicted_risk_factors'] = factors
+    return df
+
+def predict_rework_risk_for_work_orders(data_dir: str = 'data/', live_stats: Optional[Any] = None) -> pd.DataFrame:
     """
     Predict rework risk for each synthetic work order using rule-based logic.
-    Adds 'predicted_rework_risk_score' (0-1) and 'predicted_risk_factors' (list of strings).
-    Returns the enriched DataFrame.
+    Adds 'predicted_rework_risk_score' (0-1) and 'predicted_risk_factor_mask'
+    (decode with with_risk_factor_lists). Returns the enriched DataFrame.
+
+    With live_stats (a ReworkStats, see rework_stats.get_rework_stats), each
+    contractor's static propensity is replaced by its live propensity, which
+    also reflects the rework observed on its work orders so far.
     """
     df = load_synthetic_data(data_dir)
     if df is None:
         logger.error("Failed to load or merge synthetic data. Returning empty DataFrame.")
         return pd.DataFrame()
+    if live_stats is not None:
+        df = live_stats.with_live_propensity(df)
 
-    def assess_risk_revised(row) -> pd.Series:
-        # Changed return type hint for clarity
-        score = 0.05  # small base risk
-        risk_factors = []
-
-        # Asset age
-        asset_age = row.get('asset_age_at_wo', 0)
-        if asset_age > 15:
-            score += 0.4
-            risk_factors.append('Old Asset (Age: ' + str(asset_age) + ')')  # More informative
-        elif asset_age > 8:
-            score += 0.2
-            risk_factors.append('Moderately Old Asset (Age: ' + str(asset_age) + ')')
-
-        # Resolution Text Analysis
-        resolution = str(row.get('resolution_text_simulated', '')).lower()
-        if 'patch' in resolution or 'temporary' in resolution:
-            score += 0.3
-            risk_factors.append('Quick Fix Indicated')
-        elif 'replaced' in resolution or 'overhaul' in resolution or 'new unit installed' in resolution:  # Add more "good fix" keywords
-            score -= 0.25  # <--- SIGNIFICANTLY REDUCE RISK for thorough fixes
-            risk_factors.append('Thorough Fix Performed')  # This is a positive factor
-
-        # Contractor
-        contractor_prop = row.get('contractor_rework_propensity')
-        if pd.notnull(contractor_prop):  # Check if contractor_prop is not NaN
-            if contractor_prop > 0.2:
-                score += 0.25
-                risk_factors.append(f'High Propensity Contractor (Prop: {contractor_prop:.2f})')  # More informative
-            elif contractor_prop > 0.12:
-                score += 0.1
-                risk_factors.append(f'Moderate Propensity Contractor (Prop: {contractor_prop:.2f})')
-
-        # Cap score
-        score = min(max(score, 0.0), 1.0)  # Ensure score is not less than 0
-
-        return pd.Series({'predicted_rework_risk_score': score,
-                          'predicted_risk_factors': risk_factors if risk_factors else ['Low Base Risk']})  # Default if no specific factors
-
-    risk_results = df.apply(assess_risk_revised, axis=1)
-    df = pd.concat([df, risk_results], axis=1)
+    df = score_rework_risk(df)
 
     # Log summary
     high_risk_count = (df['predicted_rework_risk_score'] >= 0.6).sum()
     logger.info(f"Processed {len(df)} work orders. {high_risk_count} flagged as high risk (score >= 0.6).")
 
-    return df 
\ No newline at end of file
+    return df
+
+# A work order on an asset created within this many days of the asset's
+# latest earlier close is a repeat failure
+DEFAULT_REPEAT_WINDOW_DAYS = 30
+
+def detect_repeat_failures(df: pd.DataFrame, window_days: float = DEFAULT_REPEAT_WINDOW_DAYS) -> pd.DataFrame:
+    """
+    Flag work orders created soon after an earlier work order on the same asset closed.
+
+    Each work order is compared with the latest close on its asset at or
+    before its own creation, whichever earlier work order that came from,
+    so a short work order that closed recently counts even while a longer,
+    earlier one is still open. A close on the very day of creation counts
+    only for work orders created before it (or earlier in df on the same
+    day). Work orders without an asset or creation date never are repeats.
+
+    Every close and every creation becomes an event; a sort by (asset,
+    date, creation order) puts each creation right after the closes that
+    precede it, and a running maximum hands it the latest of them. The cost
+    is O(n log n) for the sorts and O(n) after them; no pairs are compared.
+
+    Args:
+        df (pd.DataFrame): Work orders with 'wo_id', 'asset_id',
+            'created_date' and 'closed_date' (from any source).
+        window_days (float, optional): Maximum days between the previous
+            close and the new work order.
+
+    Returns:
+        pd.DataFrame: A shallow copy of df, in its order, with
+            'previous_wo_id', 'previous_closed_date' (the work order that
+            closed last before this one was created, or None),
+            'days_since_previous_close' and 'is_repeat_failure'.
+    """
+    created = pd.to_datetime(df['created_date'], errors='coerce').to_numpy()
+    closed = pd.to_datetime(df['closed_date'], errors='coerce').to_numpy()
+    created_days = (created - np.datetime64(0, 'D')) / np.timedelta64(1, 'D')
+    closed_days = (closed - np.datetime64(0, 'D')) / np.timedelta64(1, 'D')
+    codes, _ = pd.factorize(df['asset_id'])
+    rows = len(df)
+
+    # Creation order within each asset (missing creation dates last), on
+    # one sort key, which is about twice as fast as a two-key lexsort
+    created_finite = np.isfinite(created_days)
+    created_base = created_days[created_finite].min() if created_finite.any() else 0.0
+    created_span = (created_days[created_finite].max() - created_base if created_finite.any() else 0.0) + 2
+    sort_key = codes * created_span + np.where(created_finite, created_days - created_base, created_span - 1)
+    created_order = np.argsort(sort_key, kind='stable')
+
+    # Each work order's creation event, then its close event, in creation
+    # order: a stable sort by (asset, day) then keeps a close on the day of
+    # a creation after the creations of its own and earlier work orders
+    event_rows = np.repeat(created_order, 2)
+    is_close = np.tile([False, True], rows)
+    event_days = np.where(is_close, closed_days[event_rows], created_days[event_rows])
+    present = (codes[event_rows] >= 0) & np.isfinite(event_days)
+    event_rows, is_close, event_days = event_rows[present], is_close[present], event_days[present]
+    event_codes = codes[event_rows]
+    base = event_days.min() if len(event_days) else 0.0
+    span = (event_days.max() - base if len(event_days) else 0.0) + 1
+    order = np.argsort(event_codes * span + (event_days - base), kind='stable')
+    event_rows, is_close, event_codes = event_rows[order], is_close[order], event_codes[order]
+
+    # Latest close event before each creation event
+    last_close = np.maximum.accumulate(np.where(is_close, np.arange(len(is_close)), -1))
+    creation_events = np.flatnonzero(~is_close)
+    creation_rows = event_rows[creation_events]
+    source = last_close[creation_events]
+    # A work order closed before it was created (bad data) is not its own predecessor
+    own = source >= 0
+    own[own] = event_rows[source[own]] == creation_rows[own]
+    source[own] = np.where(source[own] > 0, last_close[np.maximum(source[own] - 1, 0)], -1)
+    linked_events = source >= 0
+    linked_events[linked_events] = event_codes[source[linked_events]] == event_codes[creation_events[linked_events]]
+
+    previous = np.full(rows, -1, dtype=np.int64)
+    previous[creation_rows[linked_events]] = event_rows[source[linked_events]]
+
+    linked = previous >= 0
+    gap = np.full(rows, np.nan)
+    gap[linked] = created_days[linked] - closed_days[previous[linked]]
+    with np.errstate(invalid='ignore'):
+        is_repeat = linked & (gap <= window_days)
+
+    wo_ids = df['wo_id'].to_numpy(dtype=object)
+    closed_dates = df['closed_date'].to_numpy(dtype=object)
+    df = df.copy(deep=False)
+    df['previous_wo_id'] = np.where(linked, wo_ids[previous], None)
+    df['previous_closed_date'] = np.where(linked, closed_dates[previous], None)
+    df['days_since_previous_close'] = gap
+    df['is_repeat_failure'] = is_repeat
+    return df
+
+def find_repeat_failures(
+    data_dir: str = 'data/',
+    window_days: float = DEFAULT_REPEAT_WINDOW_DAYS
+) -> pd.DataFrame:
+    """
+    Repeat failures among the synthetic work orders (see detect_repeat_failures),
+    most recent first. Returns an empty DataFrame if the data cannot be loaded.
+    """
+    df = load_synthetic_data(data_dir)
+    if df is None:
+        logger.error("Failed to load or merge synthetic data. Returning empty DataFrame.")
+        return pd.DataFrame()
+
+    df = detect_repeat_failures(df, window_days)
+    repeats = df[df['is_repeat_failure']]
+    logger.info(f"Found {len(repeats)} repeat failures among {len(df)} work orders "
+                f"(within {window_days} days of a previous close on the same asset).")
+    return repeats.sort_values('created_date', ascending=False, kind='stable')
+
+# Work orders read, enriched and scored per batch by score_work_orders_chunked
+DEFAULT_CHUNK_ROWS = 250000
+
+# Columns written by the chunked scoring pipeline
+SCORE_OUTPUT_COLUMNS = [
+    'wo_id', 'asset_id', 'asset_type', 'building_id', 'assigned_contractor_id',
+    'closed_date', 'predicted_rework_risk_score', 'predicted_risk_factors'
+]
+
+class CsvScoreSink:
+    """
+    Appends scored work order batches to a CSV file.
+
+    The file is written to a temporary path and moved into place on close,
+    so readers never see a partial result. Risk factors are written as one
+    string joined by factor_separator.
+
+    Args:
+        path: Output CSV path.
+        columns: Columns to write (those a batch lacks are skipped).
+        factor_separator: Separator between risk factors.
+    """
+
+    def __init__(self, path: str, columns: Optional[List[str]] = None, factor_separator: str = '; '):
+        self.path = path
+        self.columns = columns or SCORE_OUTPUT_COLUMNS
+        self.factor_separator = factor_separator
+        self.rows = 0
+        self._tmp_path = f"{path}.tmp"
+        self._header_written = False
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        """Append one batch of scored work orders."""
+        chunk[[col for col in self.columns if col in chunk.columns]].to_csv(
+            self._tmp_path, mode='a' if self._header_written else 'w',
+            header=not self._header_written, index=False
+        )
+        self._header_written = True
+        self.rows += len(chunk)
+
+    def close(self) -> None:
+        """Move the finished file into place."""
+        if self._header_written:
+            os.replace(self._tmp_path, self.path)
+
+    def __enter__(self) -> 'CsvScoreSink':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        elif os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+class NpyScoreSink:
+    """
+    Writes scored work order batches as NumPy parts, much faster than CSV.
+
+    Each batch becomes a part directory with wo_id.npy (fixed-width text),
+    score.npy (float64) and factors.npy (int32 codes into the factor table).
+    Every distinct joined factor string is stored once, in manifest.json,
+    which close() writes last; read() loads everything back into a frame.
+
+    Args:
+        root: Output directory (replaced if it exists).
+        factor_separator: Separator between risk factors.
+    """
+
+    def __init__(self, root: str, factor_separator: str = '; '):
+        self.root = root
+        self.factor_separator = factor_separator
+        self.rows = 0
+        self._parts: List[str] = []
+        self._factor_codes: Dict[str, int] = {}
+        shutil.rmtree(root, ignore_errors=True)
+        os.makedirs(root)
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        """Write one batch of scored work orders as a new part."""
+        part = f"part-{len(self._parts):05d}"
+        part_dir = os.path.join(self.root, part)
+        os.makedirs(part_dir)
+        codes, uniques = pd.factorize(chunk['predicted_risk_factors'])
+        table = np.array([self._factor_codes.setdefault(factor, len(self._factor_codes)) for factor in uniques],
+                         dtype=np.int32)
+        np.save(os.path.join(part_dir, 'wo_id.npy'), chunk['wo_id'].to_numpy(dtype=str))
+        np.save(os.path.join(part_dir, 'score.npy'), chunk['predicted_rework_risk_score'].to_numpy(dtype=np.float64))
+        np.save(os.path.join(part_dir, 'factors.npy'), table[codes])
+        self._parts.append(part)
+        self.rows += len(chunk)
+
+    def close(self) -> None:
+        """Write the manifest that makes the output readable."""
+        with open(os.path.join(self.root, 'manifest.json'), 'w') as f:
+            json.dump({
+                'parts': self._parts,
+                'rows': self.rows,
+                'factor_separator': self.factor_separator,
+                'factors': list(self._factor_codes)
+            }, f)
+
+    def __enter__(self) -> 'NpyScoreSink':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+
+    @staticmethod
+    def read(root: str) -> pd.DataFrame:
+        """Load a finished output as a frame with wo_id, score and joined factors."""
+        with open(os.path.join(root, 'manifest.json')) as f:
+            manifest = json.load(f)
+        factors = np.array(manifest['factors'], dtype=object)
+
+        def column(name: str, empty: np.ndarray) -> np.ndarray:
+            arrays = [np.load(os.path.join(root, part, f"{name}.npy")) for part in manifest['parts']]
+            return np.concatenate(arrays) if arrays else empty
+        return pd.DataFrame({
+            'wo_id': column('wo_id', np.array([], dtype=str)).astype(object),
+            'predicted_rework_risk_score': column('score', np.array([], dtype=np.float64)),
+            'predicted_risk_factors': factors[column('factors', np.array([], dtype=np.int32))]
+        })
+
+def score_work_orders_chunked(
+    work_orders_path: str,
+    assets_path: str,
+    contractors_path: str,
+    sink: Any,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    rules: Optional[ReworkRuleSet] = None
+) -> Dict[str, Any]:
+    """
+    Score a work order history too large to hold in memory.
+
+    Work orders are streamed from CSV in batches of chunk_rows, joined with
+    the (small, fully loaded) asset and contractor tables, scored with the
+    rework rules and passed to sink.write, so peak memory depends on the
+    batch size rather than the history size. Scores equal those of
+    predict_rework_risk_for_work_orders on the same data.
+
+    Args:
+        work_orders_path (str): Work order CSV.
+        assets_path (str): Asset CSV.
+        contractors_path (str): Contractor CSV.
+        sink: Object with a write(chunk) method, e.g. CsvScoreSink or
+            NpyScoreSink. Written batches carry
+            'predicted_rework_risk_score', 'predicted_risk_factor_mask' and
+            'predicted_risk_factors', joined with the sink's
+            factor_separator if it has one (lists otherwise).
+        chunk_rows (int, optional): Work orders per batch.
+        rules (ReworkRuleSet, optional): Rule set to use instead of the configured one.
+
+    Returns:
+        Dict[str, Any]: Rows and batches processed, high-risk count
+            (score >= 0.6), elapsed seconds and rows per second.
+    """
+    rules = rules or get_rework_rules()
+    assets_df = pd.read_csv(assets_path)
+    contractors_df = pd.read_csv(contractors_path)
+    factor_separator = getattr(sink, 'factor_separator', None)
+
+    start = time.perf_counter()
+    rows = chunks = high_risk = 0
+    for work_orders_df in pd.read_csv(work_orders_path, chunksize=chunk_rows):
+        chunk = enrich_work_orders(work_orders_df, assets_df, contractors_df)
+        score, masks = rules.score(chunk)
+        chunk['predicted_rework_risk_score'] = score
+        chunk['predicted_risk_factor_mask'] = masks
+        # Writing a batch is where it gets serialized, so decode here
+        chunk['predicted_risk_factors'] = rules.decode_factors(chunk, masks, factor_separator)
+        sink.write(chunk)
+
+        rows += len(chunk)
+        chunks += 1
+        high_risk += int((score >= 0.6).sum())
+        logger.debug(f"Scored work order batch {chunks} ({rows} rows so far)")
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"Scored {rows} work orders in {chunks} batches in {elapsed:.2f}s "
+                f"({rows / max(elapsed, 1e-9):.0f} rows/s). {high_risk} flagged as high risk (score >= 0.6).")
+    return {
+        'rows': rows,
+        'chunks': chunks,
+        'high_risk': high_risk,
+        'elapsed_seconds': elapsed,
+        'rows_per_second': rows / max(elapsed, 1e-9)
+    }
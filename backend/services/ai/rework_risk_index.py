@@ -0,0 +1,248 @@
+"""
+Rework Risk Index for NYCHA QualityGuard Pro
+Materialized rework risk assessments for fast threshold, top-N and lookup queries.
+"""
+
+import os
+import logging
+import threading
+from typing import List, Dict, Optional, Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.services.ai.rework_predictor_service import (
+    SYNTHETIC_DATA_FILES,
+    _file_signature,
+    load_synthetic_data,
+    score_rework_risk,
+    with_risk_factor_lists
+)
+from backend.services.ai.rework_rules import ReworkRuleSet, get_rework_rules
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Columns the index can group work orders by
+INDEX_GROUP_COLUMNS = ('asset_id', 'asset_type', 'assigned_contractor_id', 'building_id')
+
+# Columns query() can sort by
+INDEX_SORT_COLUMNS = ('predicted_rework_risk_score', 'closed_date', 'asset_age_at_wo', 'wo_id')
+
+class ReworkRiskIndex:
+    """
+    Scored work orders sorted by descending rework risk.
+
+    Ties keep the work orders' original order, so top_n matches nlargest.
+    Threshold queries binary-search the sorted scores, wo_id lookups go
+    through a dict, and each grouping maps a value to the positions of its
+    work orders (in score order). Risk factors stay as bitmasks; decode
+    the rows a query returns with decode().
+
+    Args:
+        scored: Output of score_rework_risk.
+        signature: Identifies the source files and rule set the index was built from.
+        rules: Rule set the work orders were scored with (default the configured one).
+    """
+
+    def __init__(self, scored: pd.DataFrame, signature: Optional[Tuple] = None,
+                 rules: Optional[ReworkRuleSet] = None):
+        scores = scored['predicted_rework_risk_score'].to_numpy(dtype=np.float64)
+        order = np.argsort(-scores, kind='stable')
+        self.frame = scored.iloc[order].reset_index(drop=True)
+        self.signature = signature
+        self.rules = rules or get_rework_rules()
+        # Ascending copy of the negated scores for searchsorted
+        self._negated_scores = -scores[order]
+        self._positions = {wo_id: position for position, wo_id in enumerate(self.frame['wo_id'].tolist())}
+        # Close dates as datetimes, for date range filters and sorting
+        if 'closed_date' in self.frame.columns:
+            self._closed = pd.to_datetime(self.frame['closed_date'], errors='coerce').to_numpy()
+        else:
+            self._closed = np.full(len(self.frame), np.datetime64('NaT'), dtype='datetime64[ns]')
+        self._groups: Dict[str, Dict[Any, np.ndarray]] = {}
+        for col in INDEX_GROUP_COLUMNS:
+            if col in self.frame.columns:
+                codes, uniques = pd.factorize(self.frame[col])
+                # Stable sort by code keeps each group's positions in score order
+                positions = np.argsort(codes, kind='stable')
+                bounds = np.searchsorted(codes[positions], np.arange(len(uniques) + 1))
+                self._groups[col] = {
+                    value: positions[bounds[i]:bounds[i + 1]] for i, value in enumerate(uniques)
+                }
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def _count_above(self, threshold: float, strict: bool) -> int:
+        # score > t  <=>  -score < -t, i.e. left insertion point of -t
+        return int(np.searchsorted(self._negated_scores, -threshold, side='left' if strict else 'right'))
+
+    def above(self, threshold: float, strict: bool = True) -> pd.DataFrame:
+        """Work orders scoring above threshold (at or above if not strict), highest first."""
+        return self.frame.iloc[:self._count_above(threshold, strict)]
+
+    def top_n(self, n: int, min_score: Optional[float] = None, strict: bool = True) -> pd.DataFrame:
+        """
+        The n highest-risk work orders, optionally only those above min_score.
+
+        Args:
+            n (int): Maximum number of work orders.
+            min_score (float, optional): Score the work orders must exceed.
+            strict (bool, optional): Require score > min_score rather than >=.
+
+        Returns:
+            pd.DataFrame: Up to n work orders, highest risk first.
+        """
+        limit = max(n, 0)
+        if min_score is not None:
+            limit = min(limit, self._count_above(min_score, strict))
+        return self.frame.iloc[:limit]
+
+    def with_factor(self, rule_name: str, tier: int = 0) -> pd.DataFrame:
+        """
+        Work orders where the given rule tier applied, highest risk first.
+
+        Raises:
+            KeyError: If the rule set has no such rule or tier.
+        """
+        bit = self.rules.factor_bit(rule_name, tier)
+        masks = self.frame['predicted_risk_factor_mask'].to_numpy()
+        return self.frame[(masks & bit) != 0]
+
+    def decode(self, rows: pd.DataFrame, separator: Optional[str] = None) -> pd.DataFrame:
+        """Add readable 'predicted_risk_factors' to rows returned by a query."""
+        return with_risk_factor_lists(rows, self.rules, separator)
+
+    def query(
+        self,
+        min_score: Optional[float] = None,
+        asset_type: Optional[str] = None,
+        contractor: Optional[str] = None,
+        closed_from: Optional[pd.Timestamp] = None,
+        closed_to: Optional[pd.Timestamp] = None,
+        sort: str = '-predicted_rework_risk_score'
+    ) -> pd.DataFrame:
+        """
+        Work orders matching every given filter, in the requested order.
+
+        Filters narrow the index's positions (binary search for the score,
+        the groupings for asset type and contractor) before any row is
+        touched, so the cost depends on the matches rather than the index.
+
+        Args:
+            min_score (float, optional): Minimum score (inclusive).
+            asset_type (str, optional): Asset type.
+            contractor (str, optional): Assigned contractor ID.
+            closed_from (pd.Timestamp, optional): Earliest close date (inclusive).
+            closed_to (pd.Timestamp, optional): Latest close date (inclusive).
+            sort (str, optional): One of INDEX_SORT_COLUMNS, prefixed with
+                '-' for descending. Ties keep score order; missing values
+                come last.
+
+        Returns:
+            pd.DataFrame: The matching work orders.
+
+        Raises:
+            ValueError: If sort names an unknown column.
+        """
+        column = sort.lstrip('-')
+        if column not in INDEX_SORT_COLUMNS or column not in self.frame.columns:
+            raise ValueError(f"Cannot sort by {column!r}; use one of {', '.join(INDEX_SORT_COLUMNS)}")
+        descending = sort.startswith('-')
+
+        count = len(self.frame) if min_score is None else self._count_above(min_score, strict=False)
+        positions = np.arange(count)
+        for group_column, value in (('asset_type', asset_type), ('assigned_contractor_id', contractor)):
+            if value is not None and group_column in self._groups:
+                keep = np.zeros(len(self.frame), dtype=bool)
+                keep[self._groups[group_column].get(value, [])] = True
+                positions = positions[keep[positions]]
+        if closed_from is not None or closed_to is not None:
+            closed = self._closed[positions]
+            keep = ~np.isnat(closed)
+            if closed_from is not None:
+                keep &= closed >= np.datetime64(closed_from)
+            if closed_to is not None:
+                keep &= closed <= np.datetime64(closed_to)
+            positions = positions[keep]
+
+        # The index is already in descending score order
+        if column != 'predicted_rework_risk_score' or not descending:
+            values = self._closed[positions] if column == 'closed_date' else self.frame[column].to_numpy()[positions]
+            codes, uniques = pd.factorize(values, sort=True)
+            # Missing values (code -1) map to len(uniques) either way, i.e. last
+            if descending:
+                codes = len(uniques) - 1 - codes
+            else:
+                codes[codes < 0] = len(uniques)
+            positions = positions[np.argsort(codes, kind='stable')]
+        return self.frame.iloc[positions]
+
+    def get(self, wo_id: str) -> Optional[Dict[str, Any]]:
+        """The assessment of one work order, with its risk factors, or None if it is unknown."""
+        position = self._positions.get(wo_id)
+        if position is None:
+            return None
+        return self.decode(self.frame.iloc[[position]]).iloc[0].to_dict()
+
+    def group(self, column: str, value: Any) -> pd.DataFrame:
+        """
+        Work orders with the given asset_id, asset_type,
+        assigned_contractor_id or building_id, highest risk first.
+
+        Raises:
+            KeyError: If column is not an indexed grouping.
+        """
+        positions = self._groups[column].get(value)
+        if positions is None:
+            return self.frame.iloc[:0]
+        return self.frame.iloc[positions]
+
+    def group_values(self, column: str) -> List[Any]:
+        """Distinct values of an indexed grouping."""
+        return list(self._groups[column])
+
+# Built indexes, keyed by data directory and rebuilt when a source file changes
+_indexes: Dict[str, ReworkRiskIndex] = {}
+_indexes_lock = threading.Lock()
+
+def get_rework_risk_index(data_dir: str = 'data/') -> Optional[ReworkRiskIndex]:
+    """
+    Return the rework risk index of data_dir, or None if the data cannot be loaded.
+
+    The index is built once and rebuilt only when one of the synthetic data
+    files or the rework rule set changes, so a query costs a few file stats
+    plus the lookup.
+    """
+    key = os.path.abspath(data_dir)
+    try:
+        rules = get_rework_rules()
+        signature = (
+            _file_signature([os.path.join(data_dir, name) for name in SYNTHETIC_DATA_FILES]),
+            rules.fingerprint
+        )
+    except (OSError, ValueError) as e:
+        logger.error(f"Cannot build rework risk index: {e}")
+        return None
+
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None and index.signature == signature:
+            return index
+
+        df = load_synthetic_data(data_dir)
+        if df is None:
+            return None
+        index = ReworkRiskIndex(score_rework_risk(df, rules), signature, rules)
+        _indexes[key] = index
+        logger.info(f"Built rework risk index for {len(index)} work orders from {data_dir}")
+        return index
+
+def invalidate_rework_risk_index(data_dir: Optional[str] = None) -> None:
+    """Drop the index of data_dir, or every index, forcing a rebuild on next use."""
+    with _indexes_lock:
+        if data_dir is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(os.path.abspath(data_dir), None)
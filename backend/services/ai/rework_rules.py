@@ -0,0 +1,387 @@
+"""
+Rework Rules for NYCHA QualityGuard Pro
+Declarative rework risk rules, compiled once into vectorized column operations.
+
+A rule set is a JSON document (or YAML, when PyYAML is installed):
+
+    {
+      "base_score": 0.05,
+      "score_range": [0.0, 1.0],
+      "default_factors": ["Low Base Risk"],
+      "rules": [
+        {
+          "name": "asset_age",
+          "column": "asset_age_at_wo",
+          "tiers": [
+            {"op": ">", "value": 15, "score": 0.4, "factor": "Old Asset (Age: {value})"},
+            {"op": ">", "value": 8, "score": 0.2, "factor": "Moderately Old Asset (Age: {value})"}
+          ]
+        }
+      ]
+    }
+
+Each rule reads one column and the first of its tiers whose condition holds
+applies. A tier has exactly one condition:
+- "op" and "value": numeric comparison (>, >=, <, <=, ==, !=)
+- "contains_any": case-insensitive substrings of the text
+- "in": exact values
+Missing columns, missing values and, for "op", non-numeric values match
+no tier. "factor" is a str.format template that may use {value}, the row's
+column value. Tier scores are added to base_score in rule order and the
+total is clipped to score_range.
+
+Conditions are evaluated once per distinct column value and broadcast to
+the rows, so a rule set scores at array speed whatever it contains.
+"""
+
+import gc
+import os
+import json
+import string
+import hashlib
+import logging
+import operator
+import threading
+from typing import List, Dict, Optional, Any, Tuple, Callable
+
+import numpy as np
+import pandas as pd
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Default rule set, shipped with the backend configuration
+DEFAULT_REWORK_RULES_PATH = os.getenv(
+    'REWORK_RULES_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'config', 'rework_rules.json')
+)
+
+# Numeric comparison operators a tier may use
+COMPARISON_OPS: Dict[str, Callable[[np.ndarray, float], np.ndarray]] = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne
+}
+
+TIER_CONDITIONS = ('op', 'contains_any', 'in')
+
+# Factor masks are uint64, one bit per rule tier
+MAX_FACTOR_BITS = 64
+
+class CompiledRule:
+    """
+    One rule compiled to per-distinct-value evaluation.
+
+    Args:
+        spec: The rule's entry from the rule set.
+    """
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.name = spec.get('name', spec.get('column'))
+        self.column = spec.get('column')
+        tiers = spec.get('tiers')
+        if not self.column or not isinstance(self.column, str):
+            raise ValueError(f"Rule {self.name!r} needs a 'column'")
+        if not tiers:
+            raise ValueError(f"Rule {self.name!r} needs at least one tier")
+
+        self.conditions: List[Callable[[np.ndarray], np.ndarray]] = []
+        self.templates: List[str] = []
+        scores = []
+        for tier in tiers:
+            self.conditions.append(_compile_condition(self.name, tier))
+            if 'score' not in tier:
+                raise ValueError(f"Rule {self.name!r} has a tier without a 'score'")
+            scores.append(float(tier['score']))
+            self.templates.append(str(tier.get('factor', self.name)))
+        # Trailing 0.0 for rows that match no tier (tier -1)
+        self.tier_scores = np.array(scores + [0.0], dtype=np.float64)
+
+        fields = set()
+        for template in self.templates:
+            try:
+                fields |= {field for _, field, _, _ in string.Formatter().parse(template) if field is not None}
+            except ValueError as e:
+                raise ValueError(f"Rule {self.name!r} has an invalid factor template {template!r}: {e}")
+        if fields - {'value'}:
+            raise ValueError(f"Rule {self.name!r} factor templates may only use {{value}}, not {sorted(fields - {'value'})}")
+        self.uses_value = bool(fields)
+
+    def unique_tiers(self, uniques: np.ndarray) -> np.ndarray:
+        """
+        The tier applying to each distinct column value (-1 for none), plus
+        a trailing -1 for missing values, so it can be indexed by factorize codes.
+        """
+        unique_tiers = np.full(len(uniques) + 1, -1, dtype=np.int64)
+        for tier, condition in enumerate(self.conditions):
+            unmatched = unique_tiers[:-1] == -1
+            unique_tiers[:-1][unmatched & condition(uniques)] = tier
+        return unique_tiers
+
+    def evaluate(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Evaluate the rule on every row.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Score contribution per row and
+                the tier that applied (-1 where none did).
+        """
+        if self.column not in df.columns:
+            rows = len(df)
+            return np.zeros(rows), np.full(rows, -1, dtype=np.int64)
+
+        codes, uniques = pd.factorize(df[self.column])
+        row_tiers = self.unique_tiers(uniques)[codes]
+        return self.tier_scores[row_tiers], row_tiers
+
+    def factor_codes(self, df: pd.DataFrame, row_tiers: np.ndarray) -> Tuple[np.ndarray, Callable[[int], str]]:
+        """
+        Encode each row's factor as an integer code: -1 where no tier
+        applied, otherwise the tier and, for templates using {value}, the
+        row's distinct column value.
+
+        Returns:
+            Tuple: Codes per row and a function turning a code into its label.
+
+        Raises:
+            ValueError: If a template needs {value} and df lacks the column.
+        """
+        if not self.uses_value:
+            return row_tiers, self.templates.__getitem__
+        if self.column not in df.columns:
+            if (row_tiers >= 0).any():
+                raise ValueError(f"Rule {self.name!r} factors need the '{self.column}' column")
+            return row_tiers, self.templates.__getitem__
+
+        value_codes, uniques = pd.factorize(df[self.column])
+        width = max(len(uniques), 1)
+        codes = np.where((row_tiers >= 0) & (value_codes >= 0), row_tiers * width + value_codes, -1)
+
+        def label(code: int) -> str:
+            tier, value = divmod(code, width)
+            return self.templates[tier].format(value=uniques[value])
+        return codes, label
+
+def _compile_condition(rule_name: str, tier: Dict[str, Any]) -> Callable[[np.ndarray], np.ndarray]:
+    """Turn a tier's condition into a function of the column's distinct values."""
+    present = [key for key in TIER_CONDITIONS if key in tier]
+    if len(present) != 1:
+        raise ValueError(f"Rule {rule_name!r} tiers need exactly one of {TIER_CONDITIONS}, got {present}")
+
+    if 'op' in tier:
+        compare = COMPARISON_OPS.get(tier['op'])
+        if compare is None:
+            raise ValueError(f"Rule {rule_name!r} uses unknown operator {tier['op']!r}")
+        if 'value' not in tier:
+            raise ValueError(f"Rule {rule_name!r} compares with {tier['op']!r} but has no 'value'")
+        threshold = float(tier['value'])
+
+        def condition(uniques: np.ndarray) -> np.ndarray:
+            values = pd.to_numeric(pd.Series(uniques), errors='coerce').to_numpy(dtype=np.float64)
+            # NaN != x is true; missing and non-numeric values must still match nothing
+            return compare(values, threshold) & ~np.isnan(values)
+        return condition
+
+    if 'contains_any' in tier:
+        terms = [str(term).lower() for term in tier['contains_any']]
+
+        def condition(uniques: np.ndarray) -> np.ndarray:
+            lowered = pd.Series(uniques, dtype=object).astype(str).str.lower()
+            mask = np.zeros(len(uniques), dtype=bool)
+            for term in terms:
+                mask |= lowered.str.contains(term, regex=False).to_numpy(dtype=bool)
+            return mask
+        return condition
+
+    values = list(tier['in'])
+
+    def condition(uniques: np.ndarray) -> np.ndarray:
+        return pd.Series(uniques, dtype=object).isin(values).to_numpy(dtype=bool)
+    return condition
+
+class ReworkRuleSet:
+    """
+    A compiled rework rule set.
+
+    Args:
+        spec: Parsed rule set document (see module docstring).
+    """
+
+    def __init__(self, spec: Dict[str, Any]):
+        if not isinstance(spec, dict) or not isinstance(spec.get('rules'), list):
+            raise ValueError("A rework rule set needs a 'rules' list")
+        self.spec = spec
+        self.base_score = float(spec.get('base_score', 0.0))
+        low, high = spec.get('score_range', [0.0, 1.0])
+        self.score_range = (float(low), float(high))
+        self.default_factors = [str(factor) for factor in spec.get('default_factors', [])]
+        self.rules = [CompiledRule(rule) for rule in spec['rules']]
+        # Each (rule, tier) owns one bit of the factor mask, in rule order
+        self.factor_offsets = np.cumsum([0] + [len(rule.templates) for rule in self.rules])[:-1].tolist()
+        factor_bits = sum(len(rule.templates) for rule in self.rules)
+        if factor_bits > MAX_FACTOR_BITS:
+            raise ValueError(f"A rework rule set can have at most {MAX_FACTOR_BITS} tiers in total, got {factor_bits}")
+        self.fingerprint = hashlib.sha1(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+    @property
+    def factor_table(self) -> List[Dict[str, Any]]:
+        """Lookup table of the factor mask: what each bit stands for."""
+        return [
+            {'bit': offset + tier, 'rule': rule.name, 'tier': tier, 'factor': template, 'column': rule.column}
+            for rule, offset in zip(self.rules, self.factor_offsets)
+            for tier, template in enumerate(rule.templates)
+        ]
+
+    def factor_bit(self, rule_name: str, tier: int = 0) -> np.uint64:
+        """
+        Mask bit of a rule tier, for filtering: (masks & bit) != 0.
+
+        Raises:
+            KeyError: If the rule set has no such rule or tier.
+        """
+        for rule, offset in zip(self.rules, self.factor_offsets):
+            if rule.name == rule_name and 0 <= tier < len(rule.templates):
+                return np.uint64(1) << np.uint64(offset + tier)
+        raise KeyError(f"No rework rule {rule_name!r} with tier {tier}")
+
+    def score(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score every row.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Clipped scores and the factor
+                mask of each row (uint64, one bit per rule tier that
+                applied; see factor_table).
+        """
+        score = np.full(len(df), self.base_score)
+        masks = np.zeros(len(df), dtype=np.uint64)
+        # Sum in rule order so results do not depend on evaluation details
+        for rule, offset in zip(self.rules, self.factor_offsets):
+            rule_score, row_tiers = rule.evaluate(df)
+            score += rule_score
+            # Trailing 0 for rows no tier applied to (tier -1)
+            tier_bits = np.array([1 << (offset + tier) for tier in range(len(rule.templates))] + [0], dtype=np.uint64)
+            masks |= tier_bits[row_tiers]
+        return np.clip(score, *self.score_range), masks
+
+    def decode_factors(self, df: pd.DataFrame, masks: np.ndarray, separator: Optional[str] = None) -> np.ndarray:
+        """
+        Turn factor masks back into readable factor lists, for serialization.
+
+        Templates using {value} read the rule's column from df, so df must
+        be the scored rows (or a subset with those columns).
+
+        Args:
+            df (pd.DataFrame): Rows the masks belong to.
+            masks (np.ndarray): Factor masks from score().
+            separator (str, optional): Join each row's factors into one
+                string with this separator instead of building a list per
+                row; rows then share the joined strings.
+
+        Returns:
+            np.ndarray: Object array of factor lists (or joined strings);
+                rows without factors get default_factors.
+        """
+        masks = np.asarray(masks, dtype=np.uint64)
+        factors = []
+        for rule, offset in zip(self.rules, self.factor_offsets):
+            row_tiers = np.full(len(masks), -1, dtype=np.int64)
+            for tier in range(len(rule.templates)):
+                row_tiers[(masks >> np.uint64(offset + tier)) & np.uint64(1) == 1] = tier
+            factors.append(rule.factor_codes(df, row_tiers))
+        return _factor_lists(factors, len(masks), self.default_factors, separator)
+
+def _factor_lists(
+    rules: List[Tuple[np.ndarray, Callable[[int], str]]],
+    rows: int,
+    default_factors: List[str],
+    separator: Optional[str] = None
+) -> np.ndarray:
+    """
+    Combine per-rule factor codes into one factor list per row, in rule
+    order. Each distinct combination is decoded once and copied to its rows;
+    with a separator it is joined once and the string shared by its rows.
+    """
+    combination = np.zeros(rows, dtype=np.int64)
+    for codes, _ in rules:
+        # Re-label after each rule so the combined code stays below rows
+        combination, _ = pd.factorize(combination * (codes.max(initial=-1) + 2) + (codes + 1))
+    patterns = combination.max(initial=-1) + 1
+    first_rows = np.empty(patterns, dtype=np.int64)
+    first_rows[combination[::-1]] = np.arange(rows - 1, -1, -1)
+
+    decoded = np.empty(patterns, dtype=object)
+    for pattern, row in enumerate(first_rows):
+        factors = [label(int(codes[row])) for codes, label in rules if codes[row] >= 0]
+        decoded[pattern] = factors or default_factors
+    if separator is not None:
+        return np.array([separator.join(factors) for factors in decoded], dtype=object)[combination]
+
+    # Allocating millions of small lists otherwise triggers repeated full
+    # garbage collections; these lists cannot form reference cycles.
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return np.fromiter(map(list.copy, decoded[combination]), dtype=object, count=rows)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+def load_rework_rules(path: str) -> ReworkRuleSet:
+    """
+    Read and compile a rule set file; .yaml/.yml files need PyYAML.
+
+    Raises:
+        ValueError: If the rule set is malformed.
+        ImportError: If a YAML file is given and PyYAML is not installed.
+    """
+    with open(path) as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("PyYAML is required for YAML rework rules; install it or use JSON")
+            try:
+                spec = yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise ValueError(f"Invalid YAML in {path}: {e}")
+        else:
+            spec = json.load(f)
+    return ReworkRuleSet(spec)
+
+# Compiled rule sets, keyed by path and recompiled when the file changes
+_loaded_rules: Dict[str, Tuple[Tuple[int, int], ReworkRuleSet]] = {}
+_loaded_rules_lock = threading.Lock()
+
+def get_rework_rules(path: Optional[str] = None) -> ReworkRuleSet:
+    """
+    Return the compiled rule set at path (default DEFAULT_REWORK_RULES_PATH).
+
+    The file is compiled once and recompiled when its size or mtime
+    changes, so running workers pick up edits without a restart. If an
+    edited file fails to load, the previous rule set stays in use.
+
+    Raises:
+        FileNotFoundError, ValueError: If no rule set has been loaded yet
+            and the file is missing or malformed.
+    """
+    path = path or DEFAULT_REWORK_RULES_PATH
+    with _loaded_rules_lock:
+        cached = _loaded_rules.get(path)
+        try:
+            stat = os.stat(path)
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+            rules = load_rework_rules(path)
+        except (OSError, ValueError, ImportError) as e:
+            if cached is None:
+                raise
+            logger.error(f"Failed to reload rework rules from {path}, keeping the previous rules: {e}")
+            return cached[1]
+        _loaded_rules[path] = (signature, rules)
+        logger.info(f"Loaded {len(rules.rules)} rework rules from {path} ({rules.fingerprint})")
+        return rules
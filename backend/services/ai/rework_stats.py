@@ -0,0 +1,336 @@
+"""
+Rework Statistics for NYCHA QualityGuard Pro
+Running observed rework rates per contractor, asset, asset type and building.
+
+Every work order whose outcome (actual_rework_needed) is known updates the
+counters of its contractor, asset, asset type and building in O(1), so the
+rates stay current without re-grouping the history. With a half-life the
+counters also keep an exponentially time-decayed copy, in which a work
+order closed half_life_days before the latest one counts half. A work
+order is counted once: repeats of a wo_id already counted are skipped.
+"""
+
+import os
+import logging
+import threading
+from typing import List, Dict, Optional, Any, Tuple, Set
+
+import numpy as np
+import pandas as pd
+
+from backend.services.ai.rework_predictor_service import (
+    SYNTHETIC_DATA_FILES,
+    _file_signature,
+    load_synthetic_data
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Work order columns rework is counted by
+REWORK_STAT_DIMENSIONS = ('assigned_contractor_id', 'asset_id', 'asset_type', 'building_id')
+
+# Half-life of the decayed counters, in days (empty or 0 disables decay)
+DEFAULT_HALF_LIFE_DAYS = float(os.getenv('REWORK_STATS_HALF_LIFE_DAYS', '180') or 0) or None
+
+# Pseudo work orders at the static propensity that live propensities start from
+DEFAULT_PRIOR_WEIGHT = 10.0
+
+# Counter layout: [work orders, reworks, decayed work orders, decayed reworks, latest close day]
+_COUNT, _REWORKS, _DECAYED_COUNT, _DECAYED_REWORKS, _LAST_DAY = range(5)
+
+def _work_order_days(df: pd.DataFrame) -> np.ndarray:
+    """Close date (created date if missing) of each work order, in days since the epoch."""
+    dates = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    for col in ('created_date', 'closed_date'):
+        if col in df.columns:
+            parsed = pd.to_datetime(df[col], errors='coerce')
+            dates = parsed.where(parsed.notna(), dates)
+    return (dates - pd.Timestamp(0)).dt.total_seconds().to_numpy(dtype=np.float64) / 86400
+
+class ReworkStats:
+    """
+    Rework counters per contractor, asset, asset type and building.
+
+    Args:
+        half_life_days: Half-life of the decayed counters; None keeps
+            only the all-time counters.
+    """
+
+    def __init__(self, half_life_days: Optional[float] = DEFAULT_HALF_LIFE_DAYS):
+        if half_life_days is not None and half_life_days <= 0:
+            raise ValueError("half_life_days must be positive")
+        self.half_life_days = half_life_days
+        self.work_orders = 0
+        # Latest close day seen; decayed counters are reported as of this day
+        self.as_of: Optional[float] = None
+        self._counters: Dict[str, Dict[Any, List[float]]] = {dim: {} for dim in REWORK_STAT_DIMENSIONS}
+        # Asset type and building of each asset seen, for work orders that only name the asset
+        self._assets: Dict[Any, Tuple[Any, Any]] = {}
+        # wo_id of every work order counted, so a resent outcome is not counted twice
+        self._counted: Set[Any] = set()
+        self._lock = threading.Lock()
+
+    def _decay(self, days: float) -> float:
+        """Weight of something days old."""
+        if self.half_life_days is None:
+            return 1.0
+        return 2.0 ** (-days / self.half_life_days)
+
+    def _add(self, dimension: str, key: Any, count: int, reworks: int,
+             decayed_count: float, decayed_reworks: float, last_day: float) -> None:
+        """Merge counts whose decayed part is as of last_day into one counter."""
+        counter = self._counters[dimension].get(key)
+        if counter is None:
+            self._counters[dimension][key] = [count, reworks, decayed_count, decayed_reworks, last_day]
+            return
+        counter[_COUNT] += count
+        counter[_REWORKS] += reworks
+        if last_day >= counter[_LAST_DAY]:
+            weight = self._decay(last_day - counter[_LAST_DAY])
+            counter[_DECAYED_COUNT] = counter[_DECAYED_COUNT] * weight + decayed_count
+            counter[_DECAYED_REWORKS] = counter[_DECAYED_REWORKS] * weight + decayed_reworks
+            counter[_LAST_DAY] = last_day
+        else:
+            # Late arrivals count as of their own (older) day
+            weight = self._decay(counter[_LAST_DAY] - last_day)
+            counter[_DECAYED_COUNT] += decayed_count * weight
+            counter[_DECAYED_REWORKS] += decayed_reworks * weight
+
+    def update(self, work_order: Dict[str, Any]) -> bool:
+        """
+        Count one work order in O(1).
+
+        Args:
+            work_order (Dict[str, Any]): Work order with 'actual_rework_needed'
+                and any of the dimension columns; asset_type and building_id
+                are filled in from earlier work orders on the same asset.
+                Its close (or created) date places it in time. Work orders
+                with a 'wo_id' are counted once; without one they cannot
+                be recognized when resent.
+
+        Returns:
+            bool: False if nothing was counted: the outcome is unknown or
+                the wo_id has been counted before.
+        """
+        outcome = work_order.get('actual_rework_needed')
+        if outcome is None or pd.isna(outcome):
+            return False
+        if isinstance(outcome, str):
+            outcome = outcome.strip().lower() in ('true', '1', 'yes')
+        reworked = int(bool(outcome))
+        day = np.nan
+        for col in ('closed_date', 'created_date'):
+            try:
+                date = pd.Timestamp(work_order.get(col))
+            except (TypeError, ValueError):
+                continue
+            if not pd.isna(date):
+                day = (date - pd.Timestamp(0)).total_seconds() / 86400
+                break
+
+        wo_id = work_order.get('wo_id')
+        with self._lock:
+            if wo_id is not None and pd.notna(wo_id):
+                if wo_id in self._counted:
+                    return False
+                self._counted.add(wo_id)
+            if np.isnan(day):
+                day = self.as_of if self.as_of is not None else 0.0
+            self.as_of = day if self.as_of is None else max(self.as_of, day)
+            keys = {dim: work_order.get(dim) for dim in REWORK_STAT_DIMENSIONS}
+            asset_id = keys['asset_id']
+            if pd.notna(asset_id):
+                asset_type, building_id = self._assets.get(asset_id, (None, None))
+                if pd.isna(keys['asset_type']):
+                    keys['asset_type'] = asset_type
+                if pd.isna(keys['building_id']):
+                    keys['building_id'] = building_id
+                self._assets[asset_id] = (keys['asset_type'], keys['building_id'])
+            for dim, key in keys.items():
+                if key is not None and pd.notna(key):
+                    self._add(dim, key, 1, reworked, 1.0, float(reworked), day)
+            self.work_orders += 1
+        return True
+
+    def update_frame(self, df: pd.DataFrame) -> int:
+        """
+        Count a batch of work orders, e.g. the history at startup.
+
+        Only the batch is grouped; its per-key sums are then merged into the
+        counters, so the cost depends on the batch, not the history. As in
+        update(), a wo_id is counted once, also within the batch.
+
+        Returns:
+            int: Work orders counted (those with a known outcome not counted before).
+        """
+        if 'actual_rework_needed' not in df.columns:
+            return 0
+        df = df[df['actual_rework_needed'].notna().to_numpy()]
+
+        with self._lock:
+            if 'wo_id' in df.columns:
+                wo_ids = df['wo_id']
+                repeat = wo_ids.notna() & (wo_ids.duplicated() | wo_ids.isin(self._counted))
+                df = df[~repeat.to_numpy()]
+                self._counted.update(df['wo_id'].dropna())
+            if df.empty:
+                return 0
+            reworked = df['actual_rework_needed'].astype(bool).to_numpy(dtype=np.int64)
+            days = _work_order_days(df)
+            fallback = np.nanmax(days) if np.isfinite(days).any() else (self.as_of or 0.0)
+            days = np.where(np.isnan(days), fallback, days)
+            self.as_of = float(days.max()) if self.as_of is None else max(self.as_of, float(days.max()))
+            for dim in REWORK_STAT_DIMENSIONS:
+                if dim not in df.columns:
+                    continue
+                codes, uniques = pd.factorize(df[dim])
+                present = codes >= 0
+                codes, dim_days, dim_reworked = codes[present], days[present], reworked[present]
+                groups = len(uniques)
+                last_day = np.full(groups, -np.inf)
+                np.maximum.at(last_day, codes, dim_days)
+                weight = np.exp2(-(last_day[codes] - dim_days) / self.half_life_days) \
+                    if self.half_life_days is not None else np.ones(len(codes))
+                sums = zip(
+                    np.bincount(codes, minlength=groups).tolist(),
+                    np.bincount(codes, weights=dim_reworked, minlength=groups).astype(np.int64).tolist(),
+                    np.bincount(codes, weights=weight, minlength=groups).tolist(),
+                    np.bincount(codes, weights=weight * dim_reworked, minlength=groups).tolist(),
+                    last_day.tolist()
+                )
+                for key, group_sums in zip(uniques, sums):
+                    self._add(dim, key, *group_sums)
+            if {'asset_id', 'asset_type', 'building_id'} <= set(df.columns):
+                assets = df[['asset_id', 'asset_type', 'building_id']].dropna(subset=['asset_id'])
+                self._assets.update(zip(assets['asset_id'], zip(assets['asset_type'], assets['building_id'])))
+            self.work_orders += len(df)
+        return len(df)
+
+    def get(self, dimension: str, key: Any) -> Optional[Dict[str, Any]]:
+        """
+        Counters of one contractor, asset, asset type or building, or None if unseen.
+
+        Raises:
+            KeyError: If dimension is not one of REWORK_STAT_DIMENSIONS.
+        """
+        with self._lock:
+            counter = self._counters[dimension].get(key)
+            return None if counter is None else self._row(key, counter)
+
+    def _row(self, key: Any, counter: List[float]) -> Dict[str, Any]:
+        count, reworks, decayed_count, decayed_reworks, last_day = counter
+        row = {
+            'key': key,
+            'work_orders': int(count),
+            'reworks': int(reworks),
+            'rework_rate': reworks / count,
+            'last_closed': pd.Timestamp(last_day * 86400, unit='s').strftime('%Y-%m-%d')
+        }
+        if self.half_life_days is not None:
+            # Decay to the common as_of day so keys are comparable
+            weight = self._decay(self.as_of - last_day)
+            row['decayed_work_orders'] = decayed_count * weight
+            row['decayed_reworks'] = decayed_reworks * weight
+            row['decayed_rework_rate'] = decayed_reworks / decayed_count
+        return row
+
+    def snapshot(self, dimension: str) -> pd.DataFrame:
+        """
+        Counters of every key of a dimension, most work orders first.
+
+        Raises:
+            KeyError: If dimension is not one of REWORK_STAT_DIMENSIONS.
+        """
+        with self._lock:
+            rows = [self._row(key, counter) for key, counter in self._counters[dimension].items()]
+        df = pd.DataFrame(rows, columns=None if rows else ['key', 'work_orders', 'reworks', 'rework_rate'])
+        return df.sort_values('work_orders', ascending=False, kind='stable').reset_index(drop=True)
+
+    def live_propensity(
+        self,
+        contractor_ids: pd.Series,
+        base_propensity: Optional[pd.Series] = None,
+        prior_weight: float = DEFAULT_PRIOR_WEIGHT,
+        decayed: bool = True
+    ) -> np.ndarray:
+        """
+        Contractor rework propensities from the observed rates.
+
+        Each contractor's observed reworks are combined with prior_weight
+        pseudo work orders at its static propensity, so contractors with
+        little history stay close to it. Without a static propensity the
+        observed rate is used as is.
+
+        Args:
+            contractor_ids (pd.Series): Contractor of each work order.
+            base_propensity (pd.Series, optional): Static propensity of each
+                work order's contractor (e.g. 'contractor_rework_propensity').
+            prior_weight (float, optional): Weight of the static propensity,
+                in work orders.
+            decayed (bool, optional): Use the time-decayed counters when kept.
+
+        Returns:
+            np.ndarray: Propensity per work order (NaN for unseen contractors
+                without a static propensity).
+        """
+        codes, uniques = pd.factorize(contractor_ids)
+        count_col, rework_col = (_DECAYED_COUNT, _DECAYED_REWORKS) \
+            if decayed and self.half_life_days is not None else (_COUNT, _REWORKS)
+        counters = self._counters['assigned_contractor_id']
+        with self._lock:
+            observed = np.array([
+                (counter[count_col], counter[rework_col]) if counter is not None else (0.0, 0.0)
+                for counter in map(counters.get, uniques)
+            ], dtype=np.float64).reshape(-1, 2)
+        # Trailing row for missing contractors
+        observed = np.vstack([observed, [0.0, 0.0]])[codes]
+        count, reworks = observed[:, 0], observed[:, 1]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rate = reworks / count
+            if base_propensity is None:
+                return rate
+            base = base_propensity.to_numpy(dtype=np.float64)
+            blended = (reworks + prior_weight * base) / (count + prior_weight)
+        return np.where(np.isnan(base), rate, blended)
+
+    def with_live_propensity(self, df: pd.DataFrame, **kwargs: Any) -> pd.DataFrame:
+        """Work orders with 'contractor_rework_propensity' replaced by live_propensity."""
+        df = df.copy(deep=False)
+        df['contractor_rework_propensity'] = self.live_propensity(
+            df['assigned_contractor_id'], df.get('contractor_rework_propensity'), **kwargs
+        )
+        return df
+
+# Stats built from each data directory, rebuilt when a source file changes
+_stats: Dict[str, Tuple[Tuple, ReworkStats]] = {}
+_stats_lock = threading.Lock()
+
+def get_rework_stats(data_dir: str = 'data/') -> Optional[ReworkStats]:
+    """
+    Return the rework statistics of data_dir, or None if the data cannot be loaded.
+
+    They are built from the work order history once and then kept current
+    by update() calls. If one of the synthetic data files changes they are
+    rebuilt from it, dropping updates not yet in the files.
+    """
+    key = os.path.abspath(data_dir)
+    try:
+        signature = _file_signature([os.path.join(data_dir, name) for name in SYNTHETIC_DATA_FILES])
+    except OSError as e:
+        logger.error(f"Cannot build rework stats: {e}")
+        return None
+
+    with _stats_lock:
+        cached = _stats.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        df = load_synthetic_data(data_dir)
+        if df is None:
+            return None
+        stats = ReworkStats()
+        counted = stats.update_frame(df)
+        _stats[key] = (signature, stats)
+        logger.info(f"Built rework stats from {counted} work orders in {data_dir}")
+        return stats
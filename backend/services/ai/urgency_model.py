@@ -0,0 +1,302 @@
+"""
+Urgency Model for NYCHA QualityGuard Pro
+Optional learned urgency classifier complementing the keyword rules in nlp_service.
+
+Complaint text is turned into features by a stateless HashingVectorizer, so
+no vocabulary has to be fitted, stored or kept in sync, and scored by a
+linear model. The persisted artifact is just the weight vector (.npy,
+memory-mapped on load) plus a small JSON metadata file. scikit-learn and
+scipy are imported only when a model is built, loaded or trained, so the
+keyword rules in nlp_service work without them.
+
+Train offline, from keyword-labelled complaints or a hand-labelled CSV with
+an 'is_urgent' column:
+    python -m backend.services.ai.urgency_model data/311_hpd_store.csv
+"""
+
+import os
+import json
+import shutil
+import logging
+import threading
+from datetime import datetime
+from typing import List, Dict, Optional, Any, Tuple, TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from scipy import sparse
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Default artifact location, next to the other project data
+DEFAULT_URGENCY_MODEL_DIR = os.getenv(
+    'URGENCY_MODEL_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'data', 'urgency_model')
+)
+
+# Complaint columns the model reads; each is hashed separately and summed
+MODEL_TEXT_COLUMNS = ['descriptor', 'complaint_type', 'resolution_description']
+
+# Vectorizer settings; persisted with the weights so inference always matches training
+HASHING_PARAMS = {
+    'n_features': 2 ** 18,
+    'ngram_range': (1, 2),
+    'alternate_sign': False,
+    'binary': True,
+    'norm': None
+}
+
+# Distinct texts vectorized per sparse batch
+INFERENCE_BATCH_SIZE = 50000
+
+def _make_vectorizer(params: Dict[str, Any]) -> 'HashingVectorizer':
+    try:
+        from sklearn.feature_extraction.text import HashingVectorizer
+    except ImportError:
+        raise ImportError("scikit-learn is required for the urgency model; install it or use mode='rules'")
+    params = dict(params, ngram_range=tuple(params['ngram_range']))
+    return HashingVectorizer(lowercase=True, **params)
+
+def _distinct_texts(series: pd.Series) -> Tuple[np.ndarray, List[str]]:
+    """Factorize a text column; missing values get code -1."""
+    codes, uniques = pd.factorize(series)
+    return codes, [str(value) for value in uniques]
+
+def hashed_features(df: pd.DataFrame, params: Dict[str, Any] = HASHING_PARAMS) -> 'sparse.csr_matrix':
+    """
+    Build the sparse feature matrix of a complaint frame.
+
+    Each text column is vectorized once per distinct value and rows are
+    gathered through the factorize codes; the columns' features are summed.
+
+    Args:
+        df (pd.DataFrame): Complaints with the MODEL_TEXT_COLUMNS.
+        params (Dict[str, Any], optional): HashingVectorizer settings.
+
+    Returns:
+        sparse.csr_matrix: One row per complaint.
+    """
+    from scipy import sparse
+
+    vectorizer = _make_vectorizer(params)
+    features = sparse.csr_matrix((len(df), params['n_features']), dtype=np.float64)
+    for col in MODEL_TEXT_COLUMNS:
+        if col not in df.columns:
+            continue
+        codes, uniques = _distinct_texts(df[col])
+        # Trailing empty row for missing values (code -1)
+        unique_features = sparse.vstack([
+            vectorizer.transform(uniques),
+            sparse.csr_matrix((1, params['n_features']))
+        ]).tocsr()
+        features = features + unique_features[codes]
+    return features.tocsr()
+
+class UrgencyModel:
+    """
+    Linear urgency classifier over hashed complaint text.
+
+    Args:
+        coef: Weight vector of length n_features (may be a read-only memmap).
+        intercept: Bias term.
+        threshold: Probability at or above which a complaint is urgent.
+        params: HashingVectorizer settings used in training.
+        metadata: Extra training details stored with the artifact.
+    """
+
+    def __init__(
+        self,
+        coef: np.ndarray,
+        intercept: float,
+        threshold: float = 0.5,
+        params: Optional[Dict[str, Any]] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        self.coef = coef
+        self.intercept = float(intercept)
+        self.threshold = threshold
+        self.params = dict(params or HASHING_PARAMS)
+        self.metadata = metadata or {}
+        self._vectorizer = _make_vectorizer(self.params)
+
+    @property
+    def identity(self) -> Dict[str, Any]:
+        """Fields that tell one trained artifact from another."""
+        return {
+            'intercept': self.intercept,
+            'threshold': self.threshold,
+            'trained_at': self.metadata.get('trained_at'),
+            'training_rows': self.metadata.get('training_rows')
+        }
+
+    def decision_function(self, df: pd.DataFrame, batch_size: int = INFERENCE_BATCH_SIZE) -> np.ndarray:
+        """
+        Compute the model's logit for every complaint.
+
+        The model is linear and the column features are summed, so each
+        distinct text is scored once, in sparse batches, and the per-column
+        scores are broadcast through the factorize codes.
+
+        Returns:
+            np.ndarray: Logits, one per row.
+        """
+        scores = np.full(len(df), self.intercept, dtype=np.float64)
+        for col in MODEL_TEXT_COLUMNS:
+            if col not in df.columns:
+                continue
+            codes, uniques = _distinct_texts(df[col])
+            # Trailing zero for missing values (code -1)
+            unique_scores = np.zeros(len(uniques) + 1, dtype=np.float64)
+            for start in range(0, len(uniques), batch_size):
+                batch = self._vectorizer.transform(uniques[start:start + batch_size])
+                unique_scores[start:start + batch.shape[0]] = batch @ self.coef
+            scores += unique_scores[codes]
+        return scores
+
+    def predict_proba(self, df: pd.DataFrame, batch_size: int = INFERENCE_BATCH_SIZE) -> np.ndarray:
+        """Probability that each complaint is urgent."""
+        return 1.0 / (1.0 + np.exp(-self.decision_function(df, batch_size)))
+
+    def predict(self, df: pd.DataFrame, batch_size: int = INFERENCE_BATCH_SIZE) -> np.ndarray:
+        """Boolean urgency prediction for each complaint."""
+        return self.predict_proba(df, batch_size) >= self.threshold
+
+    def save(self, model_dir: str) -> str:
+        """
+        Persist the model as coef.npy plus meta.json.
+
+        The artifact is written to a temporary directory and swapped into
+        place: the previous model is renamed aside, the new one renamed in,
+        and only then is the old one deleted. A concurrent load never sees a
+        half-written model, and the window with no model on disk is a single
+        rename rather than a recursive delete.
+
+        Returns:
+            str: The artifact directory.
+        """
+        tmp_dir = f"{model_dir.rstrip(os.sep)}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, 'coef.npy'), np.ascontiguousarray(self.coef, dtype=np.float64))
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+            json.dump({
+                'intercept': self.intercept,
+                'threshold': self.threshold,
+                'hashing_params': self.params,
+                'text_columns': MODEL_TEXT_COLUMNS,
+                **self.metadata
+            }, f, indent=2)
+        old_dir = f"{model_dir.rstrip(os.sep)}.old"
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.exists(model_dir):
+            os.replace(model_dir, old_dir)
+        os.replace(tmp_dir, model_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        return model_dir
+
+    @classmethod
+    def load(cls, model_dir: str) -> 'UrgencyModel':
+        """
+        Load a saved model. The weight vector is memory-mapped rather than
+        read, so loading is near-instant and the pages are shared between
+        worker processes.
+
+        Raises:
+            FileNotFoundError: If no model has been saved in model_dir.
+        """
+        with open(os.path.join(model_dir, 'meta.json')) as f:
+            meta = json.load(f)
+        coef = np.load(os.path.join(model_dir, 'coef.npy'), mmap_mode='r')
+        known = ('intercept', 'threshold', 'hashing_params', 'text_columns')
+        return cls(
+            coef,
+            meta['intercept'],
+            threshold=meta['threshold'],
+            params=meta['hashing_params'],
+            metadata={k: v for k, v in meta.items() if k not in known}
+        )
+
+def train_urgency_model(
+    df: pd.DataFrame,
+    labels: Optional[np.ndarray] = None,
+    threshold: float = 0.5,
+    C: float = 1.0
+) -> UrgencyModel:
+    """
+    Train an urgency model offline.
+
+    Args:
+        df (pd.DataFrame): Complaints with the MODEL_TEXT_COLUMNS.
+        labels (np.ndarray, optional): Hand labels. Defaults to an
+            'is_urgent' column of df, or else the keyword rules' verdict.
+        threshold (float, optional): Decision threshold on the probability.
+        C (float, optional): Inverse regularization strength.
+
+    Returns:
+        UrgencyModel: The trained model.
+    """
+    label_source = 'provided'
+    if labels is None:
+        if 'is_urgent' in df.columns:
+            labels, label_source = df['is_urgent'].to_numpy(dtype=bool), 'is_urgent column'
+        else:
+            from backend.services.ai.nlp_service import flag_urgent_complaints
+            labels, label_source = flag_urgent_complaints(df)['is_urgent'].to_numpy(dtype=bool), 'keyword rules'
+
+    from sklearn.linear_model import LogisticRegression
+
+    features = hashed_features(df)
+    classifier = LogisticRegression(C=C, solver='liblinear')
+    classifier.fit(features, labels)
+    logger.info(f"Trained urgency model on {len(df)} complaints ({label_source} labels, "
+                f"{int(np.sum(labels))} urgent)")
+    return UrgencyModel(
+        classifier.coef_.ravel(),
+        classifier.intercept_[0],
+        threshold=threshold,
+        metadata={
+            'trained_at': datetime.now().isoformat(timespec='seconds'),
+            'training_rows': len(df),
+            'label_source': label_source
+        }
+    )
+
+# Loaded models, keyed by directory and reloaded when the artifact changes
+_loaded_models: Dict[str, Tuple[float, UrgencyModel]] = {}
+_loaded_models_lock = threading.Lock()
+
+def get_urgency_model(model_dir: Optional[str] = None) -> Optional[UrgencyModel]:
+    """
+    Return the saved urgency model, or None if none has been trained.
+    The model is loaded once and reloaded when its metadata file changes.
+    """
+    model_dir = model_dir or DEFAULT_URGENCY_MODEL_DIR
+    meta_path = os.path.join(model_dir, 'meta.json')
+    try:
+        mtime = os.path.getmtime(meta_path)
+    except OSError:
+        return None
+    with _loaded_models_lock:
+        cached = _loaded_models.get(model_dir)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, UrgencyModel.load(model_dir))
+            _loaded_models[model_dir] = cached
+        return cached[1]
+
+if __name__ == '__main__':
+    import argparse
+    from backend.services.data_ingestion_service import read_311_csv
+
+    parser = argparse.ArgumentParser(description='Train the urgency model from processed 311 complaints')
+    parser.add_argument('csv', help="Processed 311 CSV; an 'is_urgent' column is used as hand labels")
+    parser.add_argument('--out', default=DEFAULT_URGENCY_MODEL_DIR)
+    parser.add_argument('--threshold', type=float, default=0.5)
+    args = parser.parse_args()
+
+    complaints = read_311_csv(args.csv)
+    model = train_urgency_model(complaints, threshold=args.threshold)
+    print(f"Saved urgency model to {model.save(args.out)}")
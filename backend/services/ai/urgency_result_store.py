@@ -0,0 +1,234 @@
+"""
+Urgency Result Store for NYCHA QualityGuard Pro
+Persists per-complaint urgency results so re-analysis only touches new or changed complaints.
+"""
+
+import os
+import re
+import shutil
+import hashlib
+import json
+import logging
+import threading
+import uuid
+from typing import List, Dict, Optional, Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Segments per version before they are merged into one
+MAX_SEGMENTS = 16
+
+# Segment file names: a sequence number, then a random suffix so that
+# processes saving at the same time never pick the same name. Temporary
+# files written next to them never match.
+SEGMENT_NAME = re.compile(r'^seg-(\d{6})-[0-9a-f]{12}\.npz$')
+
+def urgency_version(vocabulary: Tuple[str, ...], mode: str, model_identity: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Hash everything a stored result depends on: the keyword set, the
+    detection mode and, for model modes, the identity of the model.
+    Changing any of them starts a fresh, empty result set.
+    """
+    payload = json.dumps({
+        'keywords': list(vocabulary),
+        'mode': mode,
+        'model': model_identity
+    }, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+def text_hashes(df: pd.DataFrame, columns: List[str]) -> np.ndarray:
+    """
+    Hash each row's analyzed text, so a complaint whose text changed (e.g.
+    a resolution added later) is analyzed again. Categorical and plain
+    string columns with equal values hash equally.
+    """
+    present = [col for col in columns if col in df.columns]
+    if not present:
+        return np.zeros(len(df), dtype=np.uint64)
+    text = df[present].astype(object).where(df[present].notna(), '')
+    return pd.util.hash_pandas_object(text, index=False).to_numpy(dtype=np.uint64)
+
+class UrgencyResultStore:
+    """
+    On-disk store of urgency results keyed by unique_key, per version.
+
+    A result is stored as the complaint's text hash, its keyword hits
+    (bit-packed, in matcher vocabulary order) and the model probability
+    (NaN when no model ran). Each save appends a small .npz segment; the
+    segments of a version are merged once there are more than MAX_SEGMENTS.
+    Lookups use an in-memory index sorted by unique_key, loaded once per
+    version and reloaded when another process adds segments.
+
+    Several processes may save to the same directory without a shared lock.
+    Segment names are unique, and a compaction only removes the segments it
+    merged, so no process drops results another one wrote. A result depends
+    only on its version and text hash, so when two segments hold the same
+    key either copy is correct.
+
+    Args:
+        root: Directory holding one subdirectory per version.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, Dict[str, np.ndarray]] = {}
+        self._known_segments: Dict[str, List[str]] = {}
+
+    def _version_dir(self, version: str) -> str:
+        return os.path.join(self.root, version)
+
+    def _segments(self, version: str) -> List[str]:
+        version_dir = self._version_dir(version)
+        if not os.path.isdir(version_dir):
+            return []
+        return sorted(
+            os.path.join(version_dir, name) for name in os.listdir(version_dir)
+            if SEGMENT_NAME.match(name)
+        )
+
+    def _load_index(self, version: str) -> Dict[str, np.ndarray]:
+        while True:
+            segments = self._segments(version)
+            index = self._indexes.get(version)
+            if index is not None and self._known_segments.get(version) == segments:
+                return index
+            try:
+                parts = []
+                for path in segments:
+                    with np.load(path) as segment:
+                        parts.append({name: segment[name] for name in segment.files})
+            except FileNotFoundError:
+                # Another process compacted these segments; its merged one is listed now
+                continue
+            index = _merge_results(parts)
+            self._indexes[version] = index
+            self._known_segments[version] = segments
+            return index
+
+    def lookup(
+        self,
+        version: str,
+        keys: np.ndarray,
+        hashes: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Find stored results for complaints whose text is unchanged.
+
+        Args:
+            version (str): Result version from urgency_version.
+            keys (np.ndarray): unique_key of each complaint.
+            hashes (np.ndarray): text_hashes of each complaint.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: Mask of complaints
+                found, and for those rows the packed keyword hits and the
+                model probabilities.
+        """
+        with self._lock:
+            index = self._load_index(version)
+        stored_keys = index['unique_key']
+        if len(stored_keys) == 0:
+            return np.zeros(len(keys), dtype=bool), index['hits'][:0], index['probability'][:0]
+
+        positions = np.minimum(np.searchsorted(stored_keys, keys), len(stored_keys) - 1)
+        found = (stored_keys[positions] == keys) & (index['text_hash'][positions] == hashes)
+        rows = positions[found]
+        return found, index['hits'][rows], index['probability'][rows]
+
+    def save(
+        self,
+        version: str,
+        keys: np.ndarray,
+        hashes: np.ndarray,
+        packed_hits: np.ndarray,
+        probability: np.ndarray
+    ) -> None:
+        """Store freshly computed results, replacing older ones for the same keys."""
+        if len(keys) == 0:
+            return
+        new = {
+            'unique_key': np.asarray(keys, dtype=np.int64),
+            'text_hash': np.asarray(hashes, dtype=np.uint64),
+            'hits': np.asarray(packed_hits, dtype=np.uint8),
+            'probability': np.asarray(probability, dtype=np.float64)
+        }
+        with self._lock:
+            index = self._load_index(version)
+            # Only the segments merged into index; others may appear meanwhile
+            segments = self._known_segments[version]
+            version_dir = self._version_dir(version)
+            os.makedirs(version_dir, exist_ok=True)
+            sequence = int(SEGMENT_NAME.match(os.path.basename(segments[-1])).group(1)) + 1 if segments else 1
+            new_path = _segment_path(version_dir, sequence)
+            _write_segment(new_path, new)
+            segments = segments + [new_path]
+
+            merged = _merge_results([index, new])
+            if len(segments) > MAX_SEGMENTS:
+                compacted_path = _segment_path(version_dir, sequence + 1)
+                _write_segment(compacted_path, merged)
+                for path in segments:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        # Already merged and removed by another process
+                        pass
+                segments = [compacted_path]
+                logger.info(f"Compacted urgency results {version} into one segment ({len(merged['unique_key'])} rows)")
+            self._indexes[version] = merged
+            self._known_segments[version] = segments
+
+    def clear(self) -> None:
+        """Delete every stored result."""
+        with self._lock:
+            shutil.rmtree(self.root, ignore_errors=True)
+            self._indexes.clear()
+            self._known_segments.clear()
+
+# Open stores, keyed by directory, so every request shares one in-memory index
+_stores: Dict[str, UrgencyResultStore] = {}
+_stores_lock = threading.Lock()
+
+def get_urgency_result_store(root: str) -> UrgencyResultStore:
+    """Return the result store of root, opening it on first use."""
+    key = os.path.abspath(root)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = UrgencyResultStore(key)
+            _stores[key] = store
+        return store
+
+def _merge_results(parts: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Concatenate result sets, keep the last result per key and sort by key."""
+    parts = [part for part in parts if part and len(part['unique_key'])]
+    if not parts:
+        return {
+            'unique_key': np.zeros(0, dtype=np.int64),
+            'text_hash': np.zeros(0, dtype=np.uint64),
+            'hits': np.zeros((0, 0), dtype=np.uint8),
+            'probability': np.zeros(0, dtype=np.float64)
+        }
+    merged = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+    # Stable sort on the reversed arrays puts the newest copy of each key first
+    keys = merged['unique_key'][::-1]
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    first = np.ones(len(sorted_keys), dtype=bool)
+    first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    rows = (len(keys) - 1 - order)[first]
+    return {name: values[rows] for name, values in merged.items()}
+
+def _segment_path(version_dir: str, sequence: int) -> str:
+    return os.path.join(version_dir, f"seg-{sequence:06d}-{uuid.uuid4().hex[:12]}.npz")
+
+def _write_segment(path: str, arrays: Dict[str, np.ndarray]) -> None:
+    directory, name = os.path.split(path)
+    tmp_path = os.path.join(directory, f".tmp-{name}")
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
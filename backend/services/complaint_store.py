@@ -0,0 +1,474 @@
+"""
+Complaint Store for NYCHA QualityGuard Pro
+Partitioned columnar on-disk store for cleaned 311 complaint frames.
+"""
+
+import os
+import json
+import shutil
+import logging
+import threading
+from datetime import datetime
+from typing import List, Dict, Optional, Any, Iterable, Union
+
+import numpy as np
+import pandas as pd
+
+from backend.services.data_ingestion_service import (
+    COMPLAINT_311_SCHEMA,
+    apply_311_schema,
+    concat_311_frames
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Part file formats; 'npy' needs nothing beyond NumPy
+STORE_ENGINES = ('parquet', 'feather', 'npy')
+
+MANIFEST_FILE = '_manifest.json'
+
+# Times read() starts over when a concurrent compaction removes a part it was reading
+READ_ATTEMPTS = 3
+
+# Partition value used for complaints without a borough
+UNSPECIFIED_BOROUGH = 'unspecified'
+
+TimestampLike = Union[str, datetime, pd.Timestamp]
+
+# One lock per store directory, shared by every ComplaintStore opened on it
+# in this process, so concurrent writers never interleave manifest updates
+_store_locks: Dict[str, threading.Lock] = {}
+_store_locks_guard = threading.Lock()
+
+def _store_lock(root: str) -> threading.Lock:
+    """Return the process-wide lock guarding the manifest of the store at root."""
+    key = os.path.realpath(root)
+    with _store_locks_guard:
+        return _store_locks.setdefault(key, threading.Lock())
+
+def detect_store_engine() -> str:
+    """
+    Pick the best part format available: Parquet (pyarrow or fastparquet),
+    else plain NumPy. Feather also needs pyarrow, so it is never picked over
+    Parquet and is only used when requested explicitly.
+    """
+    try:
+        import pyarrow  # noqa: F401
+        return 'parquet'
+    except ImportError:
+        pass
+    try:
+        import fastparquet  # noqa: F401
+        return 'parquet'
+    except ImportError:
+        return 'npy'
+
+def complaint_store_path(data_dir: str, agency_filter: str = 'HPD') -> str:
+    """Return the directory of the complaint store for an agency."""
+    return os.path.join(data_dir, f"311_{agency_filter.lower()}_complaints")
+
+def open_complaint_store(data_dir: str, agency_filter: str = 'HPD') -> 'ComplaintStore':
+    """
+    Open (or create) the complaint store for an agency.
+
+    Borough partitioning is enabled for new stores when the
+    COMPLAINT_STORE_PARTITION_BY_BOROUGH environment variable is set.
+    """
+    partition_by_borough = os.getenv('COMPLAINT_STORE_PARTITION_BY_BOROUGH', '').lower() in ('1', 'true', 'yes')
+    return ComplaintStore(complaint_store_path(data_dir, agency_filter), partition_by_borough=partition_by_borough)
+
+class ComplaintStore:
+    """
+    Columnar 311 complaint store partitioned by created_date month, and
+    optionally by borough.
+
+    Each write adds one part per partition it touches, sorted by
+    (created_date, unique_key). A JSON manifest records every part with its
+    row count and created_date range, so reads skip partitions and parts
+    outside the requested window without opening them, and only the
+    requested columns are loaded. With the NumPy engine each column is its
+    own memory-mapped .npy file, so a date window is a searchsorted slice
+    that never touches rows outside it.
+
+    Records are keyed by unique_key: when a partition holds several parts,
+    the most recently written copy of a complaint wins. compact() merges
+    the parts of a partition into one.
+
+    Stores opened on the same directory share one lock, and writes and
+    reads reload the manifest under it, so concurrent writers in a process
+    never drop each other's parts and readers always see the latest parts.
+
+    Args:
+        root: Directory holding the partitions and the manifest.
+        engine: 'parquet', 'feather' or 'npy'. Detected from the installed
+            libraries when omitted; an existing store keeps its engine.
+        partition_by_borough: Also partition each month by borough.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        engine: Optional[str] = None,
+        partition_by_borough: bool = False
+    ):
+        self.root = root
+        self._lock = _store_lock(root)
+        manifest = self._load_manifest()
+        if manifest:
+            self.engine = manifest['engine']
+            self.partition_by_borough = manifest['partition_by_borough']
+            self._manifest = manifest
+        else:
+            self.engine = engine or detect_store_engine()
+            self.partition_by_borough = partition_by_borough
+            self._manifest = {
+                'version': 1,
+                'engine': self.engine,
+                'partition_by_borough': self.partition_by_borough,
+                'sequence': 0,
+                'parts': []
+            }
+        if self.engine not in STORE_ENGINES:
+            raise ValueError(f"Unknown store engine: {self.engine}")
+
+    def __len__(self) -> int:
+        """Number of stored rows, counting not yet compacted duplicates."""
+        return sum(part['rows'] for part in self._manifest['parts'])
+
+    @property
+    def parts(self) -> List[Dict[str, Any]]:
+        """Manifest entries of all parts, oldest first."""
+        return list(self._manifest['parts'])
+
+    def _load_manifest(self) -> Optional[Dict[str, Any]]:
+        path = os.path.join(self.root, MANIFEST_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _refresh_manifest(self) -> None:
+        """Reload the manifest under the store lock so writes from other instances are kept."""
+        manifest = self._load_manifest()
+        if manifest:
+            self._manifest = manifest
+
+    def _save_manifest(self) -> None:
+        """Write the manifest atomically; parts not listed in it are invisible to readers."""
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, MANIFEST_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._manifest, f, indent=1)
+        os.replace(tmp_path, path)
+
+    def _partition_keys(self, df: pd.DataFrame) -> pd.DataFrame:
+        keys = pd.DataFrame({'month': df['created_date'].dt.strftime('%Y-%m')}, index=df.index)
+        if self.partition_by_borough:
+            borough = df['borough'].astype(object).fillna('').astype(str).str.lower()
+            keys['borough'] = borough.replace('', UNSPECIFIED_BOROUGH)
+        return keys
+
+    def write(self, df: pd.DataFrame) -> int:
+        """
+        Add a cleaned 311 frame to the store.
+
+        Args:
+            df (pd.DataFrame): Cleaned complaint frame, e.g. a chunk from
+                stream_311_data.
+
+        Returns:
+            int: Number of rows written.
+        """
+        self._write(df)
+        return len(df)
+
+    def _write(self, df: pd.DataFrame) -> set:
+        """Write a frame and return the (month, borough) partitions it touched."""
+        if df.empty:
+            return set()
+        df = apply_311_schema(df.copy())
+        keys = self._partition_keys(df)
+        touched = set()
+        with self._lock:
+            self._refresh_manifest()
+            for key, group in df.groupby([keys[col] for col in keys.columns], sort=False, observed=True):
+                month = key[0] if isinstance(key, tuple) else key
+                borough = key[1] if self.partition_by_borough else None
+                self._write_part(group, month, borough)
+                touched.add((month, borough))
+            self._save_manifest()
+        return touched
+
+    def write_chunks(self, chunks: Iterable[pd.DataFrame], compact: bool = True) -> int:
+        """
+        Stream cleaned chunks into the store.
+
+        The manifest is saved after every chunk, so chunks written before a
+        failure stay readable. The touched partitions are compacted at the
+        end unless compact is False.
+
+        Returns:
+            int: Number of rows written.
+        """
+        rows = 0
+        touched = set()
+        for chunk in chunks:
+            touched |= self._write(chunk)
+            rows += len(chunk)
+        if compact:
+            self.compact(touched)
+        return rows
+
+    def _write_part(self, group: pd.DataFrame, month: str, borough: Optional[str]) -> None:
+        group = group.sort_values(['created_date', 'unique_key'], kind='stable').reset_index(drop=True)
+        self._manifest['sequence'] += 1
+        partition = f"month={month}" + (f"/borough={borough}" if borough is not None else '')
+        suffix = {'parquet': '.parquet', 'feather': '.feather', 'npy': ''}[self.engine]
+        rel_path = f"{partition}/part-{self._manifest['sequence']:06d}{suffix}"
+        path = os.path.join(self.root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        if self.engine == 'parquet':
+            group.to_parquet(path, index=False)
+        elif self.engine == 'feather':
+            group.to_feather(path)
+        else:
+            _write_npy_part(group, path)
+
+        self._manifest['parts'].append({
+            'path': rel_path,
+            'month': month,
+            'borough': borough,
+            'rows': len(group),
+            'min_created_date': group['created_date'].iloc[0].isoformat(),
+            'max_created_date': group['created_date'].iloc[-1].isoformat()
+        })
+
+    def read(
+        self,
+        columns: Optional[List[str]] = None,
+        start: Optional[TimestampLike] = None,
+        end: Optional[TimestampLike] = None,
+        boroughs: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Read complaints, loading only the parts and columns needed.
+
+        Args:
+            columns (List[str], optional): Columns to load. Defaults to all.
+            start (optional): Inclusive lower bound on created_date.
+            end (optional): Exclusive upper bound on created_date.
+            boroughs (List[str], optional): Boroughs to keep, case
+                insensitive. Prunes whole partitions when the store is
+                partitioned by borough.
+
+        Returns:
+            pd.DataFrame: Matching complaints in the compact schema, newest
+                first.
+        """
+        columns = list(columns or COMPLAINT_311_SCHEMA)
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+        boroughs = [b.lower() for b in boroughs] if boroughs else None
+
+        for attempt in range(READ_ATTEMPTS):
+            # Snapshot the manifest under the store lock, so writes and
+            # compactions by other instances are seen and never half-applied
+            with self._lock:
+                self._refresh_manifest()
+                manifest_parts = list(self._manifest['parts'])
+            try:
+                return self._read_parts(manifest_parts, columns, start, end, boroughs)
+            except FileNotFoundError:
+                # A compaction removed parts of the snapshot after saving the
+                # manifest that lists their merged replacement
+                if attempt == READ_ATTEMPTS - 1:
+                    raise
+                logger.info(f"Parts of {self.root} were compacted during a read; reading again")
+
+    def _read_parts(
+        self,
+        manifest_parts: List[Dict[str, Any]],
+        columns: List[str],
+        start: Optional[pd.Timestamp],
+        end: Optional[pd.Timestamp],
+        boroughs: Optional[List[str]]
+    ) -> pd.DataFrame:
+        """Read the matching parts of a manifest snapshot (see read)."""
+        parts = [part for part in manifest_parts if self._part_matches(part, start, end, boroughs)]
+
+        # Extra columns needed for filtering and de-duplication
+        load_columns = list(columns)
+        partitions = [(part['month'], part['borough']) for part in parts]
+        needs_dedupe = len(set(partitions)) < len(partitions)
+        for extra, needed in (
+            ('created_date', True),
+            ('unique_key', needs_dedupe),
+            ('borough', boroughs is not None and not self.partition_by_borough)
+        ):
+            if needed and extra not in load_columns:
+                load_columns.append(extra)
+
+        frames = [self._read_part(part, load_columns, start, end) for part in parts]
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame({col: pd.Series(dtype=COMPLAINT_311_SCHEMA.get(col, object)) for col in columns})
+
+        df = apply_311_schema(concat_311_frames(frames))
+        if boroughs is not None and not self.partition_by_borough:
+            df = df[df['borough'].astype(str).str.lower().isin(boroughs)]
+        if needs_dedupe:
+            # Parts are read oldest first, so the last copy is the newest write
+            df = df.drop_duplicates(subset='unique_key', keep='last')
+        df = df.sort_values('created_date', ascending=False, kind='stable')
+        return df[columns].reset_index(drop=True)
+
+    def _part_matches(
+        self,
+        part: Dict[str, Any],
+        start: Optional[pd.Timestamp],
+        end: Optional[pd.Timestamp],
+        boroughs: Optional[List[str]]
+    ) -> bool:
+        if start is not None and pd.Timestamp(part['max_created_date']) < start:
+            return False
+        if end is not None and pd.Timestamp(part['min_created_date']) >= end:
+            return False
+        if boroughs is not None and part['borough'] is not None and part['borough'] not in boroughs:
+            return False
+        return True
+
+    def _read_part(
+        self,
+        part: Dict[str, Any],
+        columns: List[str],
+        start: Optional[pd.Timestamp],
+        end: Optional[pd.Timestamp]
+    ) -> pd.DataFrame:
+        path = os.path.join(self.root, part['path'])
+        if self.engine == 'npy':
+            return _read_npy_part(path, columns, start, end)
+
+        if self.engine == 'parquet':
+            filters = []
+            if start is not None:
+                filters.append(('created_date', '>=', start))
+            if end is not None:
+                filters.append(('created_date', '<', end))
+            df = pd.read_parquet(path, columns=columns, filters=filters or None)
+        else:
+            df = pd.read_feather(path, columns=columns)
+
+        # Parts are sorted by created_date, so the window is one slice
+        created = df['created_date'].to_numpy()
+        lo = np.searchsorted(created, start.to_datetime64(), 'left') if start is not None else 0
+        hi = np.searchsorted(created, end.to_datetime64(), 'left') if end is not None else len(df)
+        return df.iloc[lo:hi]
+
+    def compact(self, partitions: Optional[Iterable[tuple]] = None) -> int:
+        """
+        Merge the parts of each partition into one, dropping superseded
+        copies of complaints.
+
+        Args:
+            partitions (Iterable[tuple], optional): (month, borough) pairs
+                to compact. Defaults to every partition.
+
+        Returns:
+            int: Number of parts removed.
+        """
+        with self._lock:
+            self._refresh_manifest()
+            grouped: Dict[tuple, List[Dict[str, Any]]] = {}
+            for part in self._manifest['parts']:
+                grouped.setdefault((part['month'], part['borough']), []).append(part)
+            wanted = set(partitions) if partitions is not None else set(grouped)
+
+            removed = 0
+            for (month, borough), parts in grouped.items():
+                if (month, borough) not in wanted or len(parts) < 2:
+                    continue
+                frames = [self._read_part(part, list(COMPLAINT_311_SCHEMA), None, None) for part in parts]
+                merged = apply_311_schema(concat_311_frames(frames))
+                merged = merged.drop_duplicates(subset='unique_key', keep='last')
+
+                self._manifest['parts'] = [p for p in self._manifest['parts'] if p not in parts]
+                self._write_part(merged, month, borough)
+                self._save_manifest()
+                for part in parts:
+                    _remove_part(os.path.join(self.root, part['path']))
+                removed += len(parts) - 1
+            if removed:
+                logger.info(f"Compacted complaint store {self.root}: {removed} parts removed")
+            return removed
+
+def _write_npy_part(df: pd.DataFrame, path: str) -> None:
+    """
+    Write a part as a directory with one .npy file per column.
+
+    Text columns are stored as int32 codes plus a fixed-width unicode
+    dictionary (no pickled objects), nullable integers as values plus a
+    mask, and everything else as its native NumPy array.
+    """
+    tmp_path = f"{path}.tmp"
+    os.makedirs(tmp_path, exist_ok=True)
+    kinds = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == object:
+            codes, uniques = pd.factorize(series.astype(object), use_na_sentinel=True)
+            np.save(os.path.join(tmp_path, f"{col}.npy"), codes.astype(np.int32))
+            np.save(os.path.join(tmp_path, f"{col}.dict.npy"), np.asarray([str(u) for u in uniques], dtype=str))
+            kinds[col] = 'category' if COMPLAINT_311_SCHEMA.get(col) == 'category' else 'text'
+        elif isinstance(series.dtype, pd.Int64Dtype):
+            np.save(os.path.join(tmp_path, f"{col}.npy"), series.to_numpy(dtype=np.int64, na_value=0))
+            np.save(os.path.join(tmp_path, f"{col}.mask.npy"), series.isna().to_numpy())
+            kinds[col] = 'nullable_int'
+        else:
+            np.save(os.path.join(tmp_path, f"{col}.npy"), series.to_numpy())
+            kinds[col] = 'array'
+    with open(os.path.join(tmp_path, 'columns.json'), 'w') as f:
+        json.dump(kinds, f)
+    os.replace(tmp_path, path)
+
+def _read_npy_part(
+    path: str,
+    columns: List[str],
+    start: Optional[pd.Timestamp],
+    end: Optional[pd.Timestamp]
+) -> pd.DataFrame:
+    """Read a window of rows from the requested columns of a NumPy part."""
+    with open(os.path.join(path, 'columns.json')) as f:
+        kinds = json.load(f)
+
+    def load(name: str) -> np.ndarray:
+        return np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+
+    created = load('created_date')
+    lo = np.searchsorted(created, start.to_datetime64(), 'left') if start is not None else 0
+    hi = np.searchsorted(created, end.to_datetime64(), 'left') if end is not None else len(created)
+
+    data = {}
+    for col in columns:
+        kind = kinds.get(col)
+        if kind is None:
+            continue
+        values = np.array(load(col)[lo:hi])
+        if kind in ('category', 'text'):
+            dictionary = np.load(os.path.join(path, f"{col}.dict.npy"))
+            categorical = pd.Categorical.from_codes(values, categories=pd.Index(dictionary.astype(object)))
+            data[col] = categorical if kind == 'category' else np.asarray(categorical.astype(object))
+        elif kind == 'nullable_int':
+            mask = np.array(load(f"{col}.mask")[lo:hi])
+            data[col] = pd.arrays.IntegerArray(values, mask)
+        else:
+            data[col] = values
+    return pd.DataFrame(data)
+
+def _remove_part(path: str) -> None:
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
@@ -3,16 +3,31 @@ Data Ingestion Service for NYCHA QualityGuard Pro
 Handles fetching and processing of 311 service requests from NYC OpenData API.
 """
 
+import io
 import os
-import time
+import json
 import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Union, Any
+from typing import List, Dict, Optional, Union, Any, Tuple, Iterable, Iterator, TYPE_CHECKING
 import requests
+from requests.adapters import HTTPAdapter
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
+from pandas.api.types import union_categoricals
 from dotenv import load_dotenv
 
+from backend.services.rate_controller import (
+    AdaptiveRateController,
+    get_default_rate_controller,
+    request_with_retries
+)
+
+if TYPE_CHECKING:
+    from backend.services.complaint_store import ComplaintStore
+
 # Load environment variables if not already loaded
 load_dotenv()
 
@@ -22,22 +37,522 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
-def fetch_and_process_311_data(
-    start_date: Optional[str] = None,
-    agency_filter: str = 'HPD',
-    max_pages: int = 100
+# Base API endpoint (overridable to point at a local stand-in for benchmarks)
+OPENDATA_311_URL = os.getenv(
+    'NYC_311_API_URL',
+    "https://data.cityofnewyork.us/resource/erm2-nwe9.json"
+)
+
+# Essential columns to fetch
+COLUMNS_311 = [
+    'unique_key', 'created_date', 'agency', 'complaint_type',
+    'descriptor', 'resolution_description', 'incident_address',
+    'borough', 'bbl', 'latitude', 'longitude'
+]
+
+# Records requested per page
+PAGE_LIMIT = 1000
+
+# Records requested per CSV page. read_csv has a fixed per-call cost that
+# makes it slower than JSON decoding on 1000-row pages; from about 5000 rows
+# per parse it wins, so CSV pages are requested in larger slices.
+CSV_PAGE_LIMIT = 25000
+
+# Text fields normalized to lowercase during cleaning
+TEXT_COLUMNS_311 = ['complaint_type', 'descriptor', 'resolution_description']
+
+# Socrata floating timestamp format, e.g. 2024-01-31T14:05:00.000
+SOCRATA_TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+# Compact in-memory schema for cleaned complaint frames. Low-cardinality text
+# is categorical (HPD has a few hundred distinct descriptors and templated
+# resolutions), coordinates are float32 and identifiers are integers; bbl is
+# nullable since Socrata omits it for some complaints.
+COMPLAINT_311_SCHEMA = {
+    'unique_key': 'int64',
+    'created_date': 'datetime64[ns]',
+    'agency': 'category',
+    'complaint_type': 'category',
+    'descriptor': 'category',
+    'resolution_description': 'category',
+    'incident_address': 'object',
+    'borough': 'category',
+    'bbl': 'Int64',
+    'latitude': 'float32',
+    'longitude': 'float32'
+}
+
+# Explicit dtypes for the CSV wire format; created_date is parsed separately
+CSV_DTYPES_311 = {col: dtype for col, dtype in COMPLAINT_311_SCHEMA.items() if col != 'created_date'}
+
+def create_opendata_session(pool_size: int = 10) -> requests.Session:
+    """
+    Create a keep-alive HTTP session for NYC OpenData requests.
+
+    Args:
+        pool_size (int, optional): Maximum number of pooled connections.
+            Should be at least the fetch concurrency. Defaults to 10.
+
+    Returns:
+        requests.Session: Session with a sized connection pool and the
+            app token header set when available.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    app_token = os.getenv('NYC_OPENDATA_APP_TOKEN')
+    if app_token:
+        session.headers['X-App-Token'] = app_token
+    return session
+
+def _resource_url(base_url: str, wire_format: str) -> str:
+    """Return the endpoint URL for the requested wire format ('json' or 'csv')."""
+    if wire_format not in ('json', 'csv'):
+        raise ValueError(f"Unknown wire format: {wire_format}")
+    root, ext = os.path.splitext(base_url)
+    if ext in ('.json', '.csv'):
+        return f"{root}.{wire_format}"
+    return base_url
+
+def _decode_json_page(content: bytes) -> pd.DataFrame:
+    """Decode a Socrata JSON page (a list of record dicts) into a raw frame."""
+    return pd.DataFrame(json.loads(content), columns=COLUMNS_311)
+
+def _decode_csv_page(content: bytes) -> pd.DataFrame:
+    """
+    Decode a Socrata CSV page into a raw frame with the pandas C parser.
+
+    Columns are parsed straight into the compact schema's dtypes and only
+    empty fields count as missing, matching the JSON decoder where Socrata
+    omits null fields. created_date is parsed with the fixed Socrata
+    timestamp format.
+    """
+    if not content.strip():
+        return pd.DataFrame(columns=COLUMNS_311)
+    df = pd.read_csv(
+        io.BytesIO(content),
+        dtype=CSV_DTYPES_311,
+        keep_default_na=False,
+        na_values=['']
+    )
+    df['created_date'] = pd.to_datetime(df['created_date'], format=SOCRATA_TIMESTAMP_FORMAT)
+    return df.reindex(columns=COLUMNS_311)
+
+def _page_cursor(page: pd.DataFrame) -> Tuple[str, str]:
+    """Return the keyset cursor (created_date, unique_key) of a page's last row."""
+    last = page.iloc[-1]
+    created_date = last['created_date']
+    if isinstance(created_date, pd.Timestamp):
+        created_date = created_date.strftime(SOCRATA_TIMESTAMP_FORMAT)[:-3]
+    return created_date, str(last['unique_key'])
+
+def _fetch_311_page(
+    session: requests.Session,
+    base_url: str,
+    base_params: Dict[str, Any],
+    offset: Optional[int],
+    limit: int,
+    controller: AdaptiveRateController
 ) -> pd.DataFrame:
     """
-    Fetch and process 311 service requests from NYC OpenData API.
-    
+    Fetch a single page of 311 records starting at the given offset.
+    With offset None the page is positioned by the $where clause alone,
+    as keyset pagination does. The page is decoded according to the
+    endpoint's extension (.json or .csv) into a raw, uncleaned frame.
+    The request is paced by the controller and transient failures are retried.
+
+    Raises:
+        requests.exceptions.RequestException: If the request still fails after retries.
+    """
+    params = dict(base_params)
+    params['$limit'] = limit
+    if offset is None:
+        logging.getLogger(__name__).info(f"Fetching next {limit} records after keyset cursor")
+    else:
+        params['$offset'] = offset
+        logging.getLogger(__name__).info(f"Fetching records {offset} to {offset + limit}")
+    response = request_with_retries(session, base_url, params, controller)
+    if base_url.endswith('.csv'):
+        return _decode_csv_page(response.content)
+    return _decode_json_page(response.content)
+
+def _iter_pages_sequentially(
+    session: requests.Session,
+    base_url: str,
+    base_params: Dict[str, Any],
+    limit: int,
+    max_pages: int,
+    controller: AdaptiveRateController
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield pages one request at a time, paced by the rate controller.
+
+    Raises:
+        requests.exceptions.RequestException: If any page request fails.
+    """
+    offset = 0
+    while offset < (max_pages * limit):
+        page = _fetch_311_page(session, base_url, base_params, offset, limit, controller)
+
+        # Break if no more records
+        if page.empty:
+            logging.getLogger(__name__).info("No more records to fetch")
+            break
+
+        yield page
+
+        # Increment offset for next page
+        offset += limit
+
+def _iter_pages_concurrently(
+    session: requests.Session,
+    base_url: str,
+    base_params: Dict[str, Any],
+    limit: int,
+    max_pages: int,
+    concurrency: int,
+    controller: AdaptiveRateController
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield pages fetched by a bounded pool of workers sharing one session.
+
+    Keeps at most ``concurrency`` requests in flight and never runs more than
+    ``2 * concurrency`` pages ahead of the consumer. Request starts are
+    additionally paced by the shared rate controller. Pages are yielded in page
+    order as soon as they are contiguous, regardless of completion order.
+    Once a page comes back empty or short, no further pages are requested and
+    any pages past the end that were already in flight are discarded.
+
+    If a page request fails, no pages past it are requested; the pages below
+    it are still awaited and yielded, so the consumer receives exactly the
+    rows the sequential path would have delivered before the failure.
+
+    Raises:
+        requests.exceptions.RequestException: If any page request fails,
+            after every page below the failed one has been yielded.
+    """
+    completed: Dict[int, pd.DataFrame] = {}
+    end_page = max_pages  # exclusive; shrinks once the last page is seen
+    next_page = 0  # next page to request
+    next_yield = 0  # next page to hand to the consumer
+    in_flight = {}
+    # (page number, exception) of the lowest page that failed
+    failure: Optional[Tuple[int, Exception]] = None
+
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        while True:
+            stop_page = end_page if failure is None else min(end_page, failure[0])
+            while next_yield < stop_page and next_yield in completed:
+                yield completed.pop(next_yield)
+                next_yield += 1
+            if next_yield >= stop_page:
+                break
+
+            while (next_page < stop_page and len(in_flight) < concurrency
+                   and next_page - next_yield < 2 * concurrency):
+                future = executor.submit(
+                    _fetch_311_page, session, base_url, base_params,
+                    next_page * limit, limit, controller
+                )
+                in_flight[future] = next_page
+                next_page += 1
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                page_number = in_flight.pop(future)
+                try:
+                    page = future.result()
+                except Exception as e:
+                    if failure is None or page_number < failure[0]:
+                        failure = (page_number, e)
+                    continue
+                if page.empty:
+                    end_page = min(end_page, page_number)
+                elif len(page) < limit:
+                    end_page = min(end_page, page_number + 1)
+                completed[page_number] = page
+
+        # A failure past the last page is one the sequential path never hits
+        if failure is not None and failure[0] < end_page:
+            raise failure[1]
+    finally:
+        for future in in_flight:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+def _keyset_where(where_clause: str, cursor: Optional[Tuple[str, str]], descending: bool) -> str:
+    """Extend a $where clause to seek past the (created_date, unique_key) cursor."""
+    if cursor is None:
+        return where_clause
+    created_date, unique_key = cursor
+    op = '<' if descending else '>'
+    return (
+        f"({where_clause}) AND (created_date {op} '{created_date}' OR "
+        f"(created_date = '{created_date}' AND unique_key {op} '{unique_key}'))"
+    )
+
+def _iter_pages_keyset(
+    session: requests.Session,
+    base_url: str,
+    base_params: Dict[str, Any],
+    limit: int,
+    max_pages: int,
+    controller: AdaptiveRateController,
+    cursor: Optional[Tuple[str, str]] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield pages using keyset (seek) pagination on (created_date, unique_key).
+
+    Each request continues from the last row of the previous page instead of
+    an $offset, so the server cost per page stays flat for deep crawls and
+    complaints arriving mid-crawl cannot shift rows between pages. Pages are
+    inherently sequential.
+
     Args:
-        start_date (str, optional): Start date in 'YYYY-MM-DD' format. 
-            Defaults to January 1st of the previous year.
-        agency_filter (str, optional): Agency to filter by. Defaults to 'HPD'.
-        max_pages (int, optional): Maximum number of pages to fetch. Defaults to 100.
-    
+        cursor: (created_date, unique_key) of the last row already consumed,
+            e.g. restored from a checkpoint. None starts from the beginning.
+
+    Raises:
+        requests.exceptions.RequestException: If any page request fails.
+    """
+    descending = base_params['$order'].endswith('DESC')
+    direction = 'DESC' if descending else 'ASC'
+    params = dict(base_params)
+    params['$order'] = f"created_date {direction}, unique_key {direction}"
+
+    for _ in range(max_pages):
+        params['$where'] = _keyset_where(base_params['$where'], cursor, descending)
+        page = _fetch_311_page(session, base_url, params, None, limit, controller)
+
+        # Break if no more records
+        if page.empty:
+            logging.getLogger(__name__).info("No more records to fetch")
+            break
+
+        yield page
+
+        cursor = _page_cursor(page)
+        if len(page) < limit:
+            break
+
+def load_crawl_checkpoint(checkpoint_path: str, where_clause: str) -> Optional[Tuple[str, str]]:
+    """
+    Load the keyset cursor of an interrupted crawl.
+
+    Args:
+        checkpoint_path (str): Path to the checkpoint JSON file.
+        where_clause (str): $where clause of the crawl being resumed. A
+            checkpoint written for a different query is ignored.
+
     Returns:
-        pd.DataFrame: Processed 311 service request data.
+        Optional[Tuple[str, str]]: (created_date, unique_key) of the last row
+            delivered before the interruption, or None to start from scratch.
+    """
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path, 'r') as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('where') != where_clause:
+        logging.getLogger(__name__).warning(
+            f"Ignoring crawl checkpoint {checkpoint_path} written for a different query"
+        )
+        return None
+    logging.getLogger(__name__).info(
+        f"Resuming crawl after {checkpoint['rows_delivered']} rows "
+        f"at created_date {checkpoint['created_date']}"
+    )
+    return checkpoint['created_date'], checkpoint['unique_key']
+
+def save_crawl_checkpoint(
+    checkpoint_path: str,
+    where_clause: str,
+    cursor: Tuple[str, str],
+    rows_delivered: int
+) -> None:
+    """
+    Atomically record the keyset cursor of the last row handed to the consumer.
+    """
+    checkpoint = {
+        'where': where_clause,
+        'created_date': cursor[0],
+        'unique_key': cursor[1],
+        'rows_delivered': rows_delivered,
+        'updated_at': datetime.now().isoformat(timespec='seconds')
+    }
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, checkpoint_path)
+
+def _normalize_text(series: pd.Series) -> pd.Series:
+    """
+    Fill missing text with '' and lowercase it. Categorical columns are
+    normalized through their categories only, without touching each row.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series.fillna('').str.lower()
+
+    # Lowercasing can merge categories, so re-factorize the lowered values
+    # and remap the codes; missing values map onto the trailing ''.
+    lowered = pd.Index(series.cat.categories.astype(str).str.lower()).append(pd.Index(['']))
+    new_codes, categories = pd.factorize(lowered)
+    codes = series.cat.codes.to_numpy()
+    codes = new_codes[np.where(codes >= 0, codes, len(lowered) - 1)]
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories=categories),
+        index=series.index,
+        name=series.name
+    )
+
+def _clean_311_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Parse dates and normalize text fields of a raw 311 frame in place.
+    Idempotent, so it is safe to re-apply to data read back from disk.
+    """
+    # Convert created_date to datetime
+    df['created_date'] = pd.to_datetime(df['created_date'])
+
+    # Clean text fields
+    for col in TEXT_COLUMNS_311:
+        if col in df.columns:
+            df[col] = _normalize_text(df[col])
+    return df
+
+def apply_311_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cast a cleaned 311 frame to COMPLAINT_311_SCHEMA in place.
+
+    Categorical columns are canonicalized (unused categories dropped,
+    categories sorted) so equal data always yields equal dtypes, whichever
+    path produced it. Columns outside the schema are left untouched.
+
+    Args:
+        df (pd.DataFrame): Cleaned 311 frame.
+
+    Returns:
+        pd.DataFrame: The same frame with compact dtypes.
+    """
+    for col, dtype in COMPLAINT_311_SCHEMA.items():
+        if col not in df.columns:
+            continue
+        series = df[col]
+        if dtype == 'category':
+            if not isinstance(series.dtype, pd.CategoricalDtype):
+                series = series.astype('category')
+            series = series.cat.remove_unused_categories()
+            series = series.cat.reorder_categories(sorted(series.cat.categories))
+        elif dtype == 'datetime64[ns]':
+            series = pd.to_datetime(series)
+        elif dtype == 'object':
+            continue
+        elif series.dtype != dtype:
+            series = pd.to_numeric(series, errors='coerce').astype(dtype)
+        df[col] = series
+    return df
+
+def concat_311_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate 311 frames sharing one column layout.
+
+    Categorical columns are unioned instead of falling back to object dtype
+    as pd.concat does when the categories differ between frames.
+    """
+    if len(frames) == 1:
+        return frames[0]
+    columns = {}
+    for col in frames[0].columns:
+        parts = [frame[col] for frame in frames]
+        if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            columns[col] = union_categoricals(parts, ignore_order=True)
+        else:
+            columns[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+def read_311_csv(filepath: str) -> pd.DataFrame:
+    """
+    Read a processed 311 CSV back into the compact schema.
+
+    Columns are parsed straight into their schema dtypes by the C parser and
+    created_date is parsed once; text is re-normalized, since the CSV round
+    trip turns '' back into missing values.
+
+    Args:
+        filepath (str): Path to a CSV written by this service.
+
+    Returns:
+        pd.DataFrame: Cleaned frame with compact dtypes.
+    """
+    header = pd.read_csv(filepath, nrows=0).columns
+    dtypes = {col: dtype for col, dtype in CSV_DTYPES_311.items() if col in header}
+    df = pd.read_csv(filepath, dtype=dtypes, keep_default_na=False, na_values=[''])
+    return apply_311_schema(_clean_311_frame(df))
+
+def _pages_to_frame(pages: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Build a cleaned, compactly typed chunk from raw decoded pages. Pages are
+    decoded with the fixed COLUMNS_311 layout (Socrata omits null fields), so
+    every chunk has identical columns and dtypes.
+    """
+    return apply_311_schema(_clean_311_frame(concat_311_frames(pages)))
+
+def stream_311_data(
+    start_date: Optional[str] = None,
+    agency_filter: str = 'HPD',
+    max_pages: int = 100,
+    concurrency: int = 1,
+    base_url: Optional[str] = None,
+    session: Optional[requests.Session] = None,
+    since: Optional[str] = None,
+    chunk_size: Optional[int] = None,
+    pagination: str = 'offset',
+    checkpoint_path: Optional[str] = None,
+    wire_format: str = 'json',
+    rate_controller: Optional[AdaptiveRateController] = None,
+    partial_ok: bool = False
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream cleaned 311 service requests as DataFrame chunks.
+
+    Each chunk is cleaned as soon as its page arrives, so downstream stages
+    (urgency flagging, writers, aggregations) can start before the last page
+    is downloaded, and memory is bounded by the chunk size rather than the
+    date range. Arguments match fetch_and_process_311_data.
+
+    Args:
+        chunk_size (int, optional): Minimum number of rows per yielded chunk.
+            Pages are coalesced until it is reached. Defaults to one chunk per page.
+        pagination (str, optional): 'offset' (default) or 'keyset'. Keyset
+            pages seek from the last (created_date, unique_key) seen and are
+            fetched sequentially regardless of concurrency.
+        checkpoint_path (str, optional): Keyset only. After each chunk has
+            been consumed its cursor is saved here, and an existing checkpoint
+            for the same query resumes the crawl after the last delivered row.
+            A chunk counts as delivered once the consumer asks for the next
+            one, so the chunk in hand at an interruption is delivered again.
+            The file is removed once the crawl completes.
+        wire_format (str, optional): 'json' (default) or 'csv'. CSV pages are
+            parsed by the pandas C parser with explicit dtypes instead of
+            materializing a Python dict per record; the cleaned output is
+            identical. CSV pages hold CSV_PAGE_LIMIT records, and max_pages
+            still caps the crawl at max_pages * PAGE_LIMIT records.
+        rate_controller (AdaptiveRateController, optional): Pacing and
+            backoff state. Defaults to the process-wide controller for the
+            token-holding or tokenless budget.
+        partial_ok (bool, optional): End the stream cleanly instead of
+            raising when a page still fails after retries, keeping every
+            chunk already yielded. A keyset checkpoint is left in place so
+            the crawl can be resumed. Defaults to False.
+
+    Yields:
+        pd.DataFrame: Cleaned chunk with the COLUMNS_311 schema.
+
+    Raises:
+        requests.exceptions.RequestException: If a page request still fails
+            after retries and partial_ok is False. Chunks yielded before the
+            failure remain valid.
     """
     logger = logging.getLogger(__name__)
     logger.info(f"Starting 311 data fetch for agency: {agency_filter}")
@@ -51,102 +566,463 @@ def fetch_and_process_311_data(
     if not start_date:
         last_year = datetime.now().year - 1
         start_date = f"{last_year}-01-01"
-    
-    # Base API endpoint
-    base_url = "https://data.cityofnewyork.us/resource/erm2-nwe9.json"
-    
-    # Essential columns to fetch
-    columns = [
-        'unique_key', 'created_date', 'agency', 'complaint_type',
-        'descriptor', 'resolution_description', 'incident_address',
-        'borough', 'bbl', 'latitude', 'longitude'
-    ]
-    
+
+    base_url = _resource_url(base_url or OPENDATA_311_URL, wire_format)
+    if pagination not in ('offset', 'keyset'):
+        raise ValueError(f"Unknown pagination mode: {pagination}")
+    concurrency = max(1, int(concurrency))
+
     # Construct SoQL query
+    lower_bound = since or f"{start_date}T00:00:00.000"
     where_clause = (
         f"agency='{agency_filter}' AND "
-        f"created_date >= '{start_date}T00:00:00.000'"
+        f"created_date >= '{lower_bound}'"
     )
-    
-    # Initialize variables for pagination
-    offset = 0
-    limit = 1000
-    all_records: List[Dict] = []
-    
+    base_params = {
+        '$select': ','.join(COLUMNS_311),
+        '$where': where_clause,
+        '$order': 'created_date ASC' if since else 'created_date DESC'
+    }
+
+    # max_pages counts PAGE_LIMIT-record pages whatever the wire format
+    max_records = max_pages * PAGE_LIMIT
+    limit = min(CSV_PAGE_LIMIT, max_records) if wire_format == 'csv' and max_records > 0 else PAGE_LIMIT
+    max_pages = -(-max_records // limit)
+    controller = rate_controller or get_default_rate_controller(bool(app_token))
+    owns_session = session is None
+    if owns_session:
+        session = create_opendata_session(pool_size=concurrency)
+    use_checkpoint = pagination == 'keyset' and checkpoint_path is not None
+
     try:
-        while offset < (max_pages * limit):
-            # Construct query parameters
-            params = {
-                '$select': ','.join(columns),
-                '$where': where_clause,
-                '$limit': limit,
-                '$offset': offset,
-                '$order': 'created_date DESC'
-            }
-            
-            # Prepare headers
-            headers = {'X-App-Token': app_token} if app_token else {}
-            
-            # Make API request
-            logger.info(f"Fetching records {offset} to {offset + limit}")
-            response = requests.get(
-                base_url,
-                params=params,
-                headers=headers,
-                timeout=30
+        if pagination == 'keyset':
+            cursor = load_crawl_checkpoint(checkpoint_path, where_clause) if use_checkpoint else None
+            pages = _iter_pages_keyset(
+                session, base_url, base_params, limit, max_pages, controller, cursor
+            )
+        elif concurrency > 1:
+            pages = _iter_pages_concurrently(
+                session, base_url, base_params, limit, max_pages, concurrency, controller
             )
-            
-            # Check response status
-            response.raise_for_status()
-            
-            # Parse response
-            records = response.json()
-            
-            # Break if no more records
-            if not records:
-                logger.info("No more records to fetch")
+        else:
+            pages = _iter_pages_sequentially(
+                session, base_url, base_params, limit, max_pages, controller
+            )
+
+        rows_delivered = 0
+        buffered_rows = 0
+        buffer: List[pd.DataFrame] = []
+        while True:
+            try:
+                page = next(pages)
+            except StopIteration:
                 break
-                
-            # Add records to collection
-            all_records.extend(records)
-            
-            # Increment offset for next page
-            offset += limit
-            
-            # Polite delay between requests
-            time.sleep(0.2)
-            
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error fetching data: {str(e)}")
-        return pd.DataFrame()
+            except requests.exceptions.RequestException as e:
+                if not partial_ok:
+                    raise
+                logger.error(f"Stopping 311 fetch after {rows_delivered + buffered_rows} records: {str(e)}")
+                if buffer:
+                    yield _pages_to_frame(buffer)
+                return
+            # Larger CSV pages can overshoot the record cap on the last page
+            remaining = max_records - rows_delivered - buffered_rows
+            if len(page) > remaining:
+                page = page.iloc[:remaining]
+            buffer.append(page)
+            buffered_rows += len(page)
+            if chunk_size is None or buffered_rows >= chunk_size:
+                yield _pages_to_frame(buffer)
+                rows_delivered += buffered_rows
+                if use_checkpoint:
+                    save_crawl_checkpoint(
+                        checkpoint_path, where_clause, _page_cursor(buffer[-1]), rows_delivered
+                    )
+                buffer = []
+                buffered_rows = 0
+        if buffer:
+            yield _pages_to_frame(buffer)
+
+        # Crawl finished; nothing left to resume
+        if use_checkpoint and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+    finally:
+        if owns_session:
+            session.close()
+
+def fetch_and_process_311_data(
+    start_date: Optional[str] = None,
+    agency_filter: str = 'HPD',
+    max_pages: int = 100,
+    concurrency: int = 1,
+    base_url: Optional[str] = None,
+    session: Optional[requests.Session] = None,
+    since: Optional[str] = None,
+    pagination: str = 'offset',
+    checkpoint_path: Optional[str] = None,
+    wire_format: str = 'json',
+    rate_controller: Optional[AdaptiveRateController] = None
+) -> pd.DataFrame:
+    """
+    Fetch and process 311 service requests from NYC OpenData API.
     
-    # Check if we got any records
-    if not all_records:
-        logger.warning("No records fetched")
-        return pd.DataFrame()
+    Args:
+        start_date (str, optional): Start date in 'YYYY-MM-DD' format. 
+            Defaults to January 1st of the previous year.
+        agency_filter (str, optional): Agency to filter by. Defaults to 'HPD'.
+        max_pages (int, optional): Maximum number of pages to fetch. Defaults to 100.
+        concurrency (int, optional): Number of pages fetched in parallel.
+            1 keeps the original sequential, politely delayed crawl. Defaults to 1.
+        base_url (str, optional): Override for the Socrata endpoint, e.g. a
+            local stand-in. Defaults to OPENDATA_311_URL.
+        session (requests.Session, optional): Session to reuse across calls.
+            A pooled keep-alive session is created when not provided.
+        since (str, optional): Full 'YYYY-MM-DDTHH:MM:SS.fff' timestamp. When
+            given, only records created at or after it are fetched, oldest
+            first, so a run capped by max_pages never leaves a gap behind the
+            incremental watermark. Overrides start_date.
+        pagination (str, optional): 'offset' (default) or 'keyset' seek
+            pagination on (created_date, unique_key).
+        checkpoint_path (str, optional): Keyset crawl checkpoint. A resumed
+            crawl returns only the rows after the checkpoint.
+        wire_format (str, optional): 'json' (default) or 'csv' bulk decoding.
+        rate_controller (AdaptiveRateController, optional): Pacing and
+            backoff state. Defaults to the process-wide controller.
     
-    # Convert to DataFrame
-    df = pd.DataFrame(all_records)
+    Returns:
+        pd.DataFrame: Processed 311 service request data in the compact
+            COMPLAINT_311_SCHEMA dtypes. If a page still fails after
+            retries, the records fetched before it are returned.
+    """
+    logger = logging.getLogger(__name__)
     
-    # Data cleaning
     try:
-        # Convert created_date to datetime
-        df['created_date'] = pd.to_datetime(df['created_date'])
-        
-        # Clean text fields
-        text_columns = ['complaint_type', 'descriptor', 'resolution_description']
-        for col in text_columns:
-            if col in df.columns:
-                df[col] = df[col].fillna('').str.lower()
-        
-        logger.info(f"Successfully processed {len(df)} records")
-        
+        chunks = list(stream_311_data(
+            start_date=start_date,
+            agency_filter=agency_filter,
+            max_pages=max_pages,
+            concurrency=concurrency,
+            base_url=base_url,
+            session=session,
+            since=since,
+            pagination=pagination,
+            checkpoint_path=checkpoint_path,
+            wire_format=wire_format,
+            rate_controller=rate_controller,
+            partial_ok=True
+        ))
+    
     except Exception as e:
         logger.error(f"Error processing data: {str(e)}")
         return pd.DataFrame()
     
+    # Check if we got any records
+    if not chunks:
+        logger.warning("No records fetched")
+        return pd.DataFrame()
+    
+    # Combine the cleaned chunks
+    df = apply_311_schema(concat_311_frames(chunks))
+    logger.info(f"Successfully processed {len(df)} records")
+    
     return df
 
+def write_311_chunks_to_csv(
+    chunks: Iterable[pd.DataFrame],
+    filepath: str,
+    append: bool = False
+) -> int:
+    """
+    Write a stream of 311 chunks to a single CSV file as they arrive.
+
+    Args:
+        chunks: Iterable of DataFrames sharing one schema, e.g. from stream_311_data.
+        filepath (str): Destination CSV path.
+        append (bool, optional): Append to an existing file (e.g. when resuming
+            a checkpointed crawl) instead of overwriting it. Defaults to False.
+
+    Returns:
+        int: Number of rows written by this call.
+    """
+    write_header = not (append and os.path.exists(filepath))
+    rows_written = 0
+    for chunk in chunks:
+        chunk.to_csv(filepath, mode='w' if write_header else 'a',
+                     header=write_header, index=False)
+        write_header = False
+        rows_written += len(chunk)
+    return rows_written
+
+def tally_311_chunks(
+    chunks: Iterable[pd.DataFrame],
+    counts: Counter,
+    by: str = 'complaint_type'
+) -> Iterator[pd.DataFrame]:
+    """
+    Pass chunks through unchanged while accumulating value counts of a column.
+
+    Lets a running aggregation share a single pass with other stages, e.g.
+    ``write_311_chunks_to_csv(tally_311_chunks(chunks, counts), path)``.
+    """
+    for chunk in chunks:
+        if by in chunk.columns:
+            counts.update(chunk[by].value_counts().to_dict())
+        yield chunk
+
+def _311_store_paths(data_dir: str, agency_filter: str) -> Tuple[str, str]:
+    """Return the (store CSV, watermark JSON) paths for an agency."""
+    agency = agency_filter.lower()
+    return (
+        os.path.join(data_dir, f'311_{agency}_store.csv'),
+        os.path.join(data_dir, f'311_{agency}_watermark.json')
+    )
+
+def load_311_watermark(watermark_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Load the persisted high-water mark of an incremental 311 store.
+
+    Args:
+        watermark_path (str): Path to the watermark JSON file.
+
+    Returns:
+        Optional[Dict[str, Any]]: Watermark with 'created_date' and
+            'unique_key', or None if no ingestion has run yet.
+    """
+    if not os.path.exists(watermark_path):
+        return None
+    with open(watermark_path, 'r') as f:
+        return json.load(f)
+
+def save_311_watermark(watermark_path: str, df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Persist the high-water mark (newest created_date and the largest
+    unique_key at that instant) of a cleaned 311 frame.
+
+    Returns:
+        Dict[str, Any]: The watermark that was written.
+    """
+    max_created = df['created_date'].max()
+    newest = df.loc[df['created_date'] == max_created, 'unique_key']
+    watermark = {
+        'created_date': max_created.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3],
+        'unique_key': str(newest.astype('int64').max()),
+        'updated_at': datetime.now().isoformat(timespec='seconds')
+    }
+    tmp_path = f"{watermark_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(watermark, f, indent=2)
+    os.replace(tmp_path, watermark_path)
+    return watermark
+
+def merge_311_records(existing: Optional[pd.DataFrame], new: pd.DataFrame) -> pd.DataFrame:
+    """
+    Merge newly fetched records into an existing store, keyed by unique_key.
+
+    When a complaint appears in both, the newly fetched version wins so that
+    updated resolutions replace stale ones. The result is ordered newest first.
+    """
+    if existing is None or existing.empty:
+        merged = new
+    else:
+        merged = apply_311_schema(concat_311_frames([existing, new]))
+    merged = merged.drop_duplicates(subset='unique_key', keep='last')
+    return merged.sort_values('created_date', ascending=False, kind='stable').reset_index(drop=True)
+
+def ingest_311_incremental(
+    data_dir: str,
+    start_date: Optional[str] = None,
+    agency_filter: str = 'HPD',
+    store: Optional['ComplaintStore'] = None,
+    **fetch_kwargs: Any
+) -> Dict[str, Any]:
+    """
+    Fetch only 311 records newer than the persisted watermark and merge them
+    into a single deduplicated store for the agency.
+
+    The first run (no watermark yet) behaves like a full ingestion from
+    start_date, crawled oldest first so that a crawl cut short by a failed
+    page or max_pages still leaves a watermark the next run can resume from
+    without losing older records. Later runs re-request from the watermark
+    instant itself, so complaints sharing that created_date are not missed;
+    the overlap is removed by deduplicating on unique_key.
+
+    Args:
+        data_dir (str): Directory holding the store and watermark files.
+        start_date (str, optional): Start date for the first run in 'YYYY-MM-DD' format.
+        agency_filter (str, optional): Agency to filter by. Defaults to 'HPD'.
+        store (ComplaintStore, optional): Columnar store to merge into, with
+            its watermark kept next to it. Defaults to a CSV store in data_dir.
+        **fetch_kwargs: Passed through to fetch_and_process_311_data.
+
+    Returns:
+        Dict[str, Any]: Summary with 'new_records', 'total_records',
+            'file_path' and 'watermark'.
+    """
+    logger = logging.getLogger(__name__)
+    store_path, watermark_path = _311_store_paths(data_dir, agency_filter)
+    if store is not None:
+        store_path = store.root
+        watermark_path = os.path.join(store.root, '_watermark.json')
+    watermark = load_311_watermark(watermark_path)
+
+    if watermark:
+        logger.info(f"Incremental 311 ingestion from watermark {watermark['created_date']}")
+        new_df = fetch_and_process_311_data(
+            agency_filter=agency_filter, since=watermark['created_date'], **fetch_kwargs
+        )
+    else:
+        logger.info("No 311 watermark found. Running initial full ingestion")
+        if not start_date:
+            start_date = f"{datetime.now().year - 1}-01-01"
+        # Crawl oldest first, as later runs do: a failed page or the page cap
+        # then ends the crawl at a watermark with nothing older missing
+        new_df = fetch_and_process_311_data(
+            agency_filter=agency_filter, since=f"{start_date}T00:00:00.000", **fetch_kwargs
+        )
+
+    if store is not None:
+        return _merge_into_complaint_store(store, new_df, watermark_path, watermark)
+
+    existing = None
+    if os.path.exists(store_path):
+        existing = read_311_csv(store_path)
+
+    if new_df.empty:
+        return {
+            'new_records': 0,
+            'total_records': 0 if existing is None else len(existing),
+            'file_path': store_path if existing is not None else None,
+            'watermark': watermark
+        }
+
+    known_keys = set() if existing is None else set(existing['unique_key'])
+    new_records = int((~new_df['unique_key'].isin(known_keys)).sum())
+
+    merged = merge_311_records(existing, new_df)
+    tmp_path = f"{store_path}.tmp"
+    merged.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, store_path)
+    watermark = save_311_watermark(watermark_path, merged)
+
+    logger.info(f"Merged {new_records} new 311 records; store now holds {len(merged)}")
+    return {
+        'new_records': new_records,
+        'total_records': len(merged),
+        'file_path': store_path,
+        'watermark': watermark
+    }
+
+def _merge_into_complaint_store(
+    store: 'ComplaintStore',
+    new_df: pd.DataFrame,
+    watermark_path: str,
+    watermark: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Incremental ingestion tail for a columnar store: only new rows are written."""
+    logger = logging.getLogger(__name__)
+    if new_df.empty:
+        return {
+            'new_records': 0,
+            'total_records': len(store),
+            'file_path': store.root if len(store) else None,
+            'watermark': watermark
+        }
+
+    # Only the re-requested watermark instant can overlap the store
+    known = store.read(columns=['unique_key'], start=new_df['created_date'].min())
+    new_records = int((~new_df['unique_key'].isin(known['unique_key'])).sum())
+
+    store.write_chunks([new_df])
+    watermark = save_311_watermark(watermark_path, new_df)
+
+    logger.info(f"Merged {new_records} new 311 records; store now holds {len(store)}")
+    return {
+        'new_records': new_records,
+        'total_records': len(store),
+        'file_path': store.root,
+        'watermark': watermark
+    }
+
+def ingest_311_full(
+    store: 'ComplaintStore',
+    start_date: Optional[str] = None,
+    agency_filter: str = 'HPD',
+    pagination: str = 'offset',
+    **stream_kwargs: Any
+) -> Dict[str, Any]:
+    """
+    Stream every 311 record since start_date into a columnar store and move
+    its watermark to the newest record merged.
+
+    Pages are written as they arrive, so memory stays bounded by the page
+    size. Offset crawls keep what was fetched when a page still fails after
+    retries, but leave the watermark alone: the crawl runs newest first, so
+    the older records it never reached would otherwise fall behind the
+    watermark and be skipped by later incremental runs. Keyset crawls raise
+    instead and resume from their checkpoint on the next call. The watermark
+    never moves backwards.
+
+    Args:
+        store (ComplaintStore): Store to merge into; its watermark is kept
+            next to it.
+        start_date (str, optional): Start date in 'YYYY-MM-DD' format.
+        agency_filter (str, optional): Agency to filter by. Defaults to 'HPD'.
+        pagination (str, optional): 'offset' (default) or 'keyset'.
+        **stream_kwargs: Passed through to stream_311_data.
+
+    Returns:
+        Dict[str, Any]: Summary with 'new_records' (rows written),
+            'total_records', 'file_path', 'watermark' and 'complete'.
+
+    Raises:
+        requests.exceptions.RequestException: If a keyset crawl fails.
+    """
+    logger = logging.getLogger(__name__)
+    watermark_path = os.path.join(store.root, '_watermark.json')
+    watermark = load_311_watermark(watermark_path)
+    state: Dict[str, Any] = {'complete': True, 'newest': None}
+
+    def tracked(chunks: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        try:
+            for chunk in chunks:
+                if not chunk.empty:
+                    # Keep the rows at the newest created_date seen so far
+                    newest = chunk.loc[chunk['created_date'] == chunk['created_date'].max(),
+                                       ['created_date', 'unique_key']]
+                    best = state['newest']
+                    if best is None or newest['created_date'].iat[0] > best['created_date'].iat[0]:
+                        state['newest'] = newest
+                    elif newest['created_date'].iat[0] == best['created_date'].iat[0]:
+                        state['newest'] = pd.concat([best, newest], ignore_index=True)
+                yield chunk
+        except requests.exceptions.RequestException as e:
+            if pagination == 'keyset':
+                raise
+            state['complete'] = False
+            logger.error(f"Stopping 311 ingestion after a failed page: {str(e)}")
+
+    chunks = stream_311_data(
+        start_date=start_date,
+        agency_filter=agency_filter,
+        pagination=pagination,
+        **stream_kwargs
+    )
+    records_written = store.write_chunks(tracked(chunks))
+
+    newest = state['newest']
+    if state['complete'] and newest is not None:
+        newest_created = newest['created_date'].iat[0]
+        if watermark is None or newest_created > pd.Timestamp(watermark['created_date']):
+            watermark = save_311_watermark(watermark_path, newest)
+
+    logger.info(f"Wrote {records_written} 311 records; store now holds {len(store)}")
+    return {
+        'new_records': records_written,
+        'total_records': len(store),
+        'file_path': store.root if len(store) else None,
+        'watermark': watermark,
+        'complete': state['complete']
+    }
+
 if __name__ == '__main__':
     # Example usage
     df = fetch_and_process_311_data()
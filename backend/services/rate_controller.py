@@ -0,0 +1,179 @@
+"""
+Adaptive Rate Controller for NYCHA QualityGuard Pro
+Paces and retries NYC OpenData (Socrata) requests for the data ingestion service.
+"""
+
+import random
+import threading
+import time
+import logging
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional
+import requests
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Request pacing budgets, as seconds between request starts. Tokenless crawls
+# start at the 0.2 s spacing of the old fixed delay; Socrata throttles them by
+# IP far more aggressively than token holders, so they back off further.
+RATE_BUDGETS = {
+    'token': {'min_interval': 0.02, 'initial_interval': 0.1, 'max_interval': 30.0},
+    'tokenless': {'min_interval': 0.1, 'initial_interval': 0.2, 'max_interval': 60.0}
+}
+
+# Status codes worth retrying
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class AdaptiveRateController:
+    """
+    Thread-safe request pacer that adapts to server feedback.
+
+    Spaces request starts by an interval that shrinks multiplicatively while
+    responses are healthy and grows on 429/5xx responses, connection
+    failures and low X-RateLimit-Remaining headers. A Retry-After header
+    pauses all callers until it has elapsed. One controller can be shared by
+    every worker of a concurrent crawl.
+
+    Args:
+        min_interval: Fastest allowed spacing between requests, in seconds.
+        max_interval: Slowest spacing the controller backs off to.
+        initial_interval: Spacing used for the first request.
+        speedup: Factor applied to the interval after a healthy response.
+        backoff: Factor applied to the interval after a throttled or failed response.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 0.1,
+        max_interval: float = 30.0,
+        initial_interval: float = 0.2,
+        speedup: float = 0.9,
+        backoff: float = 2.0
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min(max(initial_interval, min_interval), max_interval)
+        self.speedup = speedup
+        self.backoff = backoff
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_token(cls, has_token: bool) -> 'AdaptiveRateController':
+        """Create a controller with the budget for token-holding or tokenless clients."""
+        return cls(**RATE_BUDGETS['token' if has_token else 'tokenless'])
+
+    def acquire(self) -> None:
+        """Block until the caller may start its next request."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller back for at least the given number of seconds."""
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+    def record_success(self, response: Optional[requests.Response] = None) -> None:
+        """Speed up after a healthy response, unless the server reports little quota left."""
+        with self._lock:
+            if response is not None and _quota_nearly_exhausted(response):
+                self.interval = min(self.interval * self.backoff, self.max_interval)
+            else:
+                self.interval = max(self.interval * self.speedup, self.min_interval)
+
+    def record_throttle(self, retry_after: Optional[float] = None) -> None:
+        """Back off after a 429/5xx response or a transient connection failure."""
+        with self._lock:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        if retry_after:
+            self.pause(retry_after)
+
+def _quota_nearly_exhausted(response: requests.Response) -> bool:
+    """Check the throttling headers of a response for an almost spent quota."""
+    remaining = response.headers.get('X-RateLimit-Remaining')
+    limit = response.headers.get('X-RateLimit-Limit')
+    try:
+        return remaining is not None and limit is not None and int(remaining) < 0.1 * int(limit)
+    except ValueError:
+        return False
+
+def parse_retry_after(response: requests.Response) -> Optional[float]:
+    """Return the Retry-After delay of a response in seconds, if present."""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+def request_with_retries(
+    session: requests.Session,
+    url: str,
+    params: Dict[str, Any],
+    controller: AdaptiveRateController,
+    max_retries: int = 5,
+    backoff_base: float = 0.5,
+    backoff_cap: float = 30.0,
+    timeout: float = 30
+) -> requests.Response:
+    """
+    Issue a paced GET request, retrying transient failures.
+
+    Connection errors, timeouts and 429/5xx responses are retried up to
+    max_retries times with full-jitter exponential backoff (or the server's
+    Retry-After, when longer). Other HTTP errors are raised immediately.
+
+    Returns:
+        requests.Response: The successful response.
+
+    Raises:
+        requests.exceptions.RequestException: If the request still fails
+            after all retries, or fails with a non-retryable status.
+    """
+    attempt = 0
+    while True:
+        controller.acquire()
+        try:
+            response = session.get(url, params=params, timeout=timeout)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            controller.record_throttle()
+            if attempt >= max_retries:
+                raise
+            error, retry_after = e, None
+        else:
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                response.raise_for_status()
+                controller.record_success(response)
+                return response
+            retry_after = parse_retry_after(response)
+            controller.record_throttle(retry_after)
+            if attempt >= max_retries:
+                response.raise_for_status()
+            error = f"HTTP {response.status_code}"
+
+        delay = random.uniform(0, min(backoff_cap, backoff_base * (2 ** attempt)))
+        delay = max(delay, retry_after or 0.0)
+        attempt += 1
+        logger.warning(f"Transient error ({error}); retry {attempt}/{max_retries} in {delay:.2f}s")
+        time.sleep(delay)
+
+# Process-wide controllers, so every crawl from this worker shares one budget
+_default_controllers: Dict[bool, AdaptiveRateController] = {}
+_default_controllers_lock = threading.Lock()
+
+def get_default_rate_controller(has_token: bool) -> AdaptiveRateController:
+    """Return the shared controller for token-holding or tokenless requests."""
+    with _default_controllers_lock:
+        if has_token not in _default_controllers:
+            _default_controllers[has_token] = AdaptiveRateController.for_token(has_token)
+        return _default_controllers[has_token]
@@ -0,0 +1,226 @@
+"""
+Reference implementations the optimized code paths are checked against,
+and generators for the inputs they are checked on.
+
+Each reference is the straightforward (slow) version of what an optimized
+function computes. The tests compare the two on every row; the benchmarks
+use the same references as their timing baselines.
+"""
+
+import os
+import random
+import re
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.benchmarks.socrata_stub import COMPLAINT_TYPES, DESCRIPTORS, RESOLUTIONS, generate_311_records
+from backend.services.ai.nlp_service import URGENCY_TEXT_COLUMNS, URGENT_KEYWORDS
+from backend.services.ai.rework_predictor_service import (
+    SYNTHETIC_DATA_FILES,
+    load_synthetic_data,
+    score_rework_risk,
+    with_risk_factor_lists
+)
+from backend.services.data_ingestion_service import _clean_311_frame, apply_311_schema
+
+# Synthetic assets, contractors and work orders shipped with the repo
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'data')
+
+# Words mixed into generated complaint texts: near misses of urgent keywords
+# ('leaking', 'fireplace', 'healthy') and parts of keyword phrases
+URGENCY_FILLER = [
+    'tenant', 'reports', 'in', 'the', 'apartment', 'since', 'monday', 'leaking',
+    'children\'s', 'fireplace', 'no', 'heating', 'water', 'broken', 'window-sill',
+    'elevator', 'hallway', 'senior-citizen', 'healthy', 'break', 'in.', 'gas', 'floods'
+]
+
+def legacy_check_text_for_urgency(text: str) -> Tuple[bool, List[str]]:
+    """check_text_for_urgency as one uncompiled re.search per keyword."""
+    if not isinstance(text, str) or not text.strip():
+        return False, []
+    text_lower = text.lower()
+    matches = []
+    for keyword in URGENT_KEYWORDS:
+        if re.search(r'\b' + re.escape(keyword) + r'\b', text_lower):
+            matches.append(keyword)
+    return bool(matches), matches
+
+def build_urgency_corpus(n: int, seed: int = 7) -> List[str]:
+    """
+    Complaint-like texts: the stub's descriptors, complaint types and
+    resolutions, edge cases, then random sentences of keywords and filler,
+    30% of them upper case.
+    """
+    rng = random.Random(seed)
+    vocabulary = URGENCY_FILLER + URGENT_KEYWORDS
+    texts = COMPLAINT_TYPES + DESCRIPTORS + RESOLUTIONS + ['', '   ', 'GAS LEAK!', 'no-heat', 'lead-paint']
+    while len(texts) < n:
+        words = [rng.choice(vocabulary) for _ in range(rng.randint(1, 25))]
+        text = ' '.join(words)
+        texts.append(text.upper() if rng.random() < 0.3 else text)
+    return texts[:n]
+
+def legacy_flag_urgent_complaints(df: pd.DataFrame) -> pd.DataFrame:
+    """flag_urgent_complaints as iterrows with a per-cell keyword search."""
+    df = df.copy()
+    df['is_urgent'] = False
+    df['urgent_keywords_found'] = [[] for _ in range(len(df))]
+    for idx, row in df.iterrows():
+        all_matches = []
+        for col in URGENCY_TEXT_COLUMNS:
+            if col in row and pd.notna(row[col]):
+                is_urgent, matches = legacy_check_text_for_urgency(str(row[col]))
+                if is_urgent:
+                    all_matches.extend(matches)
+        if all_matches:
+            df.at[idx, 'is_urgent'] = True
+            df.at[idx, 'urgent_keywords_found'] = list(set(all_matches))
+    return df
+
+def build_complaints(rows: int, free_text_share: float = 0.2, seed: int = 11) -> pd.DataFrame:
+    """Stub complaints in the compact schema, with some free-text resolutions."""
+    df = pd.DataFrame(generate_311_records(rows, seed=seed))
+    rng = random.Random(seed)
+    corpus = build_urgency_corpus(2000, seed=seed)
+    free_text = [rng.random() < free_text_share for _ in range(rows)]
+    df.loc[free_text, 'resolution_description'] = [rng.choice(corpus) for _ in range(sum(free_text))]
+    return apply_311_schema(_clean_311_frame(df))
+
+def assert_same_flags(expected: pd.DataFrame, actual: pd.DataFrame) -> None:
+    """is_urgent must match exactly; keyword lists must match as sets (the old order came from a set)."""
+    assert expected['is_urgent'].tolist() == actual['is_urgent'].tolist()
+    assert [set(k) for k in expected['urgent_keywords_found']] == [set(k) for k in actual['urgent_keywords_found']]
+    assert all(len(k) == len(set(k)) for k in actual['urgent_keywords_found'])
+
+# Resolutions beyond the synthetic data's, so every resolution rule fires
+EXTRA_RESOLUTIONS = [
+    'Temporary patch applied', 'Replaced valve', 'New unit installed',
+    'Dispatch scheduled', 'PATCHED and replaced', None
+]
+
+def legacy_score_rework_risk(df: pd.DataFrame) -> pd.DataFrame:
+    """The previous implementation: df.apply with a per-row rule function."""
+    def assess_risk_revised(row) -> pd.Series:
+        score = 0.05
+        risk_factors = []
+        asset_age = row.get('asset_age_at_wo', 0)
+        if asset_age > 15:
+            score += 0.4
+            risk_factors.append('Old Asset (Age: ' + str(asset_age) + ')')
+        elif asset_age > 8:
+            score += 0.2
+            risk_factors.append('Moderately Old Asset (Age: ' + str(asset_age) + ')')
+        resolution = str(row.get('resolution_text_simulated', '')).lower()
+        if 'patch' in resolution or 'temporary' in resolution:
+            score += 0.3
+            risk_factors.append('Quick Fix Indicated')
+        elif 'replaced' in resolution or 'overhaul' in resolution or 'new unit installed' in resolution:
+            score -= 0.25
+            risk_factors.append('Thorough Fix Performed')
+        contractor_prop = row.get('contractor_rework_propensity')
+        if pd.notnull(contractor_prop):
+            if contractor_prop > 0.2:
+                score += 0.25
+                risk_factors.append(f'High Propensity Contractor (Prop: {contractor_prop:.2f})')
+            elif contractor_prop > 0.12:
+                score += 0.1
+                risk_factors.append(f'Moderate Propensity Contractor (Prop: {contractor_prop:.2f})')
+        score = min(max(score, 0.0), 1.0)
+        return pd.Series({'predicted_rework_risk_score': score,
+                          'predicted_risk_factors': risk_factors if risk_factors else ['Low Base Risk']})
+
+    return pd.concat([df, df.apply(assess_risk_revised, axis=1)], axis=1)
+
+def score_and_decode(df: pd.DataFrame) -> pd.DataFrame:
+    """score_rework_risk output in the legacy layout: factor lists, no masks."""
+    return with_risk_factor_lists(score_rework_risk(df)).drop(columns='predicted_risk_factor_mask')
+
+def resample_work_orders(rows: int, seed: int = 7) -> pd.DataFrame:
+    """Enriched work orders resampled from data/ with every rule branch represented."""
+    base = load_synthetic_data(DATA_DIR)
+    rng = np.random.default_rng(seed)
+    df = base.iloc[rng.integers(0, len(base), rows)].reset_index(drop=True)
+    df['asset_age_at_wo'] = rng.integers(0, 60, rows)
+    resolutions = np.array(list(base['resolution_text_simulated'].unique()) + EXTRA_RESOLUTIONS, dtype=object)
+    df['resolution_text_simulated'] = resolutions[rng.integers(0, len(resolutions), rows)]
+    propensities = np.array([0.05, 0.12, 0.121, 0.2, 0.2049, 0.31, np.nan])
+    df['contractor_rework_propensity'] = propensities[rng.integers(0, len(propensities), rows)]
+    return df
+
+# Work orders generated per CSV append
+GENERATE_BATCH_ROWS = 1000000
+
+def generate_work_orders_csv(path: str, rows: int, seed: int = 17) -> None:
+    """Write a work order history CSV in the synthetic_work_orders.csv layout."""
+    assets_path, contractors_path, work_orders_path = (os.path.join(DATA_DIR, name) for name in SYNTHETIC_DATA_FILES)
+    asset_ids = np.array(pd.read_csv(assets_path)['asset_id'].tolist() + ['ASSET_UNKNOWN'], dtype=object)
+    contractor_ids = np.array(pd.read_csv(contractors_path)['contractor_id'].tolist() + ['CONTR_UNKNOWN'], dtype=object)
+    base = pd.read_csv(work_orders_path)
+    resolutions = np.array(list(base['resolution_text_simulated'].unique()) + EXTRA_RESOLUTIONS, dtype=object)
+    complaint_types = base['complaint_type_simulated'].unique().astype(object)
+    days = pd.date_range('2015-01-01', '2025-06-30', freq='D')
+    created = np.array(days.strftime('%Y-%m-%d'), dtype=object)
+    closed = np.array((days + pd.Timedelta(days=7)).strftime('%Y-%m-%d'), dtype=object)
+
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, GENERATE_BATCH_ROWS):
+        n = min(GENERATE_BATCH_ROWS, rows - start)
+        day = rng.integers(0, len(days), n)
+        pd.DataFrame({
+            'wo_id': pd.Series(np.arange(start, start + n)).map('WO_{:08d}'.format),
+            'asset_id': asset_ids[rng.integers(0, len(asset_ids), n)],
+            'created_date': created[day],
+            'closed_date': closed[day],
+            'complaint_type_simulated': complaint_types[rng.integers(0, len(complaint_types), n)],
+            'resolution_text_simulated': resolutions[rng.integers(0, len(resolutions), n)],
+            'assigned_contractor_id': contractor_ids[rng.integers(0, len(contractor_ids), n)],
+            'actual_rework_needed': rng.random(n) < 0.4
+        }).to_csv(path, mode='a' if start else 'w', header=start == 0, index=False)
+
+def pairwise_repeat_failures(df: pd.DataFrame, window_days: float) -> pd.DataFrame:
+    """detect_repeat_failures as a comparison of each work order with every other on its asset."""
+    created = pd.to_datetime(df['created_date'])
+    closed = pd.to_datetime(df['closed_date'])
+    # Missing creation dates order last
+    created_order = created.fillna(pd.Timestamp.max)
+    previous, gaps = [], []
+    for i in range(len(df)):
+        best = None
+        for j in range(len(df)):
+            if j == i or df['asset_id'].iat[j] != df['asset_id'].iat[i] or pd.isna(df['asset_id'].iat[i]):
+                continue
+            if pd.isna(created.iat[i]) or pd.isna(closed.iat[j]) or closed.iat[j] > created.iat[i]:
+                continue
+            # A close on the day of creation only counts if created earlier, in (created_date, row) order
+            if closed.iat[j] == created.iat[i] and (created_order.iat[j], j) > (created_order.iat[i], i):
+                continue
+            # The latest close; among equal closes, the latest created
+            if best is None or (closed.iat[j], created_order.iat[j], j) > (closed.iat[best], created_order.iat[best], best):
+                best = j
+        previous.append(df['wo_id'].iat[best] if best is not None else None)
+        gaps.append((created.iat[i] - closed.iat[best]).days if best is not None else np.nan)
+    gaps = np.array(gaps, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        return pd.DataFrame({
+            'previous_wo_id': previous,
+            'days_since_previous_close': gaps,
+            'is_repeat_failure': gaps <= window_days
+        })
+
+def random_asset_work_orders(rows: int, assets: int, seed: int = 5) -> pd.DataFrame:
+    """Work orders over ten years with 1-60 day durations; 2% still open, 0.5% without an asset."""
+    rng = np.random.default_rng(seed)
+    created = np.datetime64('2015-01-01') + rng.integers(0, 3650, rows).astype('timedelta64[D]')
+    closed = created + rng.integers(1, 60, rows).astype('timedelta64[D]')
+    asset_ids = np.array([f"ASSET_{i:06d}" for i in range(assets)], dtype=object)[rng.integers(0, assets, rows)]
+    asset_ids[rng.random(rows) < 0.005] = None
+    closed_dates = pd.Series(closed).dt.strftime('%Y-%m-%d').to_numpy(dtype=object)
+    closed_dates[rng.random(rows) < 0.02] = None
+    return pd.DataFrame({
+        'wo_id': [f"WO_{i:08d}" for i in range(rows)],
+        'asset_id': asset_ids,
+        'created_date': pd.Series(created).dt.strftime('%Y-%m-%d'),
+        'closed_date': closed_dates
+    })
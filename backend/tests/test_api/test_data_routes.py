@@ -0,0 +1,33 @@
+"""
+Tests for request validation in the data API routes.
+"""
+
+import pytest
+from flask import Flask
+
+from backend.api.routes import data_routes
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    # Invalid requests must be rejected before any store or session is opened
+    def fail(*args, **kwargs):
+        raise AssertionError("store opened for an invalid request")
+    monkeypatch.setattr(data_routes, 'open_complaint_store', fail)
+    monkeypatch.setattr(data_routes, 'ensure_data_directory', lambda: str(tmp_path))
+    app = Flask(__name__)
+    app.register_blueprint(data_routes.data_bp)
+    return app.test_client()
+
+@pytest.mark.parametrize('body', [
+    {'concurrency': 'four'},
+    {'concurrency': 0},
+    {'concurrency': True},
+    {'concurrency': None},
+    {'pagination': 'cursor'},
+    {'wire_format': 'xml'},
+    {'mode': 'delta'},
+])
+def test_invalid_ingest_options_return_400(client, body):
+    response = client.post('/api/data/ingest-311', json=body)
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
@@ -0,0 +1,158 @@
+"""
+Tests for the /api/maintenance rework assessment, outcome and repeat-failure endpoints.
+"""
+
+import os
+
+import pandas as pd
+import pytest
+from flask import Flask
+
+from backend.api.routes import maintenance_routes
+from backend.services.ai.rework_predictor_service import load_synthetic_data, score_rework_risk
+from backend.services.ai.rework_risk_index import ReworkRiskIndex
+from backend.services.ai.rework_stats import ReworkStats
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'data')
+
+@pytest.fixture(scope='module')
+def index():
+    return ReworkRiskIndex(score_rework_risk(load_synthetic_data(DATA_DIR, use_cache=False)), ('test',))
+
+@pytest.fixture
+def stats():
+    return ReworkStats()
+
+@pytest.fixture
+def client(monkeypatch, index, stats):
+    monkeypatch.setattr(maintenance_routes, 'get_rework_risk_index', lambda: index)
+    monkeypatch.setattr(maintenance_routes, 'get_rework_stats', lambda: stats)
+    app = Flask(__name__)
+    app.register_blueprint(maintenance_routes.maintenance_bp)
+    return app.test_client()
+
+@pytest.mark.parametrize('min_score', ['nan', 'NaN', 'inf', '-inf', '-0.1', '1.5', 'high'])
+def test_invalid_min_score_returns_400(client, min_score):
+    response = client.get('/api/maintenance/rework-assessments', query_string={'min_score': min_score})
+    assert response.status_code == 400
+    assert 'min_score' in response.get_json()['message']
+
+@pytest.mark.parametrize('min_score', ['0', '0.5', '1'])
+def test_min_score_bounds_are_inclusive(client, index, min_score):
+    response = client.get('/api/maintenance/rework-assessments',
+                          query_string={'min_score': min_score, 'limit': 1000})
+    assert response.status_code == 200
+    expected = (index.frame['predicted_rework_risk_score'] >= float(min_score)).sum()
+    assert response.get_json()['total'] == expected
+
+def fetch_all_pages(client, **params):
+    """Follow next_cursor from the first page to the last; returns the pages' JSON."""
+    pages = []
+    cursor = None
+    while True:
+        query = dict(params, **({'cursor': cursor} if cursor else {}))
+        response = client.get('/api/maintenance/rework-assessments', query_string=query)
+        assert response.status_code == 200, response.get_json()
+        pages.append(response.get_json())
+        cursor = pages[-1]['next_cursor']
+        if cursor is None:
+            return pages
+
+@pytest.mark.parametrize('params, filters', [
+    ({}, {}),
+    ({'min_score': '0.3', 'sort': 'closed_date'}, {'min_score': 0.3, 'sort': 'closed_date'}),
+    ({'from': '2025-01-01', 'to': '2025-06-30', 'sort': '-asset_age_at_wo'},
+     {'closed_from': pd.Timestamp('2025-01-01'), 'closed_to': pd.Timestamp('2025-06-30'), 'sort': '-asset_age_at_wo'}),
+])
+def test_cursor_pages_cover_the_query_once_in_order(client, index, params, filters):
+    pages = fetch_all_pages(client, limit=37, fields='wo_id', **params)
+    expected = index.query(**filters)['wo_id'].tolist()
+
+    assert [row['wo_id'] for page in pages for row in page['rework_assessments']] == expected
+    assert all(page['total'] == len(expected) for page in pages)
+    assert [page['count'] for page in pages[:-1]] == [37] * (len(pages) - 1)
+    assert len(pages) == max(1, -(-len(expected) // 37))
+
+def test_fields_select_the_returned_columns(client):
+    response = client.get('/api/maintenance/rework-assessments',
+                          query_string={'limit': 5, 'fields': 'wo_id,predicted_risk_factors'})
+    rows = response.get_json()['rework_assessments']
+    assert len(rows) == 5
+    assert all(set(row) == {'wo_id', 'predicted_risk_factors'} for row in rows)
+    assert all(isinstance(row['predicted_risk_factors'], list) for row in rows)
+
+def test_cursor_from_another_query_is_rejected(client):
+    first = client.get('/api/maintenance/rework-assessments', query_string={'limit': 10}).get_json()
+    response = client.get('/api/maintenance/rework-assessments',
+                          query_string={'limit': 10, 'min_score': '0.5', 'cursor': first['next_cursor']})
+    assert response.status_code == 400
+
+def test_cursor_from_another_index_version_is_rejected(client, monkeypatch, index):
+    first = client.get('/api/maintenance/rework-assessments', query_string={'limit': 10}).get_json()
+    rebuilt = ReworkRiskIndex(index.frame, ('rebuilt',))
+    monkeypatch.setattr(maintenance_routes, 'get_rework_risk_index', lambda: rebuilt)
+    response = client.get('/api/maintenance/rework-assessments',
+                          query_string={'limit': 10, 'cursor': first['next_cursor']})
+    assert response.status_code == 400
+
+@pytest.mark.parametrize('params', [
+    {'cursor': 'not-a-cursor'},
+    {'limit': '0'},
+    {'limit': '1001'},
+    {'limit': 'ten'},
+    {'sort': 'building_id'},
+    {'fields': 'wo_id,secret'},
+    {'from': 'yesterday'},
+])
+def test_invalid_paging_parameters_return_400(client, params):
+    response = client.get('/api/maintenance/rework-assessments', query_string=params)
+    assert response.status_code == 400
+
+OUTCOME = {
+    'wo_id': 'WO_TEST_1',
+    'asset_id': 'ASSET_001',
+    'assigned_contractor_id': 'CONTR_001',
+    'closed_date': '2025-01-15',
+    'actual_rework_needed': True
+}
+
+def test_resent_outcomes_are_counted_once(client, stats):
+    first = client.post('/api/maintenance/rework-outcomes', json=OUTCOME).get_json()
+    assert first['counted'] and first['work_orders'] == 1
+    assert first['contractor_stats']['reworks'] == 1
+
+    again = client.post('/api/maintenance/rework-outcomes', json=OUTCOME).get_json()
+    assert not again['counted'] and again['work_orders'] == 1
+    assert stats.get('assigned_contractor_id', 'CONTR_001')['work_orders'] == 1
+
+    other = client.post('/api/maintenance/rework-outcomes', json=dict(OUTCOME, wo_id='WO_TEST_2')).get_json()
+    assert other['counted'] and other['work_orders'] == 2
+
+@pytest.mark.parametrize('field', ['wo_id', 'asset_id', 'assigned_contractor_id', 'asset_type', 'building_id'])
+@pytest.mark.parametrize('value', [['CONTR_001'], {'id': 1}])
+def test_non_scalar_dimension_values_return_400(client, stats, field, value):
+    response = client.post('/api/maintenance/rework-outcomes', json=dict(OUTCOME, **{field: value}))
+    assert response.status_code == 400
+    assert field in response.get_json()['message']
+    assert stats.work_orders == 0
+
+def test_outcome_is_required(client):
+    body = {key: value for key, value in OUTCOME.items() if key != 'actual_rework_needed'}
+    assert client.post('/api/maintenance/rework-outcomes', json=body).status_code == 400
+
+def test_repeat_failures_serialize_missing_values_as_null(client, monkeypatch):
+    repeats = pd.DataFrame({
+        'wo_id': ['WO_2', 'WO_3'],
+        'asset_id': ['A', 'A'],
+        'assigned_contractor_id': [None, 'CONTR_001'],
+        'created_date': ['2024-01-20', '2024-02-01'],
+        'previous_wo_id': ['WO_1', 'WO_2'],
+        'days_since_previous_close': [10.0, float('nan')]
+    })
+    monkeypatch.setattr(maintenance_routes, 'find_repeat_failures', lambda window_days: repeats)
+    response = client.get('/api/maintenance/repeat-failures')
+    assert response.status_code == 200
+    assert b'NaN' not in response.data
+    found = response.get_json()['repeat_failures']
+    assert [row['assigned_contractor_id'] for row in found] == [None, 'CONTR_001']
+    assert [row['days_since_previous_close'] for row in found] == [10.0, None]
@@ -0,0 +1,69 @@
+"""
+Tests for concurrent writers on the partitioned complaint store.
+"""
+
+import threading
+
+import pandas as pd
+
+from backend.benchmarks.socrata_stub import generate_311_records
+from backend.services.complaint_store import ComplaintStore
+from backend.services.data_ingestion_service import _clean_311_frame, apply_311_schema
+
+def cleaned_records(n: int) -> pd.DataFrame:
+    return apply_311_schema(_clean_311_frame(pd.DataFrame(generate_311_records(n))))
+
+def test_concurrent_stores_on_one_path_keep_every_part(tmp_path):
+    df = cleaned_records(4000)
+    chunks = [df.iloc[i::8] for i in range(8)]
+    root = str(tmp_path / 'store')
+    ComplaintStore(root, engine='npy')
+
+    def write(chunk):
+        ComplaintStore(root).write_chunks([chunk], compact=False)
+
+    threads = [threading.Thread(target=write, args=(chunk,)) for chunk in chunks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stored = ComplaintStore(root).read(columns=['unique_key'])
+    assert sorted(stored['unique_key']) == sorted(df['unique_key'])
+
+def split_store(root: str, df: pd.DataFrame, parts: int) -> None:
+    """Write df to a new NumPy store as several uncompacted parts per partition."""
+    store = ComplaintStore(root, engine='npy')
+    store.write_chunks([df.iloc[i::parts] for i in range(parts)], compact=False)
+
+def test_read_sees_a_compaction_by_another_instance(tmp_path):
+    df = cleaned_records(2000)
+    root = str(tmp_path / 'store')
+    split_store(root, df, 4)
+
+    reader = ComplaintStore(root)
+    ComplaintStore(root).compact()
+
+    stored = reader.read(columns=['unique_key'])
+    assert sorted(stored['unique_key']) == sorted(df['unique_key'])
+    # One part per partition, as the compaction left it
+    assert len(reader.parts) == len({(part['month'], part['borough']) for part in reader.parts})
+
+def test_read_starts_over_when_parts_are_compacted_mid_read(tmp_path, monkeypatch):
+    df = cleaned_records(2000)
+    root = str(tmp_path / 'store')
+    split_store(root, df, 4)
+    reader = ComplaintStore(root)
+    read_part = ComplaintStore._read_part
+    compactor = ComplaintStore(root)
+    removed = []
+
+    def compact_during_first_read(self, part, columns, start, end):
+        if self is reader and not removed:
+            removed.append(compactor.compact())
+        return read_part(self, part, columns, start, end)
+
+    monkeypatch.setattr(ComplaintStore, '_read_part', compact_during_first_read)
+    stored = reader.read(columns=['unique_key'])
+    assert removed[0] > 0
+    assert sorted(stored['unique_key']) == sorted(df['unique_key'])
@@ -0,0 +1,245 @@
+"""
+Tests for 311 page fetching in data_ingestion_service, against the local Socrata stub.
+"""
+
+import os
+from collections import Counter
+
+import pandas as pd
+import pytest
+import requests
+
+from backend.benchmarks.socrata_stub import SocrataStubServer, generate_311_records
+from backend.services import data_ingestion_service
+from backend.services.complaint_store import ComplaintStore
+from backend.services.data_ingestion_service import (
+    COMPLAINT_311_SCHEMA,
+    PAGE_LIMIT,
+    _clean_311_frame,
+    _normalize_text,
+    apply_311_schema,
+    concat_311_frames,
+    fetch_and_process_311_data,
+    ingest_311_full,
+    ingest_311_incremental,
+    load_311_watermark,
+    read_311_csv,
+    stream_311_data,
+    tally_311_chunks,
+    write_311_chunks_to_csv,
+)
+from backend.services.rate_controller import AdaptiveRateController
+from backend.utils.memory_report import memory_summary
+
+# Ten full pages and a short last one
+NUM_RECORDS = 10 * PAGE_LIMIT + PAGE_LIMIT // 2
+
+class FailingSession(requests.Session):
+    """Session whose request for one $offset fails without a retryable status."""
+
+    def __init__(self, fail_offset: int):
+        super().__init__()
+        self.fail_offset = fail_offset
+
+    def get(self, url, params=None, **kwargs):
+        if params is not None and params.get('$offset') == self.fail_offset:
+            raise requests.exceptions.HTTPError(f"injected failure at offset {self.fail_offset}")
+        return super().get(url, params=params, **kwargs)
+
+class CountingSession(requests.Session):
+    """Session that counts the page requests it sends."""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = 0
+
+    def get(self, url, params=None, **kwargs):
+        self.requests += 1
+        return super().get(url, params=params, **kwargs)
+
+@pytest.fixture(scope='module')
+def stub_url():
+    with SocrataStubServer(generate_311_records(NUM_RECORDS)) as stub:
+        yield stub.url
+
+def unpaced() -> AdaptiveRateController:
+    return AdaptiveRateController(min_interval=0.0, initial_interval=0.0)
+
+def fetch_keys(stub_url: str, concurrency: int, session=None, **kwargs) -> list:
+    chunks = stream_311_data(
+        start_date='2024-01-01', base_url=stub_url, concurrency=concurrency, session=session,
+        max_pages=20, rate_controller=unpaced(), **kwargs
+    )
+    return [key for chunk in chunks for key in chunk['unique_key'].tolist()]
+
+@pytest.mark.parametrize('concurrency', [1, 4, 8])
+def test_offset_paging_fetches_every_record(stub_url, concurrency):
+    keys = fetch_keys(stub_url, concurrency)
+    assert len(keys) == NUM_RECORDS
+    assert keys == fetch_keys(stub_url, 1)
+
+@pytest.mark.parametrize('failed_page', [0, 3, 10])
+@pytest.mark.parametrize('concurrency', [4, 8])
+def test_concurrent_paging_keeps_pages_below_a_failure(stub_url, concurrency, failed_page):
+    offset = failed_page * PAGE_LIMIT
+    expected = fetch_keys(stub_url, 1, FailingSession(offset), partial_ok=True)
+    assert len(expected) == failed_page * PAGE_LIMIT
+
+    actual = fetch_keys(stub_url, concurrency, FailingSession(offset), partial_ok=True)
+    assert actual == expected
+
+@pytest.mark.parametrize('concurrency', [1, 4])
+def test_paging_failure_raises_without_partial_ok(stub_url, concurrency):
+    with pytest.raises(requests.exceptions.HTTPError):
+        fetch_keys(stub_url, concurrency, FailingSession(3 * PAGE_LIMIT))
+
+def test_failure_past_the_last_page_is_ignored(stub_url):
+    # The sequential path stops at the short page 10 and never requests page 12
+    keys = fetch_keys(stub_url, 8, FailingSession(12 * PAGE_LIMIT))
+    assert len(keys) == NUM_RECORDS
+
+@pytest.mark.parametrize('max_pages', [3, 20])
+def test_csv_pages_match_json_under_the_same_record_cap(stub_url, max_pages):
+    frames = {
+        wire_format: pd.concat(list(stream_311_data(
+            start_date='2024-01-01', base_url=stub_url, max_pages=max_pages,
+            wire_format=wire_format, rate_controller=unpaced()
+        )), ignore_index=True)
+        for wire_format in ('json', 'csv')
+    }
+    assert len(frames['json']) == min(max_pages * PAGE_LIMIT, NUM_RECORDS)
+    pd.testing.assert_frame_equal(frames['json'], frames['csv'])
+
+def test_unknown_pagination_is_rejected_before_opening_a_session(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("session opened for an invalid request")
+    monkeypatch.setattr(data_ingestion_service, 'create_opendata_session', fail)
+    with pytest.raises(ValueError):
+        next(stream_311_data(start_date='2024-01-01', pagination='cursor'))
+
+def test_full_ingest_sets_the_watermark_to_the_newest_record(stub_url, tmp_path):
+    store = ComplaintStore(str(tmp_path / 'store'))
+    summary = ingest_311_full(
+        store, start_date='2024-01-01', base_url=stub_url, max_pages=20, rate_controller=unpaced()
+    )
+    assert summary['complete'] and summary['new_records'] == NUM_RECORDS
+
+    merged = store.read()
+    newest = merged['created_date'].max()
+    assert pd.Timestamp(summary['watermark']['created_date']) == newest
+    assert summary['watermark']['unique_key'] == str(
+        merged.loc[merged['created_date'] == newest, 'unique_key'].astype('int64').max()
+    )
+    assert load_311_watermark(str(tmp_path / 'store' / '_watermark.json')) == summary['watermark']
+
+def test_failed_full_ingest_keeps_its_rows_but_not_the_watermark(stub_url, tmp_path):
+    store = ComplaintStore(str(tmp_path / 'store'))
+    summary = ingest_311_full(
+        store, start_date='2024-01-01', base_url=stub_url, max_pages=20, rate_controller=unpaced(),
+        session=FailingSession(3 * PAGE_LIMIT)
+    )
+    assert not summary['complete']
+    assert summary['new_records'] == 3 * PAGE_LIMIT
+    assert summary['watermark'] is None
+
+@pytest.mark.parametrize('columnar', [False, True])
+def test_failed_first_incremental_run_resumes_without_losing_records(stub_url, tmp_path, columnar):
+    store = ComplaintStore(str(tmp_path / 'store')) if columnar else None
+    kwargs = dict(start_date='2024-01-01', store=store, base_url=stub_url, max_pages=20, rate_controller=unpaced())
+    first = ingest_311_incremental(str(tmp_path), session=FailingSession(3 * PAGE_LIMIT), **kwargs)
+    assert first['new_records'] == 3 * PAGE_LIMIT
+
+    # The rerun picks up from the oldest-first watermark and fills in the rest
+    second = ingest_311_incremental(str(tmp_path), **kwargs)
+    assert second['total_records'] == NUM_RECORDS
+    stored = store.read() if columnar else read_311_csv(second['file_path'])
+    assert sorted(stored['unique_key'].astype('int64')) == sorted(fetch_keys(stub_url, 1))
+
+def test_chunks_coalesce_pages_up_to_chunk_size(stub_url):
+    chunks = list(stream_311_data(
+        start_date='2024-01-01', base_url=stub_url, max_pages=20, rate_controller=unpaced(),
+        chunk_size=2500
+    ))
+    assert [len(chunk) for chunk in chunks] == [3000, 3000, 3000, NUM_RECORDS - 9000]
+    assert all((chunk.dtypes == chunks[0].dtypes).all() for chunk in chunks)
+
+    whole = fetch_and_process_311_data(
+        start_date='2024-01-01', base_url=stub_url, max_pages=20, rate_controller=unpaced()
+    )
+    assert pd.concat(chunks, ignore_index=True)['unique_key'].tolist() == whole['unique_key'].tolist()
+
+@pytest.mark.parametrize('concurrency', [1, 4])
+def test_pages_are_fetched_as_chunks_are_consumed(stub_url, concurrency):
+    session = CountingSession()
+    chunks = stream_311_data(
+        start_date='2024-01-01', base_url=stub_url, max_pages=20, rate_controller=unpaced(),
+        concurrency=concurrency, session=session
+    )
+    next(chunks)
+    # The concurrent pager runs at most 2 * concurrency pages ahead of the consumer
+    assert session.requests <= max(1, 2 * concurrency)
+    chunks.close()
+
+def test_chunks_are_tallied_and_written_in_one_pass(stub_url, tmp_path):
+    path = str(tmp_path / '311.csv')
+    counts = Counter()
+    chunks = stream_311_data(
+        start_date='2024-01-01', base_url=stub_url, max_pages=20, rate_controller=unpaced()
+    )
+    assert write_311_chunks_to_csv(tally_311_chunks(chunks, counts), path) == NUM_RECORDS
+
+    written = read_311_csv(path)
+    assert len(written) == NUM_RECORDS
+    assert counts == Counter(written['complaint_type'].value_counts().to_dict())
+
+def test_keyset_paging_fetches_the_same_records_as_offset(stub_url):
+    keys = fetch_keys(stub_url, 1, pagination='keyset')
+    assert len(keys) == NUM_RECORDS
+    assert sorted(keys) == sorted(fetch_keys(stub_url, 1))
+
+def test_keyset_crawl_resumes_after_the_last_delivered_chunk(stub_url, tmp_path):
+    checkpoint_path = str(tmp_path / 'checkpoint.json')
+    full = fetch_keys(stub_url, 1, pagination='keyset')
+
+    chunks = stream_311_data(
+        start_date='2024-01-01', base_url=stub_url, max_pages=20, rate_controller=unpaced(),
+        pagination='keyset', checkpoint_path=checkpoint_path, chunk_size=2 * PAGE_LIMIT
+    )
+    delivered = next(chunks)['unique_key'].tolist()
+    # Asking for the second chunk marks the first delivered; then the crawl is interrupted
+    next(chunks)
+    chunks.close()
+
+    resumed = fetch_keys(stub_url, 1, pagination='keyset', checkpoint_path=checkpoint_path)
+    assert delivered + resumed == full
+    assert not os.path.exists(checkpoint_path)
+
+def test_compact_schema_keeps_the_values_of_the_untyped_frame():
+    records = generate_311_records(2000)
+    untyped = _clean_311_frame(pd.DataFrame(records))
+    typed = apply_311_schema(_clean_311_frame(pd.DataFrame(records)))
+
+    assert {col: str(dtype) for col, dtype in typed.dtypes.items()} == COMPLAINT_311_SCHEMA
+    assert typed['unique_key'].tolist() == untyped['unique_key'].astype('int64').tolist()
+    assert typed['bbl'].tolist() == untyped['bbl'].astype('int64').tolist()
+    for col in ('agency', 'complaint_type', 'descriptor', 'resolution_description', 'borough'):
+        assert typed[col].astype(object).tolist() == untyped[col].tolist(), col
+    pd.testing.assert_series_equal(
+        typed['latitude'].astype('float64'), untyped['latitude'].astype('float64'), rtol=1e-6
+    )
+    assert memory_summary(untyped, typed)['ratio'] > 2
+
+def test_lowercasing_a_categorical_merges_its_categories():
+    series = pd.Series(pd.Categorical(['NO HEAT', 'no heat', None, 'Mold']))
+    normalized = _normalize_text(series)
+    assert isinstance(normalized.dtype, pd.CategoricalDtype)
+    assert normalized.astype(object).tolist() == ['no heat', 'no heat', '', 'mold']
+    assert sorted(normalized.cat.categories) == ['', 'mold', 'no heat']
+
+def test_concat_unions_categories_instead_of_falling_back_to_object():
+    first = apply_311_schema(pd.DataFrame({'descriptor': ['mold', 'no heat']}))
+    second = apply_311_schema(pd.DataFrame({'descriptor': ['gas leak']}))
+    combined = apply_311_schema(concat_311_frames([first, second]))
+    assert isinstance(combined['descriptor'].dtype, pd.CategoricalDtype)
+    assert combined['descriptor'].astype(object).tolist() == ['mold', 'no heat', 'gas leak']
+    assert list(combined['descriptor'].cat.categories) == ['gas leak', 'mold', 'no heat']
@@ -0,0 +1,154 @@
+"""
+Tests for urgent keyword matching in nlp_service.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.services.ai import nlp_service
+from backend.services.ai.nlp_service import (
+    DEFAULT_KEYWORD_WEIGHT,
+    MAX_MASK_KEYWORDS,
+    URGENT_KEYWORD_WEIGHTS,
+    KeywordMatcher,
+    check_text_for_urgency,
+    flag_urgent_complaints,
+    has_urgent_keyword,
+    keyword_lists,
+    keyword_masks,
+    top_urgent_complaints,
+    with_urgent_keyword_lists,
+)
+from backend.tests.reference import (
+    assert_same_flags,
+    build_complaints,
+    build_urgency_corpus,
+    legacy_check_text_for_urgency,
+    legacy_flag_urgent_complaints,
+)
+
+# Overlapping keywords: shared prefixes, phrases inside phrases, punctuation
+OVERLAPPING_KEYWORDS = ['gas', 'gas leak', 'leak', 'no', 'no heat', 'no heat or hot water', "children's", 'in.']
+
+def regex_matches(text, keywords):
+    """One re.search per keyword, as matching was done before the compiled matcher."""
+    if not isinstance(text, str) or not text.strip():
+        return []
+    return [kw for kw in keywords if re.search(r'\b' + re.escape(kw) + r'\b', text.lower())]
+
+def test_check_text_for_urgency_matches_the_per_keyword_regex():
+    for text in build_urgency_corpus(5000):
+        assert check_text_for_urgency(text) == legacy_check_text_for_urgency(text), text
+
+def test_overlapping_keywords_match_like_the_per_keyword_regex():
+    matcher = KeywordMatcher(OVERLAPPING_KEYWORDS, memo_size=0)
+    texts = [
+        'gas leak', 'GAS', 'gasleak', 'no heat or hot water since monday', 'no heating',
+        "the children's room", 'break in. yesterday', 'leak, gas, no', None, '', 'no-heat'
+    ] + build_urgency_corpus(500)
+    for text in texts:
+        assert matcher.match(text) == regex_matches(text, OVERLAPPING_KEYWORDS), text
+
+    hits = matcher.match_matrix(pd.Series(texts, dtype=object))
+    expected = [regex_matches(text, matcher.vocabulary) for text in texts]
+    assert keyword_lists(keyword_masks(hits), matcher.vocabulary) == expected
+
+def test_each_distinct_text_is_scanned_once():
+    matcher = KeywordMatcher(OVERLAPPING_KEYWORDS)
+    texts = pd.Series(['gas leak', 'no heat', None, 'gas leak', 'mold'] * 200, dtype='category')
+    hits = matcher.match_matrix(texts)
+    assert matcher.memo_info() == {'hits': 0, 'misses': 3, 'size': 3, 'max_size': matcher.memo_size}
+    expected = [regex_matches(text, matcher.vocabulary) for text in texts.astype(object)]
+    assert keyword_lists(keyword_masks(hits), matcher.vocabulary) == expected
+
+    # Later calls take the remembered matches
+    np.testing.assert_array_equal(matcher.match_matrix(texts.astype(object)), hits)
+    assert matcher.memo_info()['hits'] == 3 and matcher.memo_info()['misses'] == 3
+
+def test_memo_keeps_the_most_recently_used_texts():
+    matcher = KeywordMatcher(OVERLAPPING_KEYWORDS, memo_size=2)
+    for text in ('gas leak', 'no heat', 'gas leak', 'leak'):
+        matcher.match_matrix(pd.Series([text]))
+    # 'no heat' was used least recently, so it was evicted
+    matcher.match_matrix(pd.Series(['gas leak', 'leak', 'no heat']))
+    assert matcher.memo_info() == {'hits': 3, 'misses': 4, 'size': 2, 'max_size': 2}
+
+def test_flag_urgent_complaints_matches_iterrows():
+    df = build_complaints(3000)
+    flagged = flag_urgent_complaints(df)
+    assert_same_flags(legacy_flag_urgent_complaints(df), with_urgent_keyword_lists(flagged))
+    assert 'is_urgent' not in df.columns
+
+def test_flag_urgent_complaints_handles_missing_text_and_columns():
+    df = pd.DataFrame({
+        'unique_key': [1, 2, 3, 4],
+        'descriptor': ['GAS LEAK', None, '', 'mold in bathroom'],
+        'complaint_type': [None, 'no heat', 'plumbing', None]
+    })
+    assert_same_flags(legacy_flag_urgent_complaints(df), with_urgent_keyword_lists(flag_urgent_complaints(df)))
+
+def test_urgency_score_sums_the_weights_of_the_matched_keywords():
+    flagged = with_urgent_keyword_lists(flag_urgent_complaints(build_complaints(2000)))
+    expected = [
+        sum(URGENT_KEYWORD_WEIGHTS.get(kw, DEFAULT_KEYWORD_WEIGHT) for kw in keywords)
+        for keywords in flagged['urgent_keywords_found']
+    ]
+    np.testing.assert_allclose(flagged['urgency_score'], expected)
+
+def test_keyword_masks_round_trip_every_bit():
+    vocabulary = tuple(f'kw{j}' for j in range(MAX_MASK_KEYWORDS))
+    hits = np.random.default_rng(2).random((500, MAX_MASK_KEYWORDS)) < 0.1
+    hits[0] = True
+    masks = keyword_masks(hits)
+    assert masks.dtype == np.uint64 and masks[0] == np.iinfo(np.uint64).max
+    assert keyword_lists(masks, vocabulary) == [[kw for kw, hit in zip(vocabulary, row) if hit] for row in hits]
+
+    with pytest.raises(ValueError):
+        keyword_masks(np.zeros((1, MAX_MASK_KEYWORDS + 1), dtype=bool))
+
+def test_has_urgent_keyword_matches_the_decoded_lists():
+    flagged = flag_urgent_complaints(build_complaints(2000))
+    keywords = with_urgent_keyword_lists(flagged)['urgent_keywords_found']
+    for keyword in ('gas leak', 'no heat', 'mold', 'flood'):
+        expected = [keyword in found for found in keywords]
+        assert has_urgent_keyword(flagged, keyword).tolist() == expected
+    with pytest.raises(KeyError):
+        has_urgent_keyword(flagged, 'not a keyword')
+
+    # Decoding a selection gives the same lists as decoding everything
+    top = top_urgent_complaints(flagged, 50)
+    assert with_urgent_keyword_lists(top)['urgent_keywords_found'].tolist() == keywords.loc[top.index].tolist()
+
+@pytest.mark.parametrize('n', [0, 1, 7, 100, 10 ** 6, None])
+def test_top_urgent_complaints_match_nlargest(n):
+    # Stub texts only: few distinct scores, so the cut falls inside a run of ties
+    flagged = flag_urgent_complaints(build_complaints(2000, free_text_share=0.0))
+    urgent = flagged[flagged['is_urgent']]
+    assert urgent['urgency_score'].nunique() < len(urgent) // 10
+    # nlargest falls back to an unstable sort once n covers every row
+    if n is None or n >= len(urgent):
+        expected = urgent.sort_values('urgency_score', ascending=False, kind='stable')
+    else:
+        expected = urgent.nlargest(n, 'urgency_score', keep='first')
+    pd.testing.assert_frame_equal(top_urgent_complaints(flagged, n), expected)
+
+def test_replaced_scan_pool_stays_usable_until_released():
+    keywords = ('fire', 'leak')
+    old = nlp_service._acquire_process_pool(2, keywords)
+    try:
+        # A different worker count replaces the shared pool while `old` is in use
+        new = nlp_service._acquire_process_pool(3, keywords)
+        assert new is not old
+        scanned = np.concatenate(list(old.map(nlp_service._scan_shard, [['fire in hall'], ['leak']])))
+        assert scanned.tolist() == [[True, False], [False, True]]
+    finally:
+        nlp_service._release_process_pool(old)
+    assert old not in nlp_service._scan_pool_users
+
+    nlp_service._release_process_pool(new)
+    # The idle current pool is kept for the next caller
+    assert nlp_service._acquire_process_pool(3, keywords) is new
+    nlp_service._release_process_pool(new)
@@ -0,0 +1,30 @@
+"""
+Tests for request pacing in rate_controller.
+"""
+
+import pytest
+
+from backend.services.rate_controller import RATE_BUDGETS, AdaptiveRateController
+
+# Fixed delay between requests before the controller existed
+BASELINE_INTERVAL = 0.2
+
+@pytest.mark.parametrize('has_token', [True, False])
+def test_healthy_crawls_are_never_slower_than_the_fixed_delay(has_token):
+    controller = AdaptiveRateController.for_token(has_token)
+    assert controller.interval <= BASELINE_INTERVAL
+    for _ in range(50):
+        controller.record_success()
+        assert controller.interval <= BASELINE_INTERVAL
+    budget = RATE_BUDGETS['token' if has_token else 'tokenless']
+    assert controller.interval == pytest.approx(budget['min_interval'])
+
+def test_throttling_backs_off_up_to_the_budget_and_recovers():
+    controller = AdaptiveRateController.for_token(False)
+    for _ in range(20):
+        controller.record_throttle()
+    assert controller.interval == RATE_BUDGETS['tokenless']['max_interval']
+
+    for _ in range(200):
+        controller.record_success()
+    assert controller.interval == pytest.approx(RATE_BUDGETS['tokenless']['min_interval'])
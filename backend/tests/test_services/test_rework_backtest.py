@@ -0,0 +1,75 @@
+"""
+Tests for the rework rule backtest in rework_backtest.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.metrics import f1_score, precision_score, recall_score, roc_auc_score
+
+from backend.services.ai import rework_backtest
+from backend.services.ai.rework_backtest import (
+    DEFAULT_DECISION_THRESHOLD,
+    DEFAULT_GRID,
+    backtest_rules,
+    best_rule_spec,
+    candidate_spec,
+    roc_auc,
+)
+from backend.services.ai.rework_predictor_service import score_rework_risk
+from backend.services.ai.rework_rules import ReworkRuleSet, get_rework_rules
+from backend.tests.reference import resample_work_orders
+
+# Two values per parameter: a small grid that still varies every rule
+GRID = {key: values[:2] for key, values in DEFAULT_GRID.items()}
+
+@pytest.fixture(scope='module')
+def work_orders():
+    df = resample_work_orders(3000, seed=5)
+    df['actual_rework_needed'] = np.random.default_rng(5).random(len(df)) < 0.4
+    return df
+
+@pytest.fixture(scope='module')
+def results(work_orders):
+    return backtest_rules(work_orders, GRID, sort_by='auc')
+
+def test_roc_auc_matches_sklearn_with_ties():
+    rng = np.random.default_rng(3)
+    labels = rng.random(2000) < 0.3
+    # Few distinct values, so most scores are tied
+    scores = np.round(rng.random((5, 2000)) + labels * 0.2, 1)
+    expected = [roc_auc_score(labels, row) for row in scores]
+    np.testing.assert_allclose(roc_auc(scores, labels), expected)
+
+def test_roc_auc_is_nan_for_a_single_class():
+    assert np.isnan(roc_auc(np.random.default_rng(0).random((2, 50)), np.zeros(50, dtype=bool))).all()
+
+def test_metrics_match_scoring_each_candidate(work_orders, results):
+    labels = work_orders['actual_rework_needed'].to_numpy(dtype=bool)
+    base_spec = get_rework_rules().spec
+    assert len(results) == int(np.prod([len(values) for values in GRID.values()]))
+    assert results['auc'].is_monotonic_decreasing
+
+    for row in results.iloc[::7].itertuples():
+        rules = ReworkRuleSet(candidate_spec(base_spec, GRID, row.candidate))
+        scores = score_rework_risk(work_orders, rules)['predicted_rework_risk_score'].to_numpy()
+        flagged = scores >= DEFAULT_DECISION_THRESHOLD
+        assert row.auc == pytest.approx(roc_auc_score(labels, scores))
+        assert row.flagged == flagged.sum()
+        assert row.recall == pytest.approx(recall_score(labels, flagged))
+        if flagged.any():
+            assert row.precision == pytest.approx(precision_score(labels, flagged))
+            assert row.f1 == pytest.approx(f1_score(labels, flagged))
+
+def test_best_rule_spec_is_the_first_candidate(results):
+    best = best_rule_spec(results, GRID)
+    assert best == candidate_spec(get_rework_rules().spec, GRID, int(results['candidate'].iloc[0]))
+
+def test_parallel_backtest_matches_serial(monkeypatch, work_orders, results):
+    monkeypatch.setattr(rework_backtest, 'PARALLEL_MIN_CANDIDATES', 1)
+    parallel = backtest_rules(work_orders, GRID, sort_by='auc', workers=2)
+    pd.testing.assert_frame_equal(parallel, results)
+
+def test_backtest_needs_labels(work_orders):
+    with pytest.raises(ValueError):
+        backtest_rules(work_orders.drop(columns='actual_rework_needed'))
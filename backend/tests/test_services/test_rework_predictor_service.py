@@ -0,0 +1,182 @@
+"""
+Tests for rework risk scoring, synthetic data loading, chunked scoring and
+repeat-failure detection in rework_predictor_service.
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.services.ai.rework_predictor_service import (
+    SYNTHETIC_DATA_FILES,
+    CsvScoreSink,
+    NpyScoreSink,
+    SyntheticDataCache,
+    detect_repeat_failures,
+    enrich_work_orders,
+    load_synthetic_data,
+    predict_rework_risk_for_work_orders,
+    score_rework_risk,
+    score_work_orders_chunked,
+    with_risk_factor_lists,
+)
+from backend.tests.reference import (
+    DATA_DIR,
+    generate_work_orders_csv,
+    legacy_score_rework_risk,
+    pairwise_repeat_failures,
+    random_asset_work_orders,
+    resample_work_orders,
+    score_and_decode,
+)
+
+@pytest.fixture(scope='module')
+def work_orders():
+    return resample_work_orders(5000)
+
+def test_scores_match_the_per_row_rules(work_orders):
+    pd.testing.assert_frame_equal(score_and_decode(work_orders), legacy_score_rework_risk(work_orders))
+
+def test_float_ages_are_labelled_like_the_per_row_rules(work_orders):
+    # Ages with missing values are float; labels must then read 'Age: 41.0'
+    float_ages = work_orders.assign(asset_age_at_wo=work_orders['asset_age_at_wo'].where(work_orders.index % 50 > 0))
+    pd.testing.assert_frame_equal(score_and_decode(float_ages), legacy_score_rework_risk(float_ages))
+
+def test_predict_scores_the_synthetic_work_orders():
+    scored = predict_rework_risk_for_work_orders(DATA_DIR)
+    assert len(scored) > 0
+    assert scored['predicted_rework_risk_score'].between(0.0, 1.0).all()
+    expected = legacy_score_rework_risk(scored.drop(columns=['predicted_rework_risk_score', 'predicted_risk_factor_mask']))
+    pd.testing.assert_series_equal(scored['predicted_rework_risk_score'], expected['predicted_rework_risk_score'])
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for name in SYNTHETIC_DATA_FILES:
+        shutil.copy(os.path.join(DATA_DIR, name), str(tmp_path / name))
+    return str(tmp_path)
+
+def test_cache_hits_until_a_file_changes(data_dir):
+    cache = SyntheticDataCache()
+    first = cache.get(data_dir)
+    pd.testing.assert_frame_equal(first, load_synthetic_data(data_dir, use_cache=False))
+    pd.testing.assert_frame_equal(cache.get(data_dir), first)
+    assert cache.cache_info() == {'hits': 1, 'misses': 1, 'size': 1}
+
+    # Callers get copies: modifying one does not touch the cached frame
+    first['asset_age_at_wo'] = -1
+    assert (cache.get(data_dir)['asset_age_at_wo'] != -1).any()
+    assert cache.cache_info()['hits'] == 2
+
+def test_cache_reloads_when_a_file_is_rewritten(data_dir):
+    cache = SyntheticDataCache()
+    before = cache.get(data_dir)
+    work_orders_path = os.path.join(data_dir, 'synthetic_work_orders.csv')
+    work_orders = pd.read_csv(work_orders_path)
+
+    # Same size, new mtime
+    stat = os.stat(work_orders_path)
+    os.utime(work_orders_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    pd.testing.assert_frame_equal(cache.get(data_dir), before)
+    assert cache.cache_info()['misses'] == 2
+
+    # New size, same mtime
+    work_orders.head(10).to_csv(work_orders_path, index=False)
+    os.utime(work_orders_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert len(cache.get(data_dir)) == 10
+    assert cache.cache_info() == {'hits': 0, 'misses': 3, 'size': 1}
+
+def test_cache_invalidate_and_missing_files(data_dir):
+    cache = SyntheticDataCache()
+    cache.get(data_dir)
+    cache.invalidate(data_dir)
+    assert cache.cache_info()['size'] == 0
+    cache.get(data_dir)
+    assert cache.cache_info()['misses'] == 2
+
+    os.remove(os.path.join(data_dir, 'synthetic_assets.csv'))
+    with pytest.raises(FileNotFoundError):
+        cache.get(data_dir)
+    assert load_synthetic_data(data_dir) is None
+
+@pytest.mark.parametrize('chunk_rows', [700, 2000, 5000])
+def test_chunked_scoring_matches_one_shot_scoring(tmp_path, chunk_rows):
+    # Chunk sizes that do and do not divide the rows, and one covering them all
+    work_orders_path = str(tmp_path / 'work_orders.csv')
+    generate_work_orders_csv(work_orders_path, 2000)
+    assets_path, contractors_path, _ = (os.path.join(DATA_DIR, name) for name in SYNTHETIC_DATA_FILES)
+    expected = with_risk_factor_lists(score_rework_risk(enrich_work_orders(
+        pd.read_csv(work_orders_path), pd.read_csv(assets_path), pd.read_csv(contractors_path)
+    )), separator='; ')
+
+    csv_out, npy_out = str(tmp_path / 'scores.csv'), str(tmp_path / 'scores')
+    for sink in (CsvScoreSink(csv_out), NpyScoreSink(npy_out)):
+        with sink:
+            stats = score_work_orders_chunked(work_orders_path, assets_path, contractors_path, sink,
+                                              chunk_rows=chunk_rows)
+        assert stats['rows'] == sink.rows == len(expected)
+        assert stats['chunks'] == -(-len(expected) // chunk_rows)
+        assert stats['high_risk'] == int((expected['predicted_rework_risk_score'] >= 0.6).sum())
+
+    for actual in (pd.read_csv(csv_out, float_precision='round_trip'), NpyScoreSink.read(npy_out)):
+        assert actual['wo_id'].tolist() == expected['wo_id'].tolist()
+        np.testing.assert_array_equal(actual['predicted_rework_risk_score'], expected['predicted_rework_risk_score'])
+        assert actual['predicted_risk_factors'].tolist() == expected['predicted_risk_factors'].tolist()
+
+def test_failed_csv_scoring_leaves_no_output(tmp_path):
+    path = str(tmp_path / 'scores.csv')
+    with pytest.raises(RuntimeError):
+        with CsvScoreSink(path) as sink:
+            sink.write(pd.DataFrame({'wo_id': ['WO_1'], 'predicted_rework_risk_score': [0.5]}))
+            raise RuntimeError('scoring failed')
+    assert os.listdir(str(tmp_path)) == []
+
+@pytest.mark.parametrize('window_days', [0, 30])
+@pytest.mark.parametrize('seed', [1, 2])
+def test_repeat_failures_match_the_pairwise_comparison(seed, window_days):
+    # Few assets, so work orders overlap and share created dates
+    df = random_asset_work_orders(250, 10, seed)
+    expected = pairwise_repeat_failures(df, window_days)
+    actual = detect_repeat_failures(df, window_days)
+
+    assert actual['previous_wo_id'].tolist() == expected['previous_wo_id'].tolist()
+    np.testing.assert_array_equal(actual['days_since_previous_close'], expected['days_since_previous_close'])
+    assert actual['is_repeat_failure'].tolist() == expected['is_repeat_failure'].tolist()
+
+def test_repeat_failures_keep_the_input_rows():
+    df = random_asset_work_orders(200, 10)
+    actual = detect_repeat_failures(df)
+    assert actual['wo_id'].tolist() == df['wo_id'].tolist()
+    # Work orders without an asset are never repeats
+    assert not actual.loc[df['asset_id'].isna(), 'is_repeat_failure'].any()
+
+def test_repeat_failure_after_a_short_work_order_within_a_long_one():
+    df = pd.DataFrame({
+        'wo_id': ['LONG', 'SHORT', 'NEW', 'SAME_DAY', 'OPEN', 'OTHER_ASSET'],
+        'asset_id': ['A', 'A', 'A', 'A', 'A', 'B'],
+        # LONG is still open when SHORT closes and NEW is created
+        'created_date': ['2024-01-01', '2024-01-05', '2024-01-20', '2024-01-20', '2024-01-21', '2024-01-19'],
+        'closed_date': ['2024-03-01', '2024-01-10', '2024-01-20', '2024-01-25', None, '2024-01-19']
+    })
+    actual = detect_repeat_failures(df, window_days=30).set_index('wo_id')
+    assert actual['previous_wo_id'].to_dict() == {
+        'LONG': None, 'SHORT': None, 'NEW': 'SHORT',
+        # NEW closed the day SAME_DAY was created, and was created before it
+        'SAME_DAY': 'NEW', 'OPEN': 'NEW', 'OTHER_ASSET': None
+    }
+    assert actual['days_since_previous_close'].fillna(-1).to_dict() == {
+        'LONG': -1, 'SHORT': -1, 'NEW': 10, 'SAME_DAY': 0, 'OPEN': 1, 'OTHER_ASSET': -1
+    }
+    assert actual['is_repeat_failure'].tolist() == [False, False, True, True, True, False]
+    assert not detect_repeat_failures(df, window_days=5)['is_repeat_failure'].iloc[2]
+
+def test_work_orders_closed_before_created_are_not_their_own_repeat():
+    df = pd.DataFrame({
+        'wo_id': ['FIRST', 'BAD'],
+        'asset_id': ['A', 'A'],
+        'created_date': ['2024-01-01', '2024-02-01'],
+        'closed_date': ['2024-01-10', '2024-01-20']
+    })
+    assert detect_repeat_failures(df)['previous_wo_id'].tolist() == [None, 'FIRST']
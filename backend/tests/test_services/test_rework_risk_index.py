@@ -0,0 +1,107 @@
+"""
+Tests for rework risk index queries in rework_risk_index.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.services.ai.rework_predictor_service import score_rework_risk, with_risk_factor_lists
+from backend.services.ai.rework_risk_index import INDEX_SORT_COLUMNS, ReworkRiskIndex
+from backend.tests.reference import resample_work_orders
+
+@pytest.fixture(scope='module')
+def scored():
+    df = resample_work_orders(4000)
+    df['wo_id'] = [f'WO_{i:06d}' for i in range(len(df))]
+    # Some open work orders: missing close dates sort last and match no date range
+    df.loc[df.index % 17 == 0, 'closed_date'] = None
+    return score_rework_risk(df)
+
+@pytest.fixture(scope='module')
+def index(scored):
+    return ReworkRiskIndex(scored)
+
+@pytest.fixture(scope='module')
+def by_score(scored):
+    return scored.sort_values('predicted_rework_risk_score', ascending=False, kind='stable').reset_index(drop=True)
+
+def test_index_is_in_descending_score_order(index, by_score):
+    pd.testing.assert_frame_equal(index.frame, by_score)
+
+@pytest.mark.parametrize('n', [0, 1, 10, 500, 10 ** 6])
+def test_top_n_matches_nlargest(index, scored, n):
+    expected = scored.nlargest(n, 'predicted_rework_risk_score', keep='first')
+    if n >= len(scored):
+        # nlargest falls back to an unstable sort once n covers every row
+        expected = scored.sort_values('predicted_rework_risk_score', ascending=False, kind='stable')
+    assert index.top_n(n)['wo_id'].tolist() == expected['wo_id'].tolist()
+
+@pytest.mark.parametrize('threshold', [-1.0, 0.0, 0.3, 0.6, 1.0])
+def test_above_matches_a_filter(index, by_score, threshold):
+    scores = by_score['predicted_rework_risk_score']
+    pd.testing.assert_frame_equal(index.above(threshold), by_score[scores > threshold])
+    pd.testing.assert_frame_equal(index.above(threshold, strict=False), by_score[scores >= threshold])
+    pd.testing.assert_frame_equal(index.top_n(20, min_score=threshold), by_score[scores > threshold].head(20))
+
+@pytest.mark.parametrize('sort', [f'{prefix}{column}' for column in INDEX_SORT_COLUMNS for prefix in ('', '-')])
+@pytest.mark.parametrize('filters', [
+    {},
+    {'min_score': 0.5},
+    {'asset_type': 'Boiler'},
+    {'contractor': 'CONTR_002', 'min_score': 0.2},
+    {'closed_from': pd.Timestamp('2023-01-01'), 'closed_to': pd.Timestamp('2024-06-30')},
+    {'closed_to': pd.Timestamp('2023-12-31'), 'min_score': 0.3},
+    {'asset_type': 'no such type'},
+])
+def test_query_matches_pandas_filters_and_sort(index, by_score, filters, sort):
+    keep = pd.Series(True, index=by_score.index)
+    if 'min_score' in filters:
+        keep &= by_score['predicted_rework_risk_score'] >= filters['min_score']
+    if 'asset_type' in filters:
+        keep &= by_score['asset_type'] == filters['asset_type']
+    if 'contractor' in filters:
+        keep &= by_score['assigned_contractor_id'] == filters['contractor']
+    closed = pd.to_datetime(by_score['closed_date'])
+    if 'closed_from' in filters:
+        keep &= closed >= filters['closed_from']
+    if 'closed_to' in filters:
+        keep &= closed <= filters['closed_to']
+    expected = by_score[keep]
+
+    column = sort.lstrip('-')
+    if column != 'predicted_rework_risk_score' or not sort.startswith('-'):
+        key = closed if column == 'closed_date' else expected[column]
+        order = key[keep].sort_values(ascending=not sort.startswith('-'), kind='stable', na_position='last').index
+        expected = expected.loc[order]
+
+    actual = index.query(sort=sort, **filters)
+    assert actual['wo_id'].tolist() == expected['wo_id'].tolist()
+
+def test_query_rejects_unknown_sort_columns(index):
+    with pytest.raises(ValueError):
+        index.query(sort='-asset_type')
+
+def test_with_factor_filters_on_the_factor_bit(index):
+    decoded = index.decode(index.frame)['predicted_risk_factors']
+    old = index.with_factor('asset_age', 0)
+    assert old.index.tolist() == [i for i, factors in decoded.items() if any(f.startswith('Old Asset') for f in factors)]
+    quick = index.with_factor('resolution_text', 0)
+    assert quick.index.tolist() == [i for i, factors in decoded.items() if 'Quick Fix Indicated' in factors]
+    with pytest.raises(KeyError):
+        index.with_factor('no such rule')
+
+def test_get_and_group(index, scored):
+    decoded = with_risk_factor_lists(scored).set_index('wo_id')
+    for wo_id in scored['wo_id'].iloc[::397]:
+        assessment = index.get(wo_id)
+        assert assessment['wo_id'] == wo_id
+        assert assessment['predicted_risk_factors'] == decoded.loc[wo_id, 'predicted_risk_factors']
+    assert index.get('WO_UNKNOWN') is None
+
+    asset_type = scored['asset_type'].iloc[0]
+    group = index.group('asset_type', asset_type)
+    assert (group['asset_type'] == asset_type).all()
+    assert len(group) == int((scored['asset_type'] == asset_type).sum())
+    assert np.all(np.diff(group['predicted_rework_risk_score'].to_numpy()) <= 0)
+    assert index.group('asset_type', 'no such type').empty
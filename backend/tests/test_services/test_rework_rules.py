@@ -0,0 +1,124 @@
+"""
+Tests for the declarative rework rule engine in rework_rules.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.services.ai.rework_predictor_service import score_rework_risk, with_risk_factor_lists
+from backend.services.ai.rework_rules import COMPARISON_OPS, ReworkRuleSet, get_rework_rules, load_rework_rules
+from backend.tests.reference import resample_work_orders
+
+# Numbers, a missing value, a non-numeric string and numeric strings
+VALUES = pd.Series([0, 1, 2.5, np.nan, 'n/a', None, '3', -4], dtype=object)
+
+def one_tier(tier, column='value'):
+    return ReworkRuleSet({
+        'base_score': 0.0,
+        'score_range': [-10.0, 10.0],
+        'rules': [{'name': 'rule', 'column': column, 'tiers': [dict(tier, score=1.0)]}]
+    })
+
+@pytest.mark.parametrize('op', sorted(COMPARISON_OPS))
+def test_comparisons_match_numeric_values_only(op):
+    scores, masks = one_tier({'op': op, 'value': 1}).score(pd.DataFrame({'value': VALUES}))
+    numbers = pd.to_numeric(VALUES, errors='coerce')
+    expected = numbers.notna() & numbers.map(lambda x: COMPARISON_OPS[op](x, 1.0))
+    np.testing.assert_array_equal(scores == 1.0, expected.to_numpy(dtype=bool))
+    np.testing.assert_array_equal(masks != 0, expected.to_numpy(dtype=bool))
+
+def test_not_equal_skips_missing_and_non_numeric_values():
+    scores, _ = one_tier({'op': '!=', 'value': 0}).score(pd.DataFrame({'value': VALUES}))
+    assert scores.tolist() == [0.0, 1.0, 1.0, 0.0, 0.0, 0.0, 1.0, 1.0]
+
+    # All-missing float column: nothing matches
+    scores, _ = one_tier({'op': '!=', 'value': 0}).score(pd.DataFrame({'value': [np.nan] * 3}))
+    assert not scores.any()
+
+def test_text_and_set_conditions():
+    df = pd.DataFrame({'value': ['Temporary PATCH', 'replaced', None, 'patchwork', 'other']})
+    scores, _ = one_tier({'contains_any': ['patch', 'temporary']}).score(df)
+    assert scores.tolist() == [1.0, 0.0, 0.0, 1.0, 0.0]
+    scores, _ = one_tier({'in': ['replaced', 'other']}).score(df)
+    assert scores.tolist() == [0.0, 1.0, 0.0, 0.0, 1.0]
+
+def test_first_matching_tier_applies_and_scores_are_clipped():
+    rules = ReworkRuleSet({
+        'base_score': 0.5,
+        'score_range': [0.0, 1.0],
+        'default_factors': ['None'],
+        'rules': [{'name': 'age', 'column': 'age', 'tiers': [
+            {'op': '>', 'value': 10, 'score': 0.7, 'factor': 'Old ({value})'},
+            {'op': '>', 'value': 5, 'score': 0.2, 'factor': 'Aging ({value})'},
+            {'op': '<', 'value': 1, 'score': -0.9, 'factor': 'New'},
+        ]}]
+    })
+    df = pd.DataFrame({'age': [12, 7, 3, 0, np.nan]})
+    scores, masks = rules.score(df)
+    np.testing.assert_allclose(scores, [1.0, 0.7, 0.5, 0.0, 0.5])
+    assert rules.decode_factors(df, masks).tolist() == [['Old (12.0)'], ['Aging (7.0)'], ['None'], ['New'], ['None']]
+
+def test_missing_column_matches_no_tier():
+    scores, masks = one_tier({'op': '>', 'value': 0}, column='absent').score(pd.DataFrame({'value': [1, 2]}))
+    assert not scores.any() and not masks.any()
+
+@pytest.mark.parametrize('tier', [
+    {'op': '>', 'value': 1, 'in': [1]},
+    {'op': '~', 'value': 1},
+    {'op': '>'},
+    {},
+])
+def test_malformed_tiers_are_rejected(tier):
+    with pytest.raises(ValueError):
+        one_tier(tier)
+
+def test_rule_files_load_and_reload_on_change(tmp_path):
+    path = str(tmp_path / 'rules.json')
+    spec = get_rework_rules().spec
+    with open(path, 'w') as f:
+        json.dump(spec, f)
+    rules = get_rework_rules(path)
+    assert rules.fingerprint == load_rework_rules(path).fingerprint == get_rework_rules().fingerprint
+    assert get_rework_rules(path) is rules
+
+    with open(path, 'w') as f:
+        json.dump(dict(spec, base_score=0.1), f, indent=2)
+    assert get_rework_rules(path).base_score == 0.1
+
+    # A broken edit keeps the previous rules in use
+    with open(path, 'w') as f:
+        f.write('{"rules": [')
+    assert get_rework_rules(path).base_score == 0.1
+
+def test_factor_bits_follow_the_factor_table():
+    rules = get_rework_rules()
+    table = rules.factor_table
+    assert [entry['bit'] for entry in table] == list(range(len(table)))
+    for entry in table:
+        assert rules.factor_bit(entry['rule'], entry['tier']) == np.uint64(1) << np.uint64(entry['bit'])
+    with pytest.raises(KeyError):
+        rules.factor_bit('asset_age', 5)
+
+def test_factor_masks_decode_to_the_factors_of_their_bits():
+    rules = get_rework_rules()
+    scored = score_rework_risk(resample_work_orders(2000))
+    masks = scored['predicted_risk_factor_mask'].to_numpy()
+    lists = with_risk_factor_lists(scored)['predicted_risk_factors']
+    joined = with_risk_factor_lists(scored, separator='; ')['predicted_risk_factors']
+    assert joined.tolist() == lists.map('; '.join).tolist()
+
+    for entry in rules.factor_table:
+        has_bit = (masks & rules.factor_bit(entry['rule'], entry['tier'])) != 0
+        # The factor text of a templated tier varies with the row's value
+        prefix = entry['factor'].split('{')[0]
+        assert has_bit.tolist() == [any(f.startswith(prefix) for f in factors) for factors in lists]
+    assert (lists[masks == 0].map(tuple) == tuple(rules.default_factors)).all()
+
+def test_masks_cannot_be_decoded_with_another_rule_set():
+    scored = score_rework_risk(resample_work_orders(100))
+    other = ReworkRuleSet(dict(get_rework_rules().spec, base_score=0.5))
+    with pytest.raises(ValueError):
+        with_risk_factor_lists(scored, other)
@@ -0,0 +1,87 @@
+"""
+Tests for the incrementally maintained rework counters in rework_stats.
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from backend.services.ai.rework_predictor_service import load_synthetic_data
+from backend.services.ai.rework_stats import REWORK_STAT_DIMENSIONS, ReworkStats
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'data')
+
+@pytest.fixture(scope='module')
+def work_orders():
+    return load_synthetic_data(DATA_DIR, use_cache=False)
+
+def snapshots(stats):
+    return {
+        dim: stats.snapshot(dim).sort_values('key', kind='stable').reset_index(drop=True)
+        for dim in REWORK_STAT_DIMENSIONS
+    }
+
+def assert_same_stats(actual, expected):
+    assert actual.work_orders == expected.work_orders
+    assert actual.as_of == pytest.approx(expected.as_of)
+    for dim, frame in snapshots(expected).items():
+        pd.testing.assert_frame_equal(snapshots(actual)[dim], frame, check_exact=False, rtol=1e-9)
+
+def test_counts_match_a_groupby(work_orders):
+    stats = ReworkStats(None)
+    assert stats.update_frame(work_orders) == work_orders['actual_rework_needed'].notna().sum()
+    for dim in REWORK_STAT_DIMENSIONS:
+        known = work_orders[work_orders['actual_rework_needed'].notna()]
+        expected = known.groupby(dim)['actual_rework_needed'].agg(['size', 'sum'])
+        snapshot = stats.snapshot(dim).set_index('key')
+        assert snapshot['work_orders'].to_dict() == expected['size'].to_dict()
+        assert snapshot['reworks'].to_dict() == expected['sum'].astype(int).to_dict()
+
+@pytest.mark.parametrize('half_life_days', [None, 90.0])
+def test_per_work_order_updates_match_one_batch(work_orders, half_life_days):
+    batch = ReworkStats(half_life_days)
+    batch.update_frame(work_orders)
+
+    # Shuffled, so some work orders arrive after later-closing ones
+    streamed = ReworkStats(half_life_days)
+    for work_order in work_orders.sample(frac=1, random_state=4).to_dict(orient='records'):
+        assert streamed.update(work_order)
+    assert_same_stats(streamed, batch)
+
+def test_batches_add_up_to_one_batch(work_orders):
+    whole = ReworkStats()
+    whole.update_frame(work_orders)
+    split = ReworkStats()
+    for start in range(0, len(work_orders), 130):
+        split.update_frame(work_orders.iloc[start:start + 130])
+    assert_same_stats(split, whole)
+
+def test_work_orders_are_counted_once(work_orders):
+    once = ReworkStats()
+    once.update_frame(work_orders)
+
+    # Overlapping batches, a batch repeating rows, and single resends
+    stats = ReworkStats()
+    stats.update_frame(work_orders.head(300))
+    assert stats.update_frame(pd.concat([work_orders.iloc[200:], work_orders.iloc[250:260]])) == len(work_orders) - 300
+    for work_order in work_orders.head(50).to_dict(orient='records'):
+        assert not stats.update(work_order)
+    assert not stats.update_frame(work_orders)
+    assert_same_stats(stats, once)
+
+def test_work_orders_without_an_id_are_always_counted(work_orders):
+    stats = ReworkStats()
+    work_order = {**work_orders.iloc[0].to_dict(), 'wo_id': None}
+    assert stats.update(work_order) and stats.update(work_order)
+    assert stats.update_frame(work_orders.head(5).assign(wo_id=None)) == 5
+    assert stats.work_orders == 7
+
+def test_unknown_outcomes_are_not_counted(work_orders):
+    stats = ReworkStats()
+    work_order = work_orders.iloc[0].to_dict()
+    assert not stats.update({**work_order, 'actual_rework_needed': None})
+    assert stats.update_frame(work_orders.head(3).assign(actual_rework_needed=None)) == 0
+    assert stats.work_orders == 0
+    # An unknown outcome does not use up the wo_id
+    assert stats.update(work_order)
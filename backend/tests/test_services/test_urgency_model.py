@@ -0,0 +1,64 @@
+"""
+Tests for the learned urgency classifier in urgency_model.
+"""
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from backend.services.ai import urgency_model
+from backend.services.ai.nlp_service import flag_urgent_complaints
+from backend.services.ai.urgency_model import UrgencyModel, get_urgency_model, train_urgency_model
+from backend.tests.reference import build_complaints
+
+@pytest.fixture(scope='module')
+def complaints():
+    return build_complaints(3000)
+
+@pytest.fixture(scope='module')
+def model(complaints):
+    return train_urgency_model(complaints)
+
+def test_saved_model_scores_like_the_trained_one(tmp_path, complaints, model):
+    model_dir = model.save(str(tmp_path / 'model'))
+    loaded = UrgencyModel.load(model_dir)
+    assert isinstance(loaded.coef, np.memmap)
+    np.testing.assert_allclose(loaded.predict_proba(complaints), model.predict_proba(complaints))
+    assert loaded.identity == model.identity
+
+def test_save_never_leaves_the_model_directory_missing(tmp_path, monkeypatch, complaints, model):
+    model_dir = str(tmp_path / 'model')
+    model.save(model_dir)
+    replace = os.replace
+    seen = []
+
+    def checking_replace(src, dst):
+        # Only the rename itself may leave the directory absent
+        seen.append(os.path.exists(os.path.join(model_dir, 'meta.json')))
+        replace(src, dst)
+
+    monkeypatch.setattr(urgency_model.os, 'replace', checking_replace)
+    retrained = train_urgency_model(complaints, C=0.1)
+    retrained.save(model_dir)
+    assert seen == [True, False]
+    assert sorted(os.listdir(tmp_path)) == ['model']
+    np.testing.assert_allclose(UrgencyModel.load(model_dir).coef, retrained.coef)
+
+def test_model_mode_flags_with_the_saved_model(tmp_path, complaints, model):
+    model_dir = model.save(str(tmp_path / 'model'))
+    flagged = flag_urgent_complaints(complaints, mode='model', model=get_urgency_model(model_dir))
+    probability = model.predict_proba(complaints)
+    np.testing.assert_allclose(flagged['urgency_probability'].to_numpy(), probability)
+    np.testing.assert_array_equal(flagged['is_urgent'].to_numpy(), probability >= model.threshold)
+
+def test_get_urgency_model_is_none_until_a_model_is_saved(tmp_path):
+    assert get_urgency_model(str(tmp_path / 'missing')) is None
+
+def test_keyword_rules_do_not_import_scikit_learn():
+    code = ("import sys; import backend.services.ai.nlp_service; "
+            "sys.exit('sklearn' in sys.modules or 'scipy' in sys.modules)")
+    root = os.path.join(os.path.dirname(__file__), '..', '..', '..')
+    assert subprocess.run([sys.executable, '-c', code], cwd=root).returncode == 0
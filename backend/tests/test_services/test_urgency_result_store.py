@@ -0,0 +1,176 @@
+"""
+Tests for stored urgency results in urgency_result_store.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.services.ai import nlp_service, urgency_result_store
+from backend.services.ai.nlp_service import URGENCY_TEXT_COLUMNS, flag_urgent_complaints
+from backend.services.ai.urgency_result_store import (
+    MAX_SEGMENTS,
+    UrgencyResultStore,
+    get_urgency_result_store,
+    text_hashes,
+    urgency_version,
+)
+from backend.tests.reference import build_complaints
+
+VERSION = urgency_version(('gas leak', 'no heat'), 'rules')
+
+def random_results(keys, seed):
+    rng = np.random.default_rng(seed)
+    return (
+        rng.integers(0, 256, size=(len(keys), 2), dtype=np.uint8),
+        rng.random(len(keys))
+    )
+
+@pytest.fixture(scope='module')
+def complaints():
+    return build_complaints(3000)
+
+def test_lookup_finds_saved_results(tmp_path):
+    store = UrgencyResultStore(str(tmp_path))
+    keys = np.arange(100, dtype=np.int64)[::-1]
+    hashes = keys.astype(np.uint64) * 7
+    hits, probability = random_results(keys, seed=1)
+
+    found, _, _ = store.lookup(VERSION, keys, hashes)
+    assert not found.any()
+
+    store.save(VERSION, keys[:60], hashes[:60], hits[:60], probability[:60])
+    found, stored_hits, stored_probability = store.lookup(VERSION, keys, hashes)
+    np.testing.assert_array_equal(found, np.arange(100) < 60)
+    np.testing.assert_array_equal(stored_hits, hits[:60])
+    np.testing.assert_array_equal(stored_probability, probability[:60])
+
+def test_new_segments_extend_and_replace_results(tmp_path):
+    store = UrgencyResultStore(str(tmp_path))
+    keys = np.arange(40, dtype=np.int64)
+    hashes = keys.astype(np.uint64)
+    expected_hits, expected_probability = random_results(keys, seed=0)
+    for seed in range(MAX_SEGMENTS + 4):
+        # Each save covers half the keys, overwriting earlier results for some
+        batch = keys[seed % 2::2]
+        hits, probability = random_results(batch, seed=seed + 1)
+        store.save(VERSION, batch, hashes[batch], hits, probability)
+        expected_hits[batch], expected_probability[batch] = hits, probability
+
+    segments = os.listdir(os.path.join(str(tmp_path), VERSION))
+    assert 1 <= len(segments) <= MAX_SEGMENTS
+
+    # A fresh instance reads the same results back from disk
+    for reader in (store, UrgencyResultStore(str(tmp_path))):
+        found, stored_hits, stored_probability = reader.lookup(VERSION, keys, hashes)
+        assert found.all()
+        np.testing.assert_array_equal(stored_hits, expected_hits)
+        np.testing.assert_array_equal(stored_probability, expected_probability)
+
+def test_segments_saved_by_another_instance_are_seen(tmp_path):
+    store, other = UrgencyResultStore(str(tmp_path)), UrgencyResultStore(str(tmp_path))
+    keys = np.arange(10, dtype=np.int64)
+    hits, probability = random_results(keys, seed=2)
+    assert not store.lookup(VERSION, keys, keys.astype(np.uint64))[0].any()
+    other.save(VERSION, keys, keys.astype(np.uint64), hits, probability)
+    assert store.lookup(VERSION, keys, keys.astype(np.uint64))[0].all()
+
+def test_saves_interleaved_across_processes_keep_every_result(tmp_path, monkeypatch):
+    # Separate instances share no lock, like stores in two worker processes
+    store, other = UrgencyResultStore(str(tmp_path)), UrgencyResultStore(str(tmp_path))
+    keys = np.arange(80, dtype=np.int64)
+    hashes = keys.astype(np.uint64)
+    hits, probability = random_results(keys, seed=5)
+    monkeypatch.setattr(urgency_result_store, 'MAX_SEGMENTS', 2)
+
+    # other saves a batch whenever store is about to write a segment or a compaction
+    other_batches = iter(range(1, 8, 2))
+    write = urgency_result_store._write_segment
+    writing = []
+
+    def write_after_other_save(path, arrays):
+        batch = None if writing else next(other_batches, None)
+        if batch is not None:
+            writing.append(batch)
+            rows = slice(batch * 10, batch * 10 + 10)
+            other.save(VERSION, keys[rows], hashes[rows], hits[rows], probability[rows])
+            writing.pop()
+        write(path, arrays)
+
+    monkeypatch.setattr(urgency_result_store, '_write_segment', write_after_other_save)
+    for batch in range(0, 8, 2):
+        rows = slice(batch * 10, batch * 10 + 10)
+        store.save(VERSION, keys[rows], hashes[rows], hits[rows], probability[rows])
+
+    found, stored_hits, stored_probability = UrgencyResultStore(str(tmp_path)).lookup(VERSION, keys, hashes)
+    assert found.all()
+    np.testing.assert_array_equal(stored_hits, hits)
+    np.testing.assert_array_equal(stored_probability, probability)
+
+def test_leftover_temporary_files_are_ignored(tmp_path):
+    store = UrgencyResultStore(str(tmp_path))
+    keys = np.arange(10, dtype=np.int64)
+    hits, probability = random_results(keys, seed=4)
+    store.save(VERSION, keys[:5], keys[:5].astype(np.uint64), hits[:5], probability[:5])
+
+    # Half-written segments left by interrupted saves, in the current and the old naming
+    version_dir = os.path.join(str(tmp_path), VERSION)
+    for name in ('.tmp-seg-000002.npz', 'seg-000001.npz.tmp.npz'):
+        with open(os.path.join(version_dir, name), 'wb') as f:
+            f.write(b'PK\x03\x04 truncated')
+
+    store.save(VERSION, keys[5:], keys[5:].astype(np.uint64), hits[5:], probability[5:])
+    found, stored_hits, _ = UrgencyResultStore(str(tmp_path)).lookup(VERSION, keys, keys.astype(np.uint64))
+    assert found.all()
+    np.testing.assert_array_equal(stored_hits, hits)
+
+def test_changed_text_or_version_misses(tmp_path, complaints):
+    store = UrgencyResultStore(str(tmp_path))
+    keys = complaints['unique_key'].to_numpy(dtype=np.int64)
+    hashes = text_hashes(complaints, URGENCY_TEXT_COLUMNS)
+    hits, probability = random_results(keys, seed=3)
+    store.save(VERSION, keys, hashes, hits, probability)
+
+    changed = complaints.copy()
+    changed['resolution_description'] = changed['resolution_description'].astype(object)
+    changed.loc[changed.index[::3], 'resolution_description'] = 'Gas leak reported again.'
+    found, _, _ = store.lookup(VERSION, keys, text_hashes(changed, URGENCY_TEXT_COLUMNS))
+    np.testing.assert_array_equal(found, np.arange(len(keys)) % 3 != 0)
+
+    for version in (
+        urgency_version(('gas leak',), 'rules'),
+        urgency_version(('gas leak', 'no heat'), 'both', {'intercept': 0.0}),
+    ):
+        assert version != VERSION
+        assert not store.lookup(version, keys, hashes)[0].any()
+
+def test_one_store_is_shared_per_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(urgency_result_store, '_stores', {})
+    monkeypatch.chdir(tmp_path)
+    store = get_urgency_result_store('results')
+    assert get_urgency_result_store(os.path.join(str(tmp_path), 'results')) is store
+    assert get_urgency_result_store('other') is not store
+
+def test_flagging_reuses_stored_results(tmp_path, monkeypatch, complaints):
+    store = UrgencyResultStore(str(tmp_path))
+    expected = flag_urgent_complaints(complaints, workers=1)
+
+    analyzed = []
+    detect = nlp_service._detect_urgency
+
+    def counting_detect(df, *args):
+        analyzed.append(len(df))
+        return detect(df, *args)
+
+    monkeypatch.setattr(nlp_service, '_detect_urgency', counting_detect)
+    first = flag_urgent_complaints(complaints, workers=1, result_store=store)
+    changed = complaints.copy()
+    changed['descriptor'] = changed['descriptor'].astype(object)
+    changed.loc[changed.index[:10], 'descriptor'] = 'GAS LEAK'
+    second = flag_urgent_complaints(changed, workers=1, result_store=store)
+
+    assert analyzed == [len(complaints), 10]
+    pd.testing.assert_frame_equal(first, expected)
+    pd.testing.assert_frame_equal(second, flag_urgent_complaints(changed, workers=1))
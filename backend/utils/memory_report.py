@@ -0,0 +1,104 @@
+"""
+Memory Report Utility for NYCHA QualityGuard Pro
+Compares the in-memory footprint of DataFrames column by column.
+
+Usage:
+    python -m backend.utils.memory_report data/311_hpd_processed_data_20250101_000000.csv
+    python -m backend.utils.memory_report --records 100000
+"""
+
+import argparse
+from typing import Dict, Any, List
+
+import pandas as pd
+
+def column_memory(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Measure the deep memory usage of every column of a DataFrame.
+
+    Args:
+        df (pd.DataFrame): Frame to measure.
+
+    Returns:
+        pd.DataFrame: One row per column with its dtype and size in bytes.
+    """
+    usage = df.memory_usage(index=False, deep=True)
+    return pd.DataFrame({
+        'dtype': df.dtypes.astype(str),
+        'bytes': usage
+    })
+
+def compare_memory(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compare the per-column footprint of two frames holding the same data.
+
+    Args:
+        before (pd.DataFrame): Frame with the original dtypes.
+        after (pd.DataFrame): Frame with the compact dtypes.
+
+    Returns:
+        pd.DataFrame: Per-column dtypes and sizes before and after, the
+            saving as a ratio, and a TOTAL row.
+    """
+    left = column_memory(before).add_suffix('_before')
+    right = column_memory(after).add_suffix('_after')
+    report = left.join(right, how='left')
+    report.loc['TOTAL'] = ['', report['bytes_before'].sum(), '', report['bytes_after'].sum()]
+    report['ratio'] = report['bytes_before'] / report['bytes_after']
+    return report
+
+def format_memory_report(report: pd.DataFrame) -> str:
+    """Render a compare_memory report as a fixed-width text table."""
+    lines: List[str] = [
+        f"{'column':<24}{'before':>16}{'':>10}{'after':>16}{'':>10}{'ratio':>8}"
+    ]
+    for column, row in report.iterrows():
+        lines.append(
+            f"{column:<24}{row['dtype_before']:>16}{_format_bytes(row['bytes_before']):>10}"
+            f"{row['dtype_after']:>16}{_format_bytes(row['bytes_after']):>10}{row['ratio']:>7.1f}x"
+        )
+    return '\n'.join(lines)
+
+def _format_bytes(n: float) -> str:
+    for unit in ('B', 'KB', 'MB'):
+        if n < 1024:
+            return f"{n:.0f}{unit}" if unit == 'B' else f"{n:.1f}{unit}"
+        n /= 1024
+    return f"{n:.1f}GB"
+
+def memory_summary(before: pd.DataFrame, after: pd.DataFrame) -> Dict[str, Any]:
+    """Summarize total bytes before and after, e.g. for logging or an API response."""
+    before_bytes = int(before.memory_usage(index=False, deep=True).sum())
+    after_bytes = int(after.memory_usage(index=False, deep=True).sum())
+    return {
+        'rows': len(after),
+        'bytes_before': before_bytes,
+        'bytes_after': after_bytes,
+        'ratio': before_bytes / after_bytes if after_bytes else None
+    }
+
+def main() -> None:
+    from backend.services.data_ingestion_service import (
+        _clean_311_frame,
+        apply_311_schema,
+        read_311_csv,
+    )
+
+    parser = argparse.ArgumentParser(description='Report 311 DataFrame memory before and after the compact schema')
+    parser.add_argument('csv', nargs='?', help='Processed 311 CSV; generated records are used when omitted')
+    parser.add_argument('--records', type=int, default=100000)
+    args = parser.parse_args()
+
+    if args.csv:
+        # The untyped baseline is what a plain read_csv of the file produces
+        before = _clean_311_frame(pd.read_csv(args.csv))
+        after = read_311_csv(args.csv)
+    else:
+        from backend.benchmarks.socrata_stub import generate_311_records
+        before = _clean_311_frame(pd.DataFrame(generate_311_records(args.records)))
+        after = apply_311_schema(_clean_311_frame(pd.DataFrame(generate_311_records(args.records))))
+
+    print(format_memory_report(compare_memory(before, after)))
+
+if __name__ == '__main__':
+    main()